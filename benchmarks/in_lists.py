@@ -0,0 +1,63 @@
+"""
+Benchmark of `in` lists of growing size.
+
+Compares the plain `IN (%s, %s, ...)` form with the large-list form (a single
+JSON parameter on SQLite) by SQL size, number of parameters and query latency.
+
+Run with:
+    python -m benchmarks.in_lists
+"""
+
+import timeit
+
+from django.db import DatabaseError
+from django.test import override_settings
+
+from benchmarks import setup_database
+from drf_complex_filter.utils import ComplexFilter
+from tests.models import TestCaseModel
+
+SIZES = (10, 100, 1000, 10000, 50000)
+ROWS = 20000
+
+
+def build_queryset(values):
+    filters = {
+        "type": "operator",
+        "data": {"attribute": "integer", "operator": "in", "value": values},
+    }
+    return ComplexFilter(TestCaseModel).filter_queryset(
+        TestCaseModel.objects.values_list("id", flat=True), filters
+    )
+
+
+def measure(values):
+    queryset = build_queryset(values)
+    sql, params = queryset.query.sql_with_params()
+    try:
+        seconds = min(timeit.repeat(lambda: list(queryset.all()), number=3, repeat=3)) / 3
+        latency = f"{seconds * 1000:9.2f} ms"
+    except DatabaseError as error:
+        latency = f"failed: {error}"
+    return len(sql), len(params), latency
+
+
+def main():
+    setup_database()
+    TestCaseModel.objects.bulk_create(
+        TestCaseModel(group1="g", group2="g", integer=index) for index in range(ROWS)
+    )
+
+    print(f"{'size':>6} {'form':>6} {'sql bytes':>10} {'params':>7}  latency")
+    for size in SIZES:
+        values = list(range(0, size * 2, 2))
+        for form, threshold in (("plain", None), ("large", 1000)):
+            with override_settings(
+                COMPLEX_FILTER_SETTINGS={"LARGE_IN_LIST_THRESHOLD": threshold}
+            ):
+                sql_size, params, latency = measure(values)
+            print(f"{size:>6} {form:>6} {sql_size:>10} {params:>7}  {latency}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark of matching one changed row against many filters.
+
+Compares one database query per filter with compiled predicates called one by
+one and with a PredicateSet.
+
+Run with:
+    python -m benchmarks.predicates [filters]
+"""
+
+import sys
+import timeit
+
+from benchmarks import setup_database
+from drf_complex_filter.predicates import PredicateSet, compile_predicate
+from drf_complex_filter.utils import ComplexFilter
+from tests.models import TestCaseModel
+
+
+def make_filter(index):
+    return {
+        "type": "and",
+        "data": [
+            {"type": "operator", "data": {"attribute": "integer", "operator": "=", "value": index}},
+            {"type": "operator", "data": {"attribute": "group1", "operator": "*", "value": "a"}},
+        ],
+    }
+
+
+def main(count=2000):
+    setup_database()
+    instance = TestCaseModel.objects.create(group1="abc", group2="x", integer=7)
+    filters = [make_filter(index) for index in range(count)]
+
+    def database():
+        queryset = TestCaseModel.objects.filter(pk=instance.pk)
+        return [
+            index for index, item in enumerate(filters)
+            if ComplexFilter(TestCaseModel).filter_queryset(queryset, item).exists()
+        ]
+
+    predicates = [compile_predicate(TestCaseModel, item) for item in filters]
+    predicate_set = PredicateSet(TestCaseModel)
+    for index, item in enumerate(filters):
+        predicate_set.add(index, item)
+
+    runs = {
+        "database": database,
+        "predicates": lambda: [
+            index for index, predicate in enumerate(predicates) if predicate(instance)
+        ],
+        "predicate set": lambda: predicate_set.matches(instance),
+    }
+    print(f"{'method':>14} {'matches':>7}  latency ({count} filters)")
+    for name, run in runs.items():
+        matched = run()
+        seconds = min(timeit.repeat(run, number=3, repeat=3)) / 3
+        print(f"{name:>14} {len(matched):>7}  {seconds * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,38 @@
+"""
+Microbenchmark for the per-request ComplexFilter constructor cost.
+
+"before" rebuilds the operator/function registry on every construction, which is
+what ComplexFilter.__init__ used to do. "after" uses the shared process-wide registry.
+
+Run with:
+    python -m benchmarks.registry
+"""
+
+import timeit
+
+import benchmarks  # noqa: F401  (configures Django)
+from drf_complex_filter.registry import FilterRegistry
+from drf_complex_filter.settings import filter_settings
+from drf_complex_filter.utils import ComplexFilter
+from tests.models import TestCaseModel
+
+NUMBER = 20000
+
+
+def construct_before():
+    FilterRegistry.from_settings(filter_settings)
+    return ComplexFilter(TestCaseModel)
+
+
+def construct_after():
+    return ComplexFilter(TestCaseModel)
+
+
+def main():
+    for name, func in (("before", construct_before), ("after", construct_after)):
+        seconds = min(timeit.repeat(func, number=NUMBER, repeat=5))
+        print(f"{name:>6}: {seconds / NUMBER * 1e6:8.2f} us per ComplexFilter()")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark of the `search` operator against `*` (icontains).
+
+Seeds an in-memory SQLite database with text rows, creates the FTS5 table of the
+test model, then times a rare and a common word with both operators.
+
+Run with:
+    python -m benchmarks.search [rows]
+"""
+
+import random
+import sys
+import timeit
+
+from benchmarks import setup_database
+from drf_complex_filter.search import create_search_table
+from drf_complex_filter.utils import ComplexFilter
+from tests.models import TestCaseModel
+
+WORDS = [f"word{index}" for index in range(5000)]
+COMMON_WORDS = ["alpha", "beta", "gamma"]
+
+
+def seed(rows):
+    random.seed(0)
+    TestCaseModel.objects.bulk_create(
+        TestCaseModel(
+            group1=" ".join(random.sample(WORDS, 8) + [random.choice(COMMON_WORDS)]),
+            group2=" ".join(random.sample(WORDS, 8)),
+            integer=index,
+        )
+        for index in range(rows)
+    )
+
+
+def measure(operator, value):
+    filters = {
+        "type": "operator",
+        "data": {"attribute": "group1", "operator": operator, "value": value},
+    }
+    queryset = ComplexFilter(TestCaseModel).filter_queryset(
+        TestCaseModel.objects.values_list("id", flat=True), filters
+    )
+    rows = len(list(queryset))
+    seconds = min(timeit.repeat(lambda: list(queryset.all()), number=5, repeat=3)) / 5
+    return rows, seconds * 1000
+
+
+def main(rows=100000):
+    setup_database()
+    seed(rows)
+    create_search_table(TestCaseModel)
+
+    print(f"{'value':>8} {'operator':>8} {'rows':>7}  latency")
+    for value in ("word42", "alpha"):
+        for operator in ("*", "search"):
+            matched, milliseconds = measure(operator, value)
+            print(f"{value:>8} {operator:>8} {matched:>7}  {milliseconds:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
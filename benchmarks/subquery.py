@@ -0,0 +1,58 @@
+"""
+Benchmark of the subquery strategies for `Model___field` conditions.
+
+Seeds an in-memory SQLite database with the test models, then prints the SQL
+generated by each strategy and the time to fetch the matching IDs.
+
+Run with:
+    python -m benchmarks.subquery [related rows] [filtered rows]
+"""
+
+import random
+import sys
+import timeit
+
+from benchmarks import setup_database
+from drf_complex_filter.utils import SUBQUERY_STRATEGIES, ComplexFilter
+from tests.models import LookupFieldTestModel, TestCaseModel
+
+FILTERS = {
+    "type": "operator",
+    "data": {
+        "attribute": "simple_lookup.LookupFieldTestModel___lookup_field",
+        "operator": "*",
+        "value": "value1",
+    },
+}
+
+
+def seed(related_rows, filtered_rows):
+    LookupFieldTestModel.objects.bulk_create(
+        LookupFieldTestModel(lookup_field=f"value{index}") for index in range(related_rows)
+    )
+    related_ids = list(LookupFieldTestModel.objects.values_list("id", flat=True))
+    random.seed(0)
+    TestCaseModel.objects.bulk_create(
+        TestCaseModel(group1="g", group2="g", simple_lookup_id=random.choice(related_ids))
+        for _ in range(filtered_rows)
+    )
+
+
+def main(related_rows=2000, filtered_rows=20000):
+    setup_database()
+    seed(related_rows, filtered_rows)
+
+    for strategy in SUBQUERY_STRATEGIES:
+        filters = {"type": "operator", "data": {**FILTERS["data"], "subquery": strategy}}
+        queryset = ComplexFilter(TestCaseModel).filter_queryset(
+            TestCaseModel.objects.all(), filters
+        )
+        queryset = queryset.values_list("id", flat=True)
+        rows = len(list(queryset))
+        seconds = min(timeit.repeat(lambda: list(queryset.all()), number=5, repeat=3)) / 5
+        print(f"[{strategy}] {rows} rows, {seconds * 1000:.2f} ms")
+        print(f"    {queryset.query}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
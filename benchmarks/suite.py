@@ -0,0 +1,208 @@
+"""
+Benchmark suite for compiling and executing filter trees.
+
+Generates filters of growing width and depth over the test models (plain
+conditions, related lookups, `Model___field` subqueries and large `in` lists) and
+times each phase separately:
+
+- parse: decoding the JSON query parameter
+- build: parsing, optimizing and compiling the tree into Q objects, plan cache off
+- build_cached: the same with the plan cache warm
+- sql: compiling the queryset into SQL with str(queryset.query)
+- execute: running the query on a seeded in-memory SQLite database
+
+Results are written as JSON, so runs from different commits can be compared:
+
+    python -m benchmarks.suite --output before.json
+    git checkout other-branch
+    python -m benchmarks.suite --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import subprocess
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import django
+from django.test import override_settings
+
+from benchmarks import setup_database
+from drf_complex_filter.registry import get_registry
+from drf_complex_filter.utils import ComplexFilter
+from tests.models import LookupFieldTestModel, TestCaseModel
+
+WIDTHS = (1, 4, 16)
+DEPTHS = (1, 2, 3)
+IN_LIST_SIZE = 2000
+LOOKUP_ROWS = 500
+RECORD_ROWS = 5000
+
+
+def operator(attribute: str, operator: str, value: Any) -> dict:
+    return {
+        "type": "operator",
+        "data": {"attribute": attribute, "operator": operator, "value": value},
+    }
+
+
+def make_condition(kind: str, index: int) -> dict:
+    if kind == "plain":
+        return operator("integer", ">=", index)
+    if kind == "related":
+        return operator("simple_lookup.lookup_field", "*", f"value{index}")
+    if kind == "subquery":
+        return operator("simple_lookup.LookupFieldTestModel___lookup_field", "=", f"value{index}")
+    if kind == "in_list":
+        return operator("integer", "in", list(range(index, index + IN_LIST_SIZE)))
+    raise ValueError(f"Unknown kind '{kind}'")
+
+
+def make_filter(kind: str, width: int, depth: int, counter: Optional[List[int]] = None) -> dict:
+    """Build a tree with `width` children per group, alternating and/or per level."""
+    counter = counter if counter is not None else [0]
+    if depth == 0:
+        counter[0] += 1
+        return make_condition(kind, counter[0])
+    return {
+        "type": "and" if depth % 2 else "or",
+        "data": [make_filter(kind, width, depth - 1, counter) for _ in range(width)],
+    }
+
+
+def measure(
+    func: Callable[[], Any], min_time: float = 0.2, max_rounds: int = 1000
+) -> Dict[str, float]:
+    """Call func for at least min_time and 3 rounds, return timings in microseconds."""
+    timings: List[float] = []
+    started = time.perf_counter()
+    while len(timings) < max_rounds and (
+        len(timings) < 3 or time.perf_counter() - started < min_time
+    ):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return {
+        "min_us": round(min(timings), 2),
+        "mean_us": round(sum(timings) / len(timings), 2),
+        "rounds": len(timings),
+    }
+
+
+def seed() -> None:
+    random.seed(0)
+    LookupFieldTestModel.objects.bulk_create(
+        LookupFieldTestModel(lookup_field=f"value{index}") for index in range(LOOKUP_ROWS)
+    )
+    lookup_ids = list(LookupFieldTestModel.objects.values_list("id", flat=True))
+    TestCaseModel.objects.bulk_create(
+        TestCaseModel(
+            group1="g",
+            group2="g",
+            integer=random.randrange(RECORD_ROWS),
+            simple_lookup_id=random.choice(lookup_ids),
+        )
+        for _ in range(RECORD_ROWS)
+    )
+
+
+def run_scenario(kind: str, width: int, depth: int) -> List[Dict[str, Any]]:
+    payload = json.dumps(make_filter(kind, width, depth))
+    queryset = TestCaseModel.objects.values_list("id", flat=True)
+    json_loads = get_registry().json_loads
+
+    def build():
+        return ComplexFilter(TestCaseModel).filter_queryset(queryset, payload)
+
+    timings = {"parse": measure(lambda: json_loads(payload))}
+    with override_settings(COMPLEX_FILTER_SETTINGS={"PLAN_CACHE_SIZE": 0}):
+        timings["build"] = measure(build)
+    build()
+    timings["build_cached"] = measure(build)
+    filtered = build()
+    timings["sql"] = measure(lambda: str(filtered.query))
+    timings["execute"] = measure(lambda: list(filtered.all()))
+
+    name = f"{kind}/w{width}/d{depth}"
+    return [
+        {"name": name, "phase": phase, "payload_bytes": len(payload), **timing}
+        for phase, timing in timings.items()
+    ]
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    with open(baseline_path) as baseline_file:
+        baseline = {
+            (result["name"], result["phase"]): result
+            for result in json.load(baseline_file)["results"]
+        }
+
+    print(f"\n{'scenario':<24} {'phase':<13} {'baseline us':>12} {'current us':>12} {'ratio':>7}")
+    for result in results:
+        before = baseline.get((result["name"], result["phase"]))
+        if not before:
+            continue
+        ratio = result["min_us"] / before["min_us"] if before["min_us"] else float("inf")
+        print(
+            f"{result['name']:<24} {result['phase']:<13} "
+            f"{before['min_us']:>12.2f} {result['min_us']:>12.2f} {ratio:>7.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    parser.add_argument(
+        "--kinds",
+        default="plain,related,subquery,in_list",
+        help="comma separated scenario kinds",
+    )
+    args = parser.parse_args()
+
+    setup_database()
+    seed()
+
+    results = []
+    for kind in args.kinds.split(","):
+        for depth in DEPTHS:
+            for width in WIDTHS:
+                if width ** depth > 256:
+                    continue
+                for result in run_scenario(kind, width, depth):
+                    results.append(result)
+                    print(
+                        f"{result['name']:<24} {result['phase']:<13} "
+                        f"{result['min_us']:>12.2f} us (mean {result['mean_us']:.2f})"
+                    )
+
+    report = {
+        "meta": {
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "sqlite": sqlite3.sqlite_version,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
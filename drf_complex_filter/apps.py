@@ -0,0 +1,20 @@
+from django.apps import AppConfig, apps
+
+
+class ComplexFilterConfig(AppConfig):
+    name = "drf_complex_filter"
+    verbose_name = "DRF Complex Filter"
+
+    def ready(self):
+        from drf_complex_filter.introspection import get_model_index, warm_field_paths
+        from drf_complex_filter.saved import get_saved_filters
+        from drf_complex_filter.settings import filter_settings
+
+        get_model_index()
+
+        for model_label, paths in filter_settings["WARM_FIELD_PATHS"].items():
+            warm_field_paths(apps.get_model(model_label), paths)
+
+        if not isinstance(filter_settings["SAVED_FILTERS"], str):
+            # A callable may read the database, it is loaded on first use
+            get_saved_filters()
@@ -0,0 +1,433 @@
+"""
+Filter result caches stored in the Django cache framework.
+
+- count cache: count() of querysets returned by ComplexQueryFilter
+- result cache: primary keys of the rows matching a filter, turned into `pk IN (...)`
+
+Cached entries are keyed with version counters of every model a filter touches.
+The counters are kept in the same cache and bumped by post_save, post_delete and
+m2m_changed, so an entry stops being used as soon as one of its models changes.
+Bulk operations that do not send these signals (QuerySet.update, bulk_create,
+raw SQL) are not seen and only expire with the cache timeout.
+"""
+
+import hashlib
+import pickle
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple, Type
+
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db.models import F, Model, Q, QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from drf_complex_filter.introspection import (
+    get_model_index,
+    resolve_field_path,
+    split_model_reference,
+)
+from drf_complex_filter.large_lists import InValues
+from drf_complex_filter.metrics import NULL_METRICS
+from drf_complex_filter.settings import filter_settings, on_settings_change
+from drf_complex_filter.tree import Condition, Node
+
+KEY_PREFIX = "drf_complex_filter"
+
+
+def get_cache():
+    """Return the Django cache selected by CACHE_ALIAS."""
+    return caches[filter_settings["CACHE_ALIAS"]]
+
+
+def caching_enabled() -> bool:
+    """Tell whether any filter result cache is enabled."""
+    return count_caching_enabled() or filter_settings["RESULT_CACHE_TIMEOUT"] is not None
+
+
+def count_caching_enabled() -> bool:
+    """Tell whether counts of filtered querysets are cached."""
+    return filter_settings["COUNT_CACHE_TIMEOUT"] is not None
+
+
+def _attribute_models(
+    model: Optional[Type[Model]], attribute: str, models: Set[Type[Model]]
+) -> None:
+    if "___" not in attribute:
+        models.update(resolve_field_path(model, attribute).models)
+        return
+
+    main_attribute, sub_attribute = attribute.split("___", maxsplit=1)
+    path, sub_model_name = split_model_reference(main_attribute)
+    if path:
+        models.update(resolve_field_path(model, path).models)
+    sub_model = get_model_index().get(sub_model_name)
+    if sub_model is not None:
+        models.add(sub_model)
+        _attribute_models(sub_model, sub_attribute, models)
+
+
+def filter_models(tree: Optional[Node], model: Optional[Type[Model]]) -> FrozenSet[Type[Model]]:
+    """
+    Find every model whose rows can change the result of a filter.
+
+    Args:
+        tree: Root node of the filter tree
+        model: Model the filter applies to
+
+    Returns:
+        The model itself, models reached through attribute paths (including
+        many-to-many through models) and `Model___field` subquery models
+
+    Raises:
+        AmbiguousModelError: If a subquery model name is ambiguous
+    """
+    models: Set[Type[Model]] = set() if model is None else {model}
+    nodes = [tree] if tree is not None else []
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, Condition):
+            _attribute_models(model, node.attribute, models)
+        else:
+            nodes.extend(node.children)
+    return frozenset(models)
+
+
+def _version_key(model: Type[Model]) -> str:
+    return f"{KEY_PREFIX}:version:{model._meta.label_lower}"
+
+
+def get_model_versions(models: Iterable[Type[Model]]) -> Tuple[int, ...]:
+    """Return the version counters of models, ordered by model label."""
+    cache = get_cache()
+    keys = sorted(_version_key(model) for model in models)
+    versions = cache.get_many(keys)
+
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        # Counters start from the clock, so a counter evicted from the cache never
+        # comes back with a value that cached entries were stored under
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=None)
+        versions.update(cache.get_many(missing))
+
+    return tuple(versions.get(key, 0) for key in keys)
+
+
+async def aget_model_versions(models: Iterable[Type[Model]]) -> Tuple[int, ...]:
+    """Async version of get_model_versions."""
+    cache = get_cache()
+    keys = sorted(_version_key(model) for model in models)
+    versions = await cache.aget_many(keys)
+
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+        versions.update(await cache.aget_many(missing))
+
+    return tuple(versions.get(key, 0) for key in keys)
+
+
+def bump_model_version(sender: Type[Model], **kwargs) -> None:
+    """
+    Invalidate cached results depending on a model.
+
+    Connected to post_save and post_delete of every model.
+    """
+    if not caching_enabled():
+        return
+    cache = get_cache()
+    key = _version_key(sender)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_through_version(sender: Type[Model], action: str, **kwargs) -> None:
+    """Invalidate cached results depending on a many-to-many through model."""
+    if action.startswith("post_"):
+        bump_model_version(sender)
+
+
+post_save.connect(bump_model_version)
+post_delete.connect(bump_model_version)
+m2m_changed.connect(bump_through_version)
+
+
+def queryset_fingerprint(queryset: QuerySet) -> Optional[str]:
+    """
+    Hash the SQL and parameters of a queryset, ignoring its ordering.
+
+    Returns:
+        Hex digest or None if the queryset cannot be compiled (e.g. it is empty)
+    """
+    query = queryset.query.chain()
+    query.clear_ordering(force=True)
+    try:
+        sql, params = query.get_compiler(using=queryset.db).as_sql()
+    except EmptyResultSet:
+        return None
+    return hashlib.sha256(repr((sql, params)).encode()).hexdigest()
+
+
+def _unpickle_queryset(queryset_class: type, state: dict) -> QuerySet:
+    queryset = queryset_class.__new__(queryset_class)
+    queryset.__setstate__(state)
+    return queryset
+
+
+class CountCachedQuerySetMixin:
+    """
+    Answer count() from the Django cache.
+
+    The key is made of the queryset's SQL fingerprint and the versions of the
+    models the filter touches, the entry lives for COUNT_CACHE_TIMEOUT seconds.
+    """
+
+    _count_cache_models: FrozenSet[Type[Model]] = frozenset()
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._count_cache_models = self._count_cache_models
+        return clone
+
+    def __reduce__(self):
+        # Dynamic subclasses cannot be imported, pickle as the original class
+        state = self.__getstate__()
+        state.pop("_count_cache_models", None)
+        return _unpickle_queryset, (type(self).__bases__[1], state)
+
+    def count_cache_key(self) -> Optional[str]:
+        fingerprint = queryset_fingerprint(self)
+        if fingerprint is None:
+            return None
+        versions = get_model_versions(self._count_cache_models | {self.model})
+        version = ".".join(str(version) for version in versions)
+        return f"{KEY_PREFIX}:count:{self.model._meta.label_lower}:{fingerprint}:{version}"
+
+    def count(self) -> int:
+        if self._result_cache is not None or not count_caching_enabled():
+            return super().count()
+
+        key = self.count_cache_key()
+        if key is None:
+            return super().count()
+
+        cache = get_cache()
+        count = cache.get(key)
+        if count is None:
+            count = super().count()
+            cache.set(key, count, filter_settings["COUNT_CACHE_TIMEOUT"])
+        return count
+
+
+_count_cached_classes: Dict[type, type] = {}
+
+
+def with_count_cache(queryset: QuerySet, models: Iterable[Type[Model]]) -> QuerySet:
+    """
+    Return a copy of the queryset whose count() is cached.
+
+    Args:
+        queryset: Filtered queryset
+        models: Models whose changes invalidate the cached count
+
+    Returns:
+        Queryset of a subclass of the original class, kept by later clones
+    """
+    queryset_class = type(queryset)
+    if issubclass(queryset_class, CountCachedQuerySetMixin):
+        queryset = queryset._chain()
+        queryset._count_cache_models = queryset._count_cache_models | frozenset(models)
+        return queryset
+
+    cached_class = _count_cached_classes.get(queryset_class)
+    if cached_class is None:
+        cached_class = _count_cached_classes.setdefault(
+            queryset_class,
+            type(
+                queryset_class.__name__,
+                (CountCachedQuerySetMixin, queryset_class),
+                {"__module__": queryset_class.__module__},
+            ),
+        )
+
+    queryset = queryset._chain()
+    queryset.__class__ = cached_class
+    queryset._count_cache_models = frozenset(models)
+    return queryset
+
+
+class ResultCacheStats:
+    """Process-wide counters of the result cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped = 0
+        self.bytes_stored = 0
+
+    def record(self, hit: bool, entry_bytes: Optional[int] = None) -> None:
+        """Count a lookup, `entry_bytes` is the size of the entry stored after a miss."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+                return
+            self.misses += 1
+            if entry_bytes is None:
+                self.skipped += 1
+            else:
+                self.stores += 1
+                self.bytes_stored += entry_bytes
+
+    def clear(self) -> None:
+        """Reset the counters."""
+        with self._lock:
+            self.hits = self.misses = self.stores = self.skipped = self.bytes_stored = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return the counters and the hit rate.
+
+        `skipped` counts misses whose result was over RESULT_CACHE_MAX_IDS,
+        `bytes_stored` is the pickled size of all stored entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "skipped": self.skipped,
+                "bytes_stored": self.bytes_stored,
+            }
+
+
+result_cache_stats = ResultCacheStats()
+
+on_settings_change(result_cache_stats.clear)
+
+
+def _pk_queryset(queryset: QuerySet, pks: Tuple) -> QuerySet:
+    if not pks:
+        return queryset.none()
+    threshold = filter_settings["LARGE_IN_LIST_THRESHOLD"]
+    if threshold is not None and len(pks) > threshold:
+        pk_field = queryset.model._meta.pk
+        return queryset.filter(
+            Q(InValues(F("pk"), list(pks), pk_field, filter_settings["IN_LIST_CHUNK_SIZE"]))
+        )
+    return queryset.filter(pk__in=pks)
+
+
+def cached_result(
+    queryset: QuerySet,
+    filtered: QuerySet,
+    models: Iterable[Type[Model]],
+    metrics=NULL_METRICS,
+) -> QuerySet:
+    """
+    Replace a filtered queryset with a primary key lookup on the unfiltered one.
+
+    The primary keys matching `filtered` are read from the cache, or fetched with one
+    query and stored for RESULT_CACHE_TIMEOUT seconds unless there are more than
+    RESULT_CACHE_MAX_IDS of them.
+
+    Args:
+        queryset: Queryset before the filter was applied
+        filtered: Queryset with the filter applied
+        models: Models whose changes invalidate the entry
+        metrics: FilterMetrics receiving the cache outcome and the execute timing
+
+    Returns:
+        `queryset` restricted to the matching primary keys, or `filtered` when it
+        cannot be compiled or matches more than RESULT_CACHE_MAX_IDS rows
+    """
+    fingerprint = queryset_fingerprint(filtered)
+    if fingerprint is None:
+        return filtered
+
+    versions = get_model_versions(frozenset(models) | {filtered.model})
+    key = _result_key(filtered.model, fingerprint, versions)
+
+    cache = get_cache()
+    pks = cache.get(key)
+    hit = pks is not None
+    entry_bytes = None
+    if not hit:
+        with metrics.phase("execute"):
+            pks = tuple(_limited_pks(filtered))
+        entry_bytes = _entry_bytes(pks)
+        if entry_bytes is None:
+            _record_result(metrics, hit, entry_bytes)
+            return filtered
+        cache.set(key, pks, filter_settings["RESULT_CACHE_TIMEOUT"])
+
+    _record_result(metrics, hit, entry_bytes)
+    return _pk_queryset(queryset, pks)
+
+
+async def acached_result(
+    queryset: QuerySet,
+    filtered: QuerySet,
+    models: Iterable[Type[Model]],
+    metrics=NULL_METRICS,
+) -> QuerySet:
+    """Async version of cached_result, using the async cache and ORM APIs."""
+    fingerprint = queryset_fingerprint(filtered)
+    if fingerprint is None:
+        return filtered
+
+    versions = await aget_model_versions(frozenset(models) | {filtered.model})
+    key = _result_key(filtered.model, fingerprint, versions)
+
+    cache = get_cache()
+    pks = await cache.aget(key)
+    hit = pks is not None
+    entry_bytes = None
+    if not hit:
+        with metrics.phase("execute"):
+            pks = tuple([pk async for pk in _limited_pks(filtered)])
+        entry_bytes = _entry_bytes(pks)
+        if entry_bytes is None:
+            _record_result(metrics, hit, entry_bytes)
+            return filtered
+        await cache.aset(key, pks, filter_settings["RESULT_CACHE_TIMEOUT"])
+
+    _record_result(metrics, hit, entry_bytes)
+    return _pk_queryset(queryset, pks)
+
+
+def _result_key(model: Type[Model], fingerprint: str, versions: Tuple[int, ...]) -> str:
+    version = ".".join(str(version) for version in versions)
+    return f"{KEY_PREFIX}:pks:{model._meta.label_lower}:{fingerprint}:{version}"
+
+
+def _limited_pks(filtered: QuerySet) -> QuerySet:
+    """Return the primary keys of `filtered`, one more than RESULT_CACHE_MAX_IDS at most."""
+    pks = filtered.values_list("pk", flat=True)
+    max_ids = filter_settings["RESULT_CACHE_MAX_IDS"]
+    if max_ids is not None:
+        # The extra row tells a result that is over the limit from one that fits
+        pks = pks[: max_ids + 1]
+    return pks
+
+
+def _entry_bytes(pks: Tuple) -> Optional[int]:
+    """Return the pickled size of an entry, None if it is over RESULT_CACHE_MAX_IDS."""
+    max_ids = filter_settings["RESULT_CACHE_MAX_IDS"]
+    if max_ids is not None and len(pks) > max_ids:
+        return None
+    return len(pickle.dumps(pks, pickle.HIGHEST_PROTOCOL))
+
+
+def _record_result(metrics, hit: bool, entry_bytes: Optional[int]) -> None:
+    result_cache_stats.record(hit, entry_bytes)
+    if metrics.enabled:
+        metrics.result_cache_hit = hit
+        metrics.result_cache_bytes = entry_bytes
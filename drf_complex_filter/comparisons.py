@@ -1,34 +1,98 @@
-from typing import Optional
+from typing import Any, Optional, Tuple, Type
 
 from django.db.models import Model, Q, fields
 
+from drf_complex_filter.introspection import resolve_field_path
+from drf_complex_filter.large_lists import in_values_query
+from drf_complex_filter.search import search_query
 from drf_complex_filter.settings import filter_settings
 
 
+def wildcard_comparison(value: Any) -> Tuple[Any, str]:
+    """
+    Pick the lookup of a `*` / `!` value.
+
+    With WILDCARD_SYNTAX on, `abc*` is a prefix match (istartswith), `*abc` a suffix
+    match (iendswith) and `*abc*` or `abc` a substring match (icontains). Prefix
+    matches can use an index, substring matches cannot.
+
+    Returns:
+        Tuple of (value without the wildcards, lookup name)
+    """
+    if not filter_settings["WILDCARD_SYNTAX"] or not isinstance(value, str) or len(value) < 2:
+        return value, "icontains"
+
+    leading, trailing = value.startswith("*"), value.endswith("*")
+    if leading and trailing:
+        return value[1:-1], "icontains"
+    if trailing:
+        return value[:-1], "istartswith"
+    if leading:
+        return value[1:], "iendswith"
+    return value, "icontains"
+
+
 class CommonComparison:
+    request_dependent = False
+
     def get_operators(self):
         return {
             "=": self.equal,
             "!=": self.not_equal,
-            "*": lambda f, v, r=None, m=None: self.get_q_object(
-                f, v, r, m, "icontains"
-            ),
+            "*": self.contains,
             "!": self.get_not_contains,
+            "startswith": lambda f, v, r=None, m=None: self.get_q_object(
+                f, v, r, m, "startswith"
+            ),
+            "istartswith": lambda f, v, r=None, m=None: self.get_q_object(
+                f, v, r, m, "istartswith"
+            ),
+            "endswith": lambda f, v, r=None, m=None: self.get_q_object(f, v, r, m, "endswith"),
+            "iendswith": lambda f, v, r=None, m=None: self.get_q_object(
+                f, v, r, m, "iendswith"
+            ),
             ">": lambda f, v, r=None, m=None: self.get_q_object(f, v, r, m, "gt"),
             ">=": lambda f, v, r=None, m=None: self.get_q_object(f, v, r, m, "gte"),
             "<": lambda f, v, r=None, m=None: self.get_q_object(f, v, r, m, "lt"),
             "<=": lambda f, v, r=None, m=None: self.get_q_object(f, v, r, m, "lte"),
-            "in": lambda f, v, r=None, m=None: Q(**{f"{f}__in": v}),
-            "not_in": lambda f, v, r=None, m=None: ~Q(**{f"{f}__in": v}),
+            "in": self.in_list,
+            "not_in": self.not_in_list,
+            "search": self.search,
         }
 
+    def search(self, field: str, value=None, request=None, model: Model = None):
+        query = search_query(model, field, value)
+        if query is None:
+            # Not a search field, e.g. a column without Meta.search_fields
+            return self.get_q_object(field, value, request, model, "icontains")
+        return query
+
+    def in_list(self, field: str, value=None, request=None, model: Model = None):
+        return self._list_lookup(field, value, model, negate=False)
+
+    def not_in_list(self, field: str, value=None, request=None, model: Model = None):
+        return self._list_lookup(field, value, model, negate=True)
+
+    @staticmethod
+    def _list_lookup(field: str, value, model: Model, negate: bool) -> Q:
+        if not isinstance(value, (list, tuple)):
+            # e.g. a queryset of IDs built for a Model___field subquery
+            query = Q(**{f"{field}__in": value})
+            return ~query if negate else query
+
+        return in_values_query(
+            resolve_field_path(model, field),
+            field,
+            value,
+            negate,
+            filter_settings["LARGE_IN_LIST_THRESHOLD"],
+            filter_settings["IN_LIST_CHUNK_SIZE"],
+        )
+
     def equal(self, field: str, value=None, request=None, model: Model = None):
         if value == "":
             query = Q(**{f"{field}__isnull": True})
-            _, target_field = self._get_field_model_by_name(model, field)
-            if isinstance(target_field, fields.CharField) or isinstance(
-                target_field, fields.TextField
-            ):
+            if resolve_field_path(model, field).is_text:
                 query = query | Q(**{f"{field}__exact": ""})
             return query
         return Q(**{f"{field}": value})
@@ -36,18 +100,20 @@ class CommonComparison:
     def not_equal(self, field: str, value=None, request=None, model: Model = None):
         if value == "":
             query = Q(**{f"{field}__isnull": False})
-            _, target_field = self._get_field_model_by_name(model, field)
-            if isinstance(target_field, fields.CharField) or isinstance(
-                target_field, fields.TextField
-            ):
+            if resolve_field_path(model, field).is_text:
                 query = query & ~Q(**{f"{field}": ""})
             return query
         return ~Q(**{f"{field}": value})
 
+    def contains(self, field: str, value=None, request=None, model: Model = None):
+        value, comparison = wildcard_comparison(value)
+        return self.get_q_object(field, value, request, model, comparison)
+
     def get_not_contains(
         self, field: str, value=None, request=None, model: Model = None
     ):
-        result = self.get_q_object(field, value, request, model, "icontains")
+        value, comparison = wildcard_comparison(value)
+        result = self.get_q_object(field, value, request, model, comparison)
         (query, annotation) = result if isinstance(result, tuple) else (result, {})
         return ~query if query else query, annotation
 
@@ -59,27 +125,18 @@ class CommonComparison:
         model: Model = None,
         comparison: str = "icontains",
     ):
-        target_model, field_model = self._get_field_model_by_name(model, field)
-        if not getattr(field_model, "is_relation", None):
+        field_path = resolve_field_path(model, field)
+        if not field_path.is_relation:
             return Q(**{f"{field}__{comparison}": value})
 
-        return self._related_object_lookup(target_model, field, value, comparison)
+        return self._related_object_lookup(field_path.model, field, value, comparison)
 
     @staticmethod
-    def _get_field_model_by_name(model, column_name: str) -> Optional[fields.Field]:
-        column_path = column_name.split("__")
-
-        field = None
-        current_model = model
-        for current_column_name in column_path:
-            try:
-                field = current_model._meta.get_field(current_column_name)
-                if field.remote_field:
-                    current_model = field.remote_field.model
-            except Exception:
-                break
-
-        return current_model, field
+    def _get_field_model_by_name(
+        model, column_name: str
+    ) -> Tuple[Optional[Type[Model]], Optional[fields.Field]]:
+        field_path = resolve_field_path(model, column_name)
+        return field_path.model, field_path.field
 
     def _related_object_lookup(self, model, field_path, value, comparison):
         lookup_by_model = getattr(model._meta, "lookup_by_model", None)
@@ -94,6 +151,8 @@ class CommonComparison:
 
 
 class DynamicComparison:
+    request_dependent = True
+
     def get_operators(self):
         return {
             "me": self.current_user,
@@ -0,0 +1,105 @@
+"""
+Static cost model of a filter tree.
+
+The cost is computed from the parsed tree before any Q object or queryset is built,
+so filters that are too expensive can be rejected without touching the database.
+"""
+
+from typing import Any, Dict, NamedTuple, Optional, Type
+
+from django.db.models import Model
+
+from drf_complex_filter.exceptions import FilterCostExceeded
+from drf_complex_filter.introspection import (
+    get_model_index,
+    resolve_field_path,
+    split_model_reference,
+)
+from drf_complex_filter.tree import Condition, Node
+
+LIST_OPERATORS = ("in", "not_in")
+
+
+class FilterCost(NamedTuple):
+    """
+    Counters describing how expensive a filter is.
+
+    Attributes:
+        nodes: Number of conditions and and/or groups
+        depth: Nesting depth, a single condition has depth 1
+        joins: Relations crossed by attribute paths
+        subqueries: Number of `Model___field` subqueries
+        in_list_size: Size of the largest `in`/`not_in` value list
+    """
+
+    nodes: int = 0
+    depth: int = 0
+    joins: int = 0
+    subqueries: int = 0
+    in_list_size: int = 0
+
+
+def _attribute_cost(model: Optional[Type[Model]], attribute: str) -> FilterCost:
+    if "___" not in attribute:
+        return FilterCost(joins=resolve_field_path(model, attribute).joins)
+
+    main_attribute, sub_attribute = attribute.split("___", maxsplit=1)
+    path, sub_model_name = split_model_reference(main_attribute)
+    sub_cost = _attribute_cost(get_model_index().get(sub_model_name), sub_attribute)
+    joins = resolve_field_path(model, path).joins if path else 0
+    return FilterCost(
+        joins=joins + sub_cost.joins,
+        subqueries=sub_cost.subqueries + 1,
+    )
+
+
+def estimate_cost(tree: Optional[Node], model: Optional[Type[Model]] = None) -> FilterCost:
+    """
+    Compute the cost of a filter tree.
+
+    Args:
+        tree: Root node of the filter tree
+        model: Model the filter applies to, used to count joins
+
+    Returns:
+        FilterCost of the tree
+
+    Raises:
+        AmbiguousModelError: If a subquery model name is ambiguous
+    """
+    if tree is None:
+        return FilterCost()
+
+    if isinstance(tree, Condition):
+        cost = _attribute_cost(model, tree.attribute)
+        in_list_size = 0
+        if tree.operator in LIST_OPERATORS and isinstance(tree.value, (list, tuple)):
+            in_list_size = len(tree.value)
+        return cost._replace(nodes=1, depth=1, in_list_size=in_list_size)
+
+    nodes, depth, joins, subqueries, in_list_size = 1, 0, 0, 0, 0
+    for child in tree.children:
+        child_cost = estimate_cost(child, model)
+        nodes += child_cost.nodes
+        depth = max(depth, child_cost.depth)
+        joins += child_cost.joins
+        subqueries += child_cost.subqueries
+        in_list_size = max(in_list_size, child_cost.in_list_size)
+    return FilterCost(nodes, depth + 1, joins, subqueries, in_list_size)
+
+
+def check_cost(cost: FilterCost, limits: Dict[str, Any]) -> None:
+    """
+    Compare a cost with the configured limits.
+
+    Args:
+        cost: Cost of the filter
+        limits: Mapping of FilterCost field name to maximum, None means unlimited
+
+    Raises:
+        FilterCostExceeded: If any counter is over its limit
+    """
+    for limit in FilterCost._fields:
+        maximum = limits.get(limit)
+        if maximum is not None and getattr(cost, limit) > maximum:
+            raise FilterCostExceeded(cost, limit, maximum)
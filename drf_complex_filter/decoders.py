@@ -0,0 +1,169 @@
+"""
+Decoding and encoding of the `filters` query parameter.
+
+The JSON decoder is configurable with JSON_DECODER. By default orjson or ujson is
+used when installed, with the standard library as fallback. Payload size and JSON
+nesting depth are checked before decoding.
+
+Besides JSON (the dictionary or the compact array form, see tree.py), the parameter
+may hold the compact form deflated and base64url encoded, marked by a leading `~`.
+encode_filter produces both compact forms.
+"""
+
+import base64
+import binascii
+import json
+import re
+import zlib
+from typing import Any, Callable, Optional, Union
+
+from django.utils.module_loading import import_string
+
+from drf_complex_filter.exceptions import FilterPayloadTooLarge
+from drf_complex_filter.tree import Node, parse_filters, tree_to_compact
+
+FAST_DECODERS = ("orjson.loads", "ujson.loads")
+
+#: Leading character of a compressed filter, never the first character of JSON
+COMPRESSED_PREFIX = "~"
+
+#: Maximum size of the decompressed JSON when MAX_FILTER_BYTES is not set
+DEFAULT_MAX_DECOMPRESSED_BYTES = 1024 * 1024
+
+_STRING_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"')
+_BRACKET_PATTERN = re.compile(r"[\[\]{}]")
+
+
+def get_json_decoder(path: Optional[str] = None) -> Callable[[Union[str, bytes]], Any]:
+    """
+    Import the JSON decoder.
+
+    Args:
+        path: Dotted path to a `loads`-like callable, None picks the fastest installed one
+
+    Returns:
+        Decoder callable
+    """
+    if path:
+        return import_string(path)
+
+    for decoder_path in FAST_DECODERS:
+        try:
+            return import_string(decoder_path)
+        except ImportError:
+            continue
+    return json.loads
+
+
+def json_depth(payload: Union[str, bytes]) -> int:
+    """Return the maximum nesting depth of arrays and objects in a JSON document."""
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8", errors="replace")
+
+    depth = max_depth = 0
+    for bracket in _BRACKET_PATTERN.findall(_STRING_PATTERN.sub("", payload)):
+        if bracket in "[{":
+            depth += 1
+            max_depth = max(max_depth, depth)
+        else:
+            depth -= 1
+    return max_depth
+
+
+def check_payload(
+    payload: Union[str, bytes],
+    max_bytes: Optional[int] = None,
+    max_depth: Optional[int] = None,
+) -> None:
+    """
+    Check the raw payload against the size and depth limits.
+
+    Raises:
+        FilterPayloadTooLarge: If the payload is over one of the limits
+    """
+    if max_bytes is not None:
+        size = len(payload) if isinstance(payload, bytes) else len(payload.encode("utf-8"))
+        if size > max_bytes:
+            raise FilterPayloadTooLarge(
+                f"Filter is too large: {size} bytes, maximum is {max_bytes}"
+            )
+
+    if max_depth is not None:
+        depth = json_depth(payload)
+        if depth > max_depth:
+            raise FilterPayloadTooLarge(
+                f"Filter is nested too deeply: depth is {depth}, maximum is {max_depth}"
+            )
+
+
+def encode_filter(filters: Union[dict, list, Node, None], compress: bool = False) -> str:
+    """
+    Encode a filter into the compact array form for the `filters` query parameter.
+
+    Args:
+        filters: Filter dictionary, compact array or parsed tree
+        compress: Deflate and base64url encode the JSON, for large filters
+
+    Returns:
+        Compact JSON, or `~` followed by the compressed JSON; empty for an empty filter
+
+    Example:
+        >>> encode_filter({"type": "operator", "data": {"attribute": "age", "operator": ">", "value": 18}})
+        '["age",">",18]'
+    """
+    if isinstance(filters, (dict, list)):
+        filters = parse_filters(filters)
+    compact = tree_to_compact(filters)
+    if compact is None:
+        return ""
+
+    payload = json.dumps(compact, separators=(",", ":"), ensure_ascii=False)
+    if not compress:
+        return payload
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    deflated = compressor.compress(payload.encode("utf-8")) + compressor.flush()
+    return COMPRESSED_PREFIX + base64.urlsafe_b64encode(deflated).rstrip(b"=").decode("ascii")
+
+
+def is_compressed(payload: Union[str, bytes]) -> bool:
+    """Tell whether a payload is a compressed filter."""
+    if isinstance(payload, bytes):
+        return payload.lstrip().startswith(COMPRESSED_PREFIX.encode("ascii"))
+    return payload.lstrip().startswith(COMPRESSED_PREFIX)
+
+
+def decompress_filter(payload: Union[str, bytes], max_bytes: Optional[int] = None) -> bytes:
+    """
+    Decode a compressed filter back into JSON.
+
+    Args:
+        payload: Compressed filter, with its `~` prefix
+        max_bytes: Maximum size of the decompressed JSON, None uses
+            DEFAULT_MAX_DECOMPRESSED_BYTES
+
+    Returns:
+        JSON document
+
+    Raises:
+        ValueError: If the payload is not valid base64url or DEFLATE data
+        FilterPayloadTooLarge: If the JSON is over max_bytes
+    """
+    if max_bytes is None:
+        # A few kilobytes of DEFLATE data can expand to gigabytes
+        max_bytes = DEFAULT_MAX_DECOMPRESSED_BYTES
+    if isinstance(payload, str):
+        payload = payload.encode("ascii", errors="replace")
+    data = payload.strip()[len(COMPRESSED_PREFIX):]
+    try:
+        deflated = base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        # Decompressing one byte more than allowed tells that the limit is exceeded
+        document = decompressor.decompress(deflated, max_bytes + 1)
+    except (binascii.Error, zlib.error) as error:
+        raise ValueError(f"Invalid compressed filter: {error}")
+
+    if len(document) > max_bytes or decompressor.unconsumed_tail:
+        raise FilterPayloadTooLarge(
+            f"Filter is too large once decompressed, maximum is {max_bytes} bytes"
+        )
+    return document
@@ -0,0 +1,119 @@
+"""
+Memoization of value functions.
+
+A tree with ten `{"func": "now"}` leaves used to call the function ten times and
+get ten different timestamps. Values are now computed once per evaluation context:
+
+- one EvaluationContext per request (stored on the request) or per filter call
+  without a request, shared with the `Model___field` subqueries of the filter
+- one process-wide TimeBucketCache for functions declared with a time bucket, so
+  every request in the same bucket filters by the same value and can hit the
+  result cache
+
+Pure functions are not memoized here, their value is part of the compiled plan.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, Type
+
+from django.db.models import Model
+
+from drf_complex_filter.settings import on_settings_change
+
+#: Upper bound of memoized values, kwargs come from client input
+MAX_MEMOIZED_VALUES = 1024
+
+
+def function_key(
+    name: str, kwargs: Dict[str, Any], model: Optional[Type[Model]] = None
+) -> Optional[Hashable]:
+    """
+    Return the memoization key of a function call.
+
+    Returns:
+        Hashable key, or None when the kwargs cannot be serialized
+    """
+    try:
+        arguments = json.dumps(kwargs, sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return None
+    return name, arguments, model
+
+
+class EvaluationContext:
+    """Values of the function calls made while filtering for one request."""
+
+    def __init__(self):
+        self.values: Dict[Hashable, Any] = {}
+        self.calls = 0
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the memoized value of a call, computing it on first use."""
+        try:
+            return self.values[key]
+        except KeyError:
+            pass
+        value = compute()
+        self.calls += 1
+        if len(self.values) < MAX_MEMOIZED_VALUES:
+            self.values[key] = value
+        return value
+
+
+def get_request_context(request) -> Optional[EvaluationContext]:
+    """Return the evaluation context stored on a request, creating it on first use."""
+    if request is None:
+        return None
+    context = getattr(request, "complex_filter_context", None)
+    if context is None:
+        context = EvaluationContext()
+        request.complex_filter_context = context
+    return context
+
+
+def floor_to_bucket(value: Any, seconds: float) -> Any:
+    """Truncate a datetime to the start of its bucket, other values are returned as is."""
+    if not isinstance(value, datetime):
+        return value
+    return value - timedelta(seconds=value.timestamp() % seconds)
+
+
+async def afloor_to_bucket(awaitable: Awaitable, seconds: float) -> Any:
+    """Async version of floor_to_bucket for the result of an async function."""
+    return floor_to_bucket(await awaitable, seconds)
+
+
+class TimeBucketCache:
+    """Thread-safe process-wide values of time-bucketed functions."""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._values: Dict[Hashable, Tuple[int, Any]] = {}
+        self._lock = threading.Lock()
+        self.clock = clock
+
+    def get(self, key: Hashable, seconds: float, compute: Callable[[], Any]) -> Any:
+        """Return the value of a call for the current bucket, computing it once per bucket."""
+        bucket = int(self.clock() // seconds)
+        with self._lock:
+            cached = self._values.get(key)
+        if cached is not None and cached[0] == bucket:
+            return cached[1]
+
+        value = floor_to_bucket(compute(), seconds)
+        with self._lock:
+            if key in self._values or len(self._values) < MAX_MEMOIZED_VALUES:
+                self._values[key] = (bucket, value)
+        return value
+
+    def clear(self) -> None:
+        """Forget every value."""
+        with self._lock:
+            self._values.clear()
+
+
+time_bucket_cache = TimeBucketCache()
+
+on_settings_change(time_bucket_cache.clear)
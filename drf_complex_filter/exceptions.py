@@ -0,0 +1,26 @@
+class ComplexFilterError(ValueError):
+    """Base class for errors caused by an invalid filter."""
+
+
+class AmbiguousModelError(ComplexFilterError):
+    """A bare model name in a `___` subquery matches several models."""
+
+
+class FilterPayloadTooLarge(ComplexFilterError):
+    """The raw filter is over MAX_FILTER_BYTES or MAX_FILTER_JSON_DEPTH."""
+
+
+class PredicateError(ComplexFilterError):
+    """The filter cannot be evaluated in memory, see drf_complex_filter.predicates."""
+
+
+class FilterCostExceeded(ComplexFilterError):
+    """The filter exceeds one of the COST_LIMITS."""
+
+    def __init__(self, cost, limit: str, maximum: int):
+        self.cost = cost
+        self.limit = limit
+        self.maximum = maximum
+        super().__init__(
+            f"Filter is too complex: {limit} is {getattr(cost, limit)}, maximum is {maximum}"
+        )
@@ -1,13 +1,27 @@
-from typing import Optional, Type
+import json
+from typing import Any, Dict, Optional, Type
 
+from django.core.exceptions import EmptyResultSet
+from django.db import DatabaseError
 from django.db.models import Model, QuerySet
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.request import Request
+from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 
+from drf_complex_filter.caching import count_caching_enabled, with_count_cache
+from drf_complex_filter.exceptions import ComplexFilterError
+from drf_complex_filter.metrics import FilterMetrics
+from drf_complex_filter.registry import get_registry
+from drf_complex_filter.saved import SavedFilter
 from drf_complex_filter.settings import filter_settings
 from drf_complex_filter.utils import ComplexFilter
 
 
+DEBUG_HEADER = "X-Complex-Filter-Debug"
+
+
 class ComplexQueryFilter:
     """
     A Django REST Framework filter backend that enables complex filtering through JSON-based query parameters.
@@ -30,6 +44,9 @@ class ComplexQueryFilter:
         """
         Apply the complex filter to the queryset based on request parameters.
 
+        A saved filter named by the SAVED_FILTER_PARAMETER query parameter is ANDed
+        with the filter of the QUERY_PARAMETER query parameter.
+
         Args:
             request: The incoming request containing filter parameters
             queryset: The initial queryset to filter
@@ -38,19 +55,140 @@ class ComplexQueryFilter:
         Returns:
             QuerySet: Filtered queryset based on the complex filter conditions
 
+        Raises:
+            ValidationError: If the filter is invalid or over the COST_LIMITS budget
+
         Example:
             GET /api/users/?filters={"type":"operator","data":{"attribute":"age","operator":">","value":18}}
+            GET /api/users/?saved_filter=42
         """
         filter_string: Optional[str] = request.query_params.get(
             filter_settings["QUERY_PARAMETER"], None
         )
 
+        complex_filter = self.get_complex_filter(request, queryset, view)
+        saved_filter = self.get_saved_filter(request, complex_filter)
+        base_queryset = queryset
+        try:
+            queryset = complex_filter.filter_queryset(
+                queryset=queryset,
+                filters=filter_string,
+                request=request,
+                saved_filter=saved_filter,
+            )
+        except ComplexFilterError as error:
+            raise ValidationError({filter_settings["QUERY_PARAMETER"]: [str(error)]})
+
+        filtered = bool(filter_string or saved_filter)
+        if filtered and complex_filter.debug_metrics is not None:
+            request.complex_filter_debug = self.get_debug_info(
+                base_queryset, queryset, complex_filter.debug_metrics, self._explain(queryset)
+            )
+
+        return self._finalize(request, queryset, complex_filter, filtered)
+
+    def get_complex_filter(
+        self, request: Request, queryset: QuerySet, view: Type[ViewSet]
+    ) -> ComplexFilter:
+        """
+        Create the ComplexFilter for a request.
+
+        When the request asks for debug output and passes DEBUG_PERMISSION, the
+        filter records phase timings into `complex_filter.debug_metrics`.
+        """
         complex_filter = ComplexFilter(model=queryset.model)
-        queryset = complex_filter.filter_queryset(
-            queryset=queryset,
-            filters=filter_string,
-            request=request
-        )
+        complex_filter.debug_metrics = None
+        if self.debug_allowed(request, view):
+            complex_filter.debug_metrics = complex_filter.metrics = FilterMetrics(
+                queryset.model, complex_filter.registry.metrics_callback
+            )
+        return complex_filter
+
+    def get_saved_filter(
+        self, request: Request, complex_filter: ComplexFilter
+    ) -> Optional[SavedFilter]:
+        """
+        Resolve the saved filter named by the SAVED_FILTER_PARAMETER query parameter.
+
+        Raises:
+            ValidationError: If the saved filter does not exist or is for another model
+        """
+        parameter = filter_settings["SAVED_FILTER_PARAMETER"]
+        key = request.query_params.get(parameter)
+        if not key:
+            return None
+        try:
+            return complex_filter.resolve_saved_filter(key)
+        except ComplexFilterError as error:
+            raise ValidationError({parameter: [str(error)]})
+
+    async def aget_saved_filter(
+        self, request: Request, complex_filter: ComplexFilter
+    ) -> Optional[SavedFilter]:
+        """Async version of get_saved_filter."""
+        parameter = filter_settings["SAVED_FILTER_PARAMETER"]
+        key = request.query_params.get(parameter)
+        if not key:
+            return None
+        try:
+            return await complex_filter.aresolve_saved_filter(key)
+        except ComplexFilterError as error:
+            raise ValidationError({parameter: [str(error)]})
+
+    def debug_allowed(self, request: Request, view: Type[ViewSet]) -> bool:
+        """Tell whether the request asked for debug output and may get it."""
+        permission = get_registry().debug_permission
+        if permission is None or not request.query_params.get(filter_settings["DEBUG_PARAMETER"]):
+            return False
+        return bool(permission(request, view))
+
+    @staticmethod
+    def get_debug_info(
+        base_queryset: QuerySet, queryset: QuerySet, metrics: FilterMetrics, explain: str
+    ) -> Dict[str, Any]:
+        """Collect the SQL, added annotations, EXPLAIN output and timings of a filter."""
+        try:
+            sql = str(queryset.query)
+        except EmptyResultSet:
+            sql = ""
+        annotations = {
+            name: repr(annotation)
+            for name, annotation in queryset.query.annotations.items()
+            if name not in base_queryset.query.annotations
+        }
+        return {
+            "sql": sql,
+            "annotations": annotations,
+            "explain": explain,
+            "timings_ms": {
+                phase: round(seconds * 1000, 3) for phase, seconds in metrics.timings.items()
+            },
+            "shape": metrics.shape,
+            "nodes": metrics.node_count,
+            "counters": dict(metrics.counters),
+            "plan_cache_hit": metrics.plan_cache_hit,
+        }
+
+    @staticmethod
+    def _explain(queryset: QuerySet) -> str:
+        try:
+            return queryset.explain()
+        except (DatabaseError, EmptyResultSet) as error:
+            return f"{type(error).__name__}: {error}"
+
+    def _finalize(
+        self,
+        request: Request,
+        queryset: QuerySet,
+        complex_filter: ComplexFilter,
+        filtered: bool,
+    ) -> QuerySet:
+        # Exposed for logging, e.g. in the view's finalize_response
+        request.complex_filter_cost = complex_filter.cost
+
+        if filtered and count_caching_enabled():
+            # Pagination counts the same filtered rows on every page
+            queryset = with_count_cache(queryset, complex_filter.models)
 
         return queryset
 
@@ -59,3 +197,122 @@ class ComplexQueryFilter:
         Define the schema operation parameters for inclusion in the OpenAPI schema.
         """
         return []
+
+
+class AsyncComplexQueryFilter(ComplexQueryFilter):
+    """
+    ComplexQueryFilter for async views.
+
+    `afilter_queryset` awaits async value functions and comparisons, and reads the
+    result cache with the async cache and ORM APIs. `filter_queryset` stays available
+    for sync views; it raises a 400 for filters that need an async function.
+
+    Usage:
+        class UserViewSet(adrf.viewsets.ModelViewSet):
+            filter_backends = [AsyncComplexQueryFilter]
+
+            async def list(self, request):
+                queryset = await AsyncComplexQueryFilter().afilter_queryset(
+                    request, self.get_queryset(), self
+                )
+                ...
+    """
+
+    async def afilter_queryset(
+        self,
+        request: Request,
+        queryset: QuerySet,
+        view: Type[ViewSet]
+    ) -> QuerySet:
+        """Async version of filter_queryset."""
+        filter_string: Optional[str] = request.query_params.get(
+            filter_settings["QUERY_PARAMETER"], None
+        )
+
+        complex_filter = self.get_complex_filter(request, queryset, view)
+        saved_filter = await self.aget_saved_filter(request, complex_filter)
+        base_queryset = queryset
+        try:
+            queryset = await complex_filter.afilter_queryset(
+                queryset=queryset,
+                filters=filter_string,
+                request=request,
+                saved_filter=saved_filter,
+            )
+        except ComplexFilterError as error:
+            raise ValidationError({filter_settings["QUERY_PARAMETER"]: [str(error)]})
+
+        filtered = bool(filter_string or saved_filter)
+        if filtered and complex_filter.debug_metrics is not None:
+            request.complex_filter_debug = self.get_debug_info(
+                base_queryset, queryset, complex_filter.debug_metrics,
+                await self._aexplain(queryset),
+            )
+
+        return self._finalize(request, queryset, complex_filter, filtered)
+
+    @staticmethod
+    async def _aexplain(queryset: QuerySet) -> str:
+        try:
+            return await queryset.aexplain()
+        except (DatabaseError, EmptyResultSet) as error:
+            return f"{type(error).__name__}: {error}"
+
+
+class ComplexFilterDebugMixin:
+    """
+    View mixin sending the debug output of ComplexQueryFilter in a response header.
+
+    The output is JSON in the DEBUG_HEADER header (`X-Complex-Filter-Debug`); it is
+    only present when the request passed DEBUG_PERMISSION and asked for it with
+    DEBUG_PARAMETER.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        debug_info = getattr(request, "complex_filter_debug", None)
+        if debug_info is not None:
+            response[DEBUG_HEADER] = json.dumps(debug_info, default=str)
+        return response
+
+
+class ComplexFilterCountMixin:
+    """
+    ViewSet mixin adding a `filter-counts` action that counts many filters at once.
+
+    The filters are a JSON object (name to filter) or a list, sent in the body of a
+    POST or in the QUERY_PARAMETER of a GET. Other filter backends of the view are
+    applied first, and all counts come from one query, see ComplexFilter.count_many.
+
+    Usage:
+        class OrderViewSet(ComplexFilterCountMixin, ModelViewSet):
+            filter_backends = [ComplexQueryFilter]
+
+        GET /api/orders/filter-counts/?filters={"open":{...},"late":{...}}
+    """
+
+    @action(detail=False, methods=["get", "post"], url_path="filter-counts")
+    def filter_counts(self, request: Request, *args, **kwargs) -> Response:
+        parameter = filter_settings["QUERY_PARAMETER"]
+        queryset = self.get_queryset()
+        for backend in self.filter_backends:
+            if not issubclass(backend, ComplexQueryFilter):
+                queryset = backend().filter_queryset(request, queryset, self)
+
+        complex_filter = ComplexFilter(model=queryset.model)
+        try:
+            filters = self._get_count_filters(request, complex_filter)
+            counts = complex_filter.count_many(queryset, filters, request)
+        except ComplexFilterError as error:
+            raise ValidationError({parameter: [str(error)]})
+        return Response(counts)
+
+    @staticmethod
+    def _get_count_filters(request: Request, complex_filter: ComplexFilter) -> Any:
+        filters = request.data
+        if request.method == "GET":
+            filter_string = request.query_params.get(filter_settings["QUERY_PARAMETER"], "")
+            filters = complex_filter._decode_filters(filter_string)
+        if not isinstance(filters, (dict, list)):
+            raise ComplexFilterError("Expected an object or a list of filters")
+        return filters
@@ -1,9 +1,53 @@
 from datetime import datetime
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, NamedTuple, Optional
 
 from django.utils.timezone import now
 
 
+class FunctionPolicy(NamedTuple):
+    """
+    What the value of a function depends on, declared with value_function.
+
+    Attributes:
+        pure: The value only depends on the kwargs, it is computed once when the
+            filter is compiled and kept in the plan cache
+        time_bucket: The value only depends on the kwargs and the time, it is
+            computed once per process for every bucket of that many seconds.
+            Datetime values are truncated to the start of the bucket.
+        uses_model: The value depends on the filtered model. When False, one value
+            is shared by the filter and its `Model___field` subqueries.
+    """
+
+    pure: bool = False
+    time_bucket: Optional[float] = None
+    uses_model: bool = True
+
+
+def value_function(
+    pure: bool = False, time_bucket: Optional[float] = None, uses_model: bool = True
+) -> Callable[[Callable], Callable]:
+    """
+    Declare what a value function depends on.
+
+    Functions are called at most once per request for each set of kwargs. Without
+    a declaration the value is assumed to depend on the request and the model.
+
+    Example:
+        "rate": value_function(pure=True)(lambda currency, **kwargs: RATES[currency])
+    """
+
+    def decorator(func: Callable) -> Callable:
+        func.function_policy = FunctionPolicy(pure, time_bucket, uses_model)
+        return func
+
+    return decorator
+
+
+def get_function_policy(func: Callable) -> FunctionPolicy:
+    """Return the policy declared with value_function, or the default one."""
+    return getattr(func, "function_policy", None) or FunctionPolicy()
+
+
 class DateFunctions:
     """
     Built-in date-related functions for dynamic value computation in filters.
@@ -30,6 +74,8 @@ class DateFunctions:
             }
         """
         return {
-            "now": lambda **kwargs: now(),
-            "date": lambda year, month, day, **kwargs: datetime(year, month, day),
+            "now": value_function(uses_model=False)(lambda **kwargs: now()),
+            "date": value_function(pure=True)(
+                lambda year, month, day, **kwargs: datetime(year, month, day)
+            ),
         }
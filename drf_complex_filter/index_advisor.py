@@ -0,0 +1,252 @@
+"""
+Cross-check of recorded filter usage against the indexes models declare.
+
+Each recorded (model, attribute path, operator) is resolved to the column it
+compares and to the kind of index that could serve it:
+
+- btree: equality, range and `in` comparisons
+- prefix: `startswith`, which compiles to `column LIKE abc%` and can use a B-tree
+  index with a pattern operator class (PostgreSQL adds one for CharField/TextField
+  with `db_index` or `unique`)
+- upper_prefix: `istartswith` and `abc*` wildcard values, which compile to
+  `UPPER(column) LIKE ABC%` and need a pattern operator class index on `UPPER(column)`
+- trigram: `*` / `!` (icontains) and suffix matches, which compile to
+  `UPPER(column) LIKE %...%` and can only use a PostgreSQL trigram index on
+  `UPPER(column)`
+
+Columns already covered by a primary key, `unique`, `db_index`, a foreign key or the
+leading field of `Meta.indexes` / unique constraints count as indexed for btree.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple, Type
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Field, Model, UniqueConstraint
+
+from drf_complex_filter.introspection import resolve_field_path
+from drf_complex_filter.settings import filter_settings
+from drf_complex_filter.usage import UsageKey
+
+#: Operators whose comparison compiles to `icontains`
+CONTAINS_OPERATORS = ("*", "!")
+
+#: Prefix match operators, served by pattern operator class indexes
+PREFIX_OPERATORS = ("startswith", "istartswith")
+
+#: Suffix match operators, served like `icontains` by trigram indexes only
+SUFFIX_OPERATORS = ("endswith", "iendswith")
+
+#: Operators comparing the lookup field of a relation instead of its key
+LOOKUP_OPERATORS = CONTAINS_OPERATORS + PREFIX_OPERATORS + SUFFIX_OPERATORS
+
+#: Full-text operators, indexed through `Meta.search_fields` instead
+SEARCH_OPERATORS = ("search",)
+
+
+class IndexAdvice(NamedTuple):
+    """
+    Usage of one column with one kind of index.
+
+    Attributes:
+        model: Model owning the column
+        field: Compared field
+        kind: "btree", "prefix", "upper_prefix" or "trigram"
+        operators: Recorded count per operator
+        indexed: Whether an index of that kind exists
+        proposal: `migrations.AddIndex(...)` code, empty when indexed
+    """
+
+    model: Type[Model]
+    field: Field
+    kind: str
+    operators: Dict[str, int]
+    indexed: bool
+    proposal: str
+
+    @property
+    def count(self) -> int:
+        return sum(self.operators.values())
+
+
+def index_kind(operator: str) -> str:
+    """Return the kind of index that serves an operator."""
+    if operator in CONTAINS_OPERATORS or operator in SUFFIX_OPERATORS:
+        return "trigram"
+    if operator == "startswith":
+        return "prefix"
+    if operator == "istartswith":
+        return "upper_prefix"
+    return "btree"
+
+
+def resolve_column(
+    model: Type[Model], path: str, operator: str
+) -> Optional[Tuple[Type[Model], Field]]:
+    """
+    Find the model and concrete field a recorded predicate compares.
+
+    Returns:
+        (model, field) or None when the path ends on a transform, a reverse
+        relation or a relation without a lookup field, or for a full-text operator
+    """
+    if operator in SEARCH_OPERATORS:
+        return None
+
+    field_path = resolve_field_path(model, path)
+    field = field_path.field
+    if field is None or field.name != path.rsplit("__", maxsplit=1)[-1]:
+        return None
+
+    if field.is_relation and operator in LOOKUP_OPERATORS:
+        # `relation * value` compares the related model's lookup field
+        related = field_path.model
+        lookup_field = (
+            getattr(related._meta, "lookup_fields", None)
+            or filter_settings["DEFAULT_LOOKUP_FIELD"]
+        )
+        if not lookup_field or getattr(related._meta, "lookup_by_model", None):
+            return None
+        try:
+            field = related._meta.get_field(lookup_field)
+        except FieldDoesNotExist:
+            return None
+
+    if not field.concrete or field.many_to_many:
+        # The column is the foreign key on the other side, which is indexed
+        return None
+    return field.model, field
+
+
+def _leads(fields, name: str) -> bool:
+    return bool(fields) and fields[0].lstrip("-") == name
+
+
+def has_btree_index(model: Type[Model], field: Field) -> bool:
+    """Tell whether a B-tree index with the field as leading column exists."""
+    if field.primary_key or field.unique or field.db_index:
+        return True
+
+    for index in model._meta.indexes:
+        if _leads(index.fields, field.name) and not getattr(index, "opclasses", None):
+            if type(index).__name__ in ("Index", "BTreeIndex"):
+                return True
+
+    for fields in model._meta.unique_together:
+        if _leads(fields, field.name):
+            return True
+
+    for constraint in model._meta.constraints:
+        if (
+            isinstance(constraint, UniqueConstraint)
+            and constraint.condition is None
+            and _leads(constraint.fields, field.name)
+        ):
+            return True
+    return False
+
+
+def has_trigram_index(model: Type[Model], field: Field) -> bool:
+    """Tell whether a trigram index covers the field."""
+    for index in model._meta.indexes:
+        opclasses = " ".join(getattr(index, "opclasses", ()) or ())
+        expressions = " ".join(repr(expression) for expression in index.expressions)
+        if "trgm" in opclasses and _leads(index.fields, field.name):
+            return True
+        if "trgm" in expressions and f"F({field.name})" in expressions:
+            return True
+    return False
+
+
+def has_prefix_index(model: Type[Model], field: Field, upper: bool = False) -> bool:
+    """Tell whether a pattern operator class index serves prefix matches on the field."""
+    if not upper and (field.unique or field.db_index) and field.get_internal_type() in (
+        "CharField", "TextField"
+    ):
+        # PostgreSQL creates a `_like` index next to the regular one
+        return True
+
+    for index in model._meta.indexes:
+        opclasses = " ".join(getattr(index, "opclasses", ()) or ())
+        expressions = " ".join(repr(expression) for expression in index.expressions)
+        if not upper and "pattern_ops" in opclasses and _leads(index.fields, field.name):
+            return True
+        if (
+            upper
+            and "pattern_ops" in expressions
+            and "Upper" in expressions
+            and f"F({field.name})" in expressions
+        ):
+            return True
+    return False
+
+
+def _pattern_opclass(field: Field) -> str:
+    return "text_pattern_ops" if field.get_internal_type() == "TextField" else "varchar_pattern_ops"
+
+
+def _index_name(model: Type[Model], field: Field, suffix: str) -> str:
+    # Django limits index names to 30 characters
+    return f"{model._meta.model_name[:12]}_{field.column[:10]}_{suffix}"
+
+
+def propose_index(model: Type[Model], field: Field, kind: str) -> str:
+    """Return the migration operation adding an index of a kind on a field."""
+    if kind == "trigram":
+        index = (
+            f'GinIndex(OpClass(Upper("{field.name}"), name="gin_trgm_ops"), '
+            f'name="{_index_name(model, field, "trgm")}")'
+        )
+    elif kind == "prefix":
+        index = (
+            f'models.Index(fields=["{field.name}"], opclasses=["{_pattern_opclass(field)}"], '
+            f'name="{_index_name(model, field, "like")}")'
+        )
+    elif kind == "upper_prefix":
+        index = (
+            f'models.Index(OpClass(Upper("{field.name}"), name="{_pattern_opclass(field)}"), '
+            f'name="{_index_name(model, field, "ulike")}")'
+        )
+    else:
+        index = f'models.Index(fields=["{field.name}"], name="{_index_name(model, field, "idx")}")'
+    return f'migrations.AddIndex(model_name="{model._meta.model_name}", index={index})'
+
+
+def advise(usage: Dict[UsageKey, int], min_count: int = 1) -> List[IndexAdvice]:
+    """
+    Group recorded usage by column and check it against the model's indexes.
+
+    Args:
+        usage: Count per (model label, attribute path, operator)
+        min_count: Columns used fewer times are left out
+
+    Returns:
+        Advice sorted by usage, most used first
+    """
+    grouped: Dict[Tuple[Type[Model], Field, str], Dict[str, int]] = {}
+    for (label, path, operator), count in usage.items():
+        try:
+            model = apps.get_model(label)
+        except (LookupError, ValueError):
+            continue
+        column = resolve_column(model, path, operator)
+        if column is None:
+            continue
+        operators = grouped.setdefault((*column, index_kind(operator)), {})
+        operators[operator] = operators.get(operator, 0) + count
+
+    advice = []
+    for (model, field, kind), operators in grouped.items():
+        if sum(operators.values()) < min_count:
+            continue
+        if kind == "trigram":
+            indexed = has_trigram_index(model, field)
+        elif kind in ("prefix", "upper_prefix"):
+            indexed = has_prefix_index(model, field, upper=kind == "upper_prefix")
+        else:
+            indexed = has_btree_index(model, field)
+        proposal = "" if indexed else propose_index(model, field, kind)
+        advice.append(IndexAdvice(model, field, kind, operators, indexed, proposal))
+
+    advice.sort(key=lambda item: (-item.count, item.model._meta.label, item.field.name))
+    return advice
@@ -0,0 +1,230 @@
+"""
+Cached model metadata used while building queries.
+
+The model index maps lowercase model names and `app_label.model` labels to model
+classes, so `Model___field` subqueries do not scan the app registry.
+
+The field path table memoizes how `attribute__path` strings resolve on a model,
+so comparisons do not walk `_meta.get_field` for every condition.
+"""
+
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Type
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Field, Model, fields
+from django.db.models.signals import class_prepared
+
+from drf_complex_filter.exceptions import AmbiguousModelError
+
+
+class ModelIndex:
+    """
+    Case-insensitive lookup of models by name or by `app_label.Model` label.
+
+    Swapped models (e.g. auth.User when AUTH_USER_MODEL points elsewhere) are only
+    returned for a bare name when no other model has that name.
+    """
+
+    def __init__(self, models: Iterable[Type[Model]]):
+        by_name: Dict[str, List[Type[Model]]] = {}
+        swapped_by_name: Dict[str, List[Type[Model]]] = {}
+        by_label: Dict[str, Type[Model]] = {}
+
+        for model in models:
+            name = model.__name__.lower()
+            target = swapped_by_name if model._meta.swapped else by_name
+            target.setdefault(name, []).append(model)
+            by_label[f"{model._meta.app_label}.{name}".lower()] = model
+
+        for name, swapped_models in swapped_by_name.items():
+            by_name.setdefault(name, swapped_models)
+
+        self._by_name = {name: tuple(found) for name, found in by_name.items()}
+        self._by_label = by_label
+
+    def get(self, name: str) -> Optional[Type[Model]]:
+        """
+        Find a model by its name or `app_label.Model` label.
+
+        Args:
+            name: Model name, case-insensitive
+
+        Returns:
+            Model class or None if no model matches
+
+        Raises:
+            AmbiguousModelError: If a bare name matches models from several apps
+        """
+        key = name.lower()
+        if "." in key:
+            return self._by_label.get(key)
+
+        found = self._by_name.get(key)
+        if not found:
+            return None
+        if len(found) > 1:
+            labels = ", ".join(sorted(model._meta.label for model in found))
+            raise AmbiguousModelError(
+                f"Model name '{name}' is ambiguous, use one of: {labels}"
+            )
+        return found[0]
+
+    def get_by_label(self, app_label: str, model_name: str) -> Optional[Type[Model]]:
+        """Find a model by app label and model name, case-insensitive."""
+        return self._by_label.get(f"{app_label}.{model_name}".lower())
+
+
+_model_index: Optional[ModelIndex] = None
+_model_index_lock = threading.Lock()
+
+
+def get_model_index() -> ModelIndex:
+    """Return the shared model index, building it on first use."""
+    global _model_index
+    index = _model_index
+    if index is None:
+        with _model_index_lock:
+            if _model_index is None:
+                _model_index = ModelIndex(
+                    apps.get_models(include_auto_created=True, include_swapped=True)
+                )
+            index = _model_index
+    return index
+
+
+def clear_model_index(*args, **kwargs) -> None:
+    """Drop the model index, e.g. after a model class is created at runtime."""
+    global _model_index
+    with _model_index_lock:
+        _model_index = None
+
+
+class_prepared.connect(clear_model_index)
+
+
+def split_model_reference(main_attribute: str) -> Tuple[str, str]:
+    """
+    Split the part of an attribute before `___` into a relation path and a model name.
+
+    The model name keeps its app label when it is qualified, e.g.
+    `user__auth__User` gives `("user", "auth.User")`.
+    """
+    parts = main_attribute.split("__")
+    if len(parts) > 1 and get_model_index().get_by_label(parts[-2], parts[-1]):
+        return "__".join(parts[:-2]), f"{parts[-2]}.{parts[-1]}"
+    return "__".join(parts[:-1]), parts[-1]
+
+
+class FieldPath(NamedTuple):
+    """
+    Resolved `attribute__path` on a model.
+
+    Resolution stops at the first part that is not a field (e.g. a transform such
+    as `date__year`), `field` is the last field that was found.
+
+    Attributes:
+        model: Model reached by following the relations in the path
+        field: Last resolved field, None if the first part is not a field
+        is_relation: The last resolved field is a relation
+        is_multi_valued: A many-to-many or reverse foreign key is crossed
+        is_text: The last resolved field is a CharField or TextField
+        joins: Number of relations crossed, including a final relation field
+        models: Models reached through relations, including many-to-many through models
+    """
+
+    model: Optional[Type[Model]]
+    field: Optional[Field]
+    is_relation: bool = False
+    is_multi_valued: bool = False
+    is_text: bool = False
+    joins: int = 0
+    models: Tuple[Type[Model], ...] = ()
+
+
+#: Upper bound of cached paths per model, paths come from client input
+MAX_FIELD_PATHS_PER_MODEL = 1024
+
+_field_paths: Dict[Type[Model], Dict[str, FieldPath]] = {}
+
+
+def _resolve_field_path(model: Optional[Type[Model]], path: str) -> FieldPath:
+    if model is None:
+        return FieldPath(None, None)
+
+    field = None
+    is_multi_valued = False
+    joins = 0
+    models: List[Type[Model]] = []
+    current_model = model
+    for name in path.split("__"):
+        try:
+            field = current_model._meta.get_field(name)
+        except FieldDoesNotExist:
+            break
+        if field.many_to_many or field.one_to_many:
+            is_multi_valued = True
+        if field.remote_field:
+            current_model = field.remote_field.model
+            joins += 1
+            models.append(current_model)
+            if field.many_to_many:
+                # Forward fields keep the through model on the relation, reverse ones on themselves
+                through = getattr(field, "through", None) or field.remote_field.through
+                models.append(through)
+
+    return FieldPath(
+        current_model,
+        field,
+        bool(getattr(field, "is_relation", False)),
+        is_multi_valued,
+        isinstance(field, (fields.CharField, fields.TextField)),
+        joins,
+        tuple(models),
+    )
+
+
+def resolve_field_path(model: Optional[Type[Model]], path: str) -> FieldPath:
+    """
+    Resolve an attribute path on a model, using the per-model cache.
+
+    Args:
+        model: Model the path starts from
+        path: Attribute path with `__` separators
+
+    Returns:
+        FieldPath describing the target model and field
+    """
+    table = _field_paths.get(model)
+    if table is None:
+        table = _field_paths.setdefault(model, {})
+
+    field_path = table.get(path)
+    if field_path is None:
+        field_path = _resolve_field_path(model, path)
+        if len(table) < MAX_FIELD_PATHS_PER_MODEL:
+            table[path] = field_path
+    return field_path
+
+
+def warm_field_paths(model: Type[Model], paths: Optional[Iterable[str]] = None) -> None:
+    """
+    Resolve paths ahead of time.
+
+    Args:
+        model: Model the paths start from
+        paths: Attribute paths to resolve, every field of the model by default
+    """
+    if paths is None:
+        paths = [field.name for field in model._meta.get_fields()]
+    for path in paths:
+        resolve_field_path(model, path.replace(".", "__"))
+
+
+def clear_field_paths(*args, **kwargs) -> None:
+    """Drop all cached field paths."""
+    _field_paths.clear()
+
+
+class_prepared.connect(clear_field_paths)
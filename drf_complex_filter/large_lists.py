@@ -0,0 +1,151 @@
+"""
+Handling of `in` / `not_in` value lists.
+
+Values are coerced to the target field's Python type and deduplicated. Lists longer
+than LARGE_IN_LIST_THRESHOLD are compiled into a form that does not need one SQL
+parameter per value where the database allows it:
+
+- PostgreSQL: `column = ANY(%s)` with a single array parameter
+- SQLite: `column IN (SELECT value FROM json_each(%s))` with a single JSON parameter
+- other databases: `column IN (...) OR column IN (...)` in chunks of IN_LIST_CHUNK_SIZE
+"""
+
+import json
+from typing import Any, List, Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import BooleanField, Expression, F, Field, Q
+
+from drf_complex_filter.exceptions import ComplexFilterError
+from drf_complex_filter.introspection import FieldPath
+
+
+class InValues(Expression):
+    """Boolean expression testing whether a column is in a list of values."""
+
+    conditional = True
+
+    def __init__(
+        self, expression, values: List[Any], target_field: Field, chunk_size: int = 500
+    ):
+        super().__init__(output_field=BooleanField())
+        self.expression = expression
+        self.values = values
+        self.target_field = target_field
+        self.chunk_size = chunk_size
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.expression!r}, <{len(self.values)} values>)"
+
+    def get_source_expressions(self):
+        return [self.expression]
+
+    def set_source_expressions(self, exprs):
+        (self.expression,) = exprs
+
+    def get_db_values(self, connection) -> List[Any]:
+        return [
+            self.target_field.get_db_prep_value(value, connection, prepared=False)
+            for value in self.values
+        ]
+
+    def as_sql(self, compiler, connection):
+        lhs_sql, lhs_params = compiler.compile(self.expression)
+        values = self.get_db_values(connection)
+
+        parts = []
+        params: List[Any] = []
+        for start in range(0, len(values), self.chunk_size):
+            chunk = values[start:start + self.chunk_size]
+            parts.append(f"{lhs_sql} IN ({', '.join(['%s'] * len(chunk))})")
+            params.extend(lhs_params)
+            params.extend(chunk)
+        return f"({' OR '.join(parts)})", params
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, lhs_params = compiler.compile(self.expression)
+        return f"{lhs_sql} = ANY(%s)", [*lhs_params, self.get_db_values(connection)]
+
+    def as_sqlite(self, compiler, connection):
+        lhs_sql, lhs_params = compiler.compile(self.expression)
+        values = json.dumps(self.get_db_values(connection), default=str)
+        return f"{lhs_sql} IN (SELECT value FROM json_each(%s))", [*lhs_params, values]
+
+
+def _target_field(field_path: FieldPath, path: str) -> Optional[Field]:
+    """Return the concrete field the values are compared with, if the path ends on one."""
+    field = field_path.field
+    if not isinstance(field, Field) or field.name != path.rsplit("__", maxsplit=1)[-1]:
+        return None
+    if field.is_relation:
+        return field.target_field
+    return field
+
+
+def prepare_values(field_path: FieldPath, path: str, values: List[Any]) -> List[Any]:
+    """
+    Coerce values to the field's Python type and drop duplicates, keeping order.
+
+    Raises:
+        ComplexFilterError: If a value is not valid for the field
+    """
+    field = _target_field(field_path, path)
+    if field is not None:
+        try:
+            values = [None if value is None else field.to_python(value) for value in values]
+        except ValidationError as error:
+            raise ComplexFilterError(f"Invalid value for '{path}': {'; '.join(error.messages)}")
+
+    try:
+        return list(dict.fromkeys(values))
+    except TypeError:
+        return list(values)
+
+
+def in_values_query(
+    field_path: FieldPath,
+    path: str,
+    values: List[Any],
+    negate: bool,
+    threshold: Optional[int],
+    chunk_size: int,
+) -> Q:
+    """
+    Build the Q object for `in` / `not_in` with a list of values.
+
+    Args:
+        field_path: Resolved attribute path
+        path: Attribute path with `__` separators
+        values: Values to compare with
+        negate: Build `not_in` instead of `in`
+        threshold: List size above which InValues is used, None to never use it
+        chunk_size: Chunk size of the generic fallback
+
+    Returns:
+        Q object matching the same rows as Q(path__in=values) or its negation
+    """
+    values = prepare_values(field_path, path, values)
+    field = _target_field(field_path, path)
+
+    use_expression = (
+        threshold is not None
+        and len(values) > threshold
+        and field is not None
+        and None not in values
+        and not field_path.is_multi_valued
+        # Negated joins need Django's own NULL handling
+        and not (negate and field_path.joins)
+    )
+    if not use_expression:
+        query = Q(**{f"{path}__in": values})
+        return ~query if negate else query
+
+    query = Q(InValues(F(path), values, field, chunk_size))
+    if not negate:
+        return query
+
+    query = ~query
+    if field_path.field.null:
+        # Same as ~Q(path__in=...), which keeps rows where the column is NULL
+        query = query | Q(**{f"{path}__isnull": True})
+    return query
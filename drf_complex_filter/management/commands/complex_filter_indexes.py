@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+
+from drf_complex_filter.index_advisor import advise
+from drf_complex_filter.usage import usage_recorder
+
+
+class Command(BaseCommand):
+    help = (
+        "Report columns that recorded filters compare without a usable index "
+        "and propose migration operations adding one. Needs RECORD_USAGE and a "
+        "cache shared between processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-count",
+            type=int,
+            default=1,
+            help="leave out columns used fewer times",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="also list columns that are already indexed",
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="delete the recorded usage after reporting",
+        )
+
+    def handle(self, *args, **options):
+        advice = advise(usage_recorder.load(), options["min_count"])
+        if not advice:
+            self.stdout.write("No recorded filter usage.")
+
+        proposals = []
+        for item in advice:
+            if item.indexed and not options["all"]:
+                continue
+            operators = ", ".join(
+                f"{operator} x{count}" for operator, count in sorted(item.operators.items())
+            )
+            status = "indexed" if item.indexed else "NOT INDEXED"
+            self.stdout.write(
+                f"{item.count:>8}  {item.model._meta.label}.{item.field.name} "
+                f"[{item.kind}] {status} ({operators})"
+            )
+            if item.proposal:
+                proposals.append(item)
+
+        if proposals:
+            self.stdout.write("\nProposed migration operations:\n")
+            for item in proposals:
+                self.stdout.write(f"    # {item.model._meta.app_label}")
+                self.stdout.write(f"    {item.proposal},")
+            if any(item.kind == "trigram" for item in proposals):
+                self.stdout.write(
+                    "\nTrigram indexes are PostgreSQL only: import GinIndex and OpClass "
+                    "from django.contrib.postgres.indexes, Upper from "
+                    "django.db.models.functions, and add TrigramExtension() from "
+                    "django.contrib.postgres.operations before them."
+                )
+            if any(item.kind in ("prefix", "upper_prefix") for item in proposals):
+                self.stdout.write(
+                    "\nPattern operator classes are PostgreSQL only, other databases use "
+                    "a plain index for prefix matches: import OpClass from "
+                    "django.contrib.postgres.indexes and Upper from django.db.models.functions."
+                )
+
+        if options["reset"]:
+            usage_recorder.clear()
+            usage_recorder.reset_cache()
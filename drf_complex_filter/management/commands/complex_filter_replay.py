@@ -0,0 +1,83 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from drf_complex_filter.replay import load_captures, replay
+from drf_complex_filter.settings import filter_settings
+
+SORT_KEYS = {
+    "time": lambda result: -(result.build_ms + result.execute_ms),
+    "rows": lambda result: -result.rows,
+    "nodes": lambda result: -result.nodes,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay captured filters (JSON lines with model or viewset and filters) "
+        "against the configured database and report build time, query time, row "
+        "counts and EXPLAIN output, slowest first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("capture_file", help="JSON lines file of captured filters")
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="runs per filter, the best time is kept"
+        )
+        parser.add_argument(
+            "--sort", choices=sorted(SORT_KEYS), default="time", help="order of the report"
+        )
+        parser.add_argument(
+            "--subquery-strategy", help="override SUBQUERY_STRATEGY for the replay"
+        )
+        parser.add_argument(
+            "--no-optimize", action="store_true", help="replay with OPTIMIZE_FILTERS off"
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="pass analyze=True to explain() (PostgreSQL, MySQL 8.0.18+, MariaDB)",
+        )
+        parser.add_argument("--no-sql", action="store_true", help="leave out the SQL")
+        parser.add_argument("--json", dest="json_output", help="also write results to this file")
+
+    def handle(self, *args, **options):
+        overrides = {
+            # Cached results would hide the cost of the query
+            "RESULT_CACHE_TIMEOUT": None,
+            "COUNT_CACHE_TIMEOUT": None,
+            "PLAN_CACHE_SIZE": 0,
+        }
+        if options["subquery_strategy"]:
+            overrides["SUBQUERY_STRATEGY"] = options["subquery_strategy"]
+        if options["no_optimize"]:
+            overrides["OPTIMIZE_FILTERS"] = False
+        explain_options = {"analyze": True} if options["analyze"] else {}
+
+        with open(options["capture_file"]) as capture_file:
+            captures = list(load_captures(capture_file))
+
+        with override_settings(COMPLEX_FILTER_SETTINGS={**filter_settings, **overrides}):
+            results = [
+                replay(capture, options["repeat"], explain_options) for capture in captures
+            ]
+        results.sort(key=SORT_KEYS[options["sort"]])
+
+        for result in results:
+            self.stdout.write(f"== {result.name} ({result.model})")
+            if result.error:
+                self.stdout.write(self.style.ERROR(f"   error: {result.error}"))
+                continue
+            self.stdout.write(
+                f"   build {result.build_ms:.2f} ms, query {result.execute_ms:.2f} ms, "
+                f"{result.rows} rows, {result.nodes} nodes"
+            )
+            if not options["no_sql"]:
+                self.stdout.write(f"   SQL: {result.sql}")
+            for line in result.explain.splitlines():
+                self.stdout.write(f"   | {line}")
+
+        if options["json_output"]:
+            with open(options["json_output"], "w") as output_file:
+                json.dump([result.as_dict() for result in results], output_file, indent=2)
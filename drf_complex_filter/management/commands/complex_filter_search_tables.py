@@ -0,0 +1,66 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from drf_complex_filter.search import (
+    create_search_table,
+    drop_search_table,
+    drop_search_table_sql,
+    get_search_fields,
+    search_table_sql,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the SQLite FTS5 tables used by the `search` operator for models "
+        "declaring Meta.search_fields, and index their existing rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "models",
+            nargs="*",
+            help="app_label.Model labels, all models with search fields by default",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="drop the tables instead of creating them",
+        )
+        parser.add_argument(
+            "--sql",
+            action="store_true",
+            help="print the statements instead of running them, e.g. for a RunSQL migration",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "sqlite" and not options["sql"]:
+            raise CommandError("FTS5 tables are SQLite only, other databases use their own indexes")
+
+        try:
+            models = [apps.get_model(label) for label in options["models"]]
+        except (LookupError, ValueError) as error:
+            raise CommandError(str(error))
+        if not models:
+            models = [model for model in apps.get_models() if get_search_fields(model)]
+
+        for model in models:
+            try:
+                if options["sql"]:
+                    statements = drop_search_table_sql(model, connection)
+                    if not options["drop"]:
+                        statements += search_table_sql(model, connection)
+                    for statement in statements:
+                        self.stdout.write(f"{statement};")
+                    continue
+
+                # Recreated, so changed search fields are picked up
+                drop_search_table(model, options["database"])
+                if not options["drop"]:
+                    create_search_table(model, options["database"])
+            except ValueError as error:
+                raise CommandError(str(error))
+            self.stdout.write(f"{'Dropped' if options['drop'] else 'Created'} {model._meta.label}")
@@ -0,0 +1,138 @@
+"""
+Per-phase timing of filter processing.
+
+When METRICS_CALLBACK is set or the `filter_metrics` signal has receivers, every
+ComplexFilter.filter_queryset call reports a FilterMetrics object with the time
+spent in each phase:
+
+- parse: decoding the JSON payload, building and optimizing the tree
+- compile: cost check and compilation, or the plan cache lookup
+- bind: evaluating late-bound conditions for the request
+- subquery: building `Model___field` subqueries (included in compile or bind)
+- annotate: applying annotations and the Q object to the queryset
+- execute: running queries, for code paths that execute them (e.g. the result cache)
+
+When neither is configured a shared no-op object is used, so timing costs nothing.
+"""
+
+import time
+from typing import Any, Callable, Dict, Optional, Type
+
+from django.db.models import Model
+from django.dispatch import Signal
+
+from drf_complex_filter.tree import Node, tree_shape
+
+#: Sent with sender=model and metrics=FilterMetrics after a filter is applied
+filter_metrics = Signal()
+
+
+class _Phase:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics: "FilterMetrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.name, time.perf_counter() - self.started)
+
+
+class FilterMetrics:
+    """
+    Timings and shape of one filter.
+
+    Attributes:
+        model: Filtered model
+        timings: Seconds spent per phase
+        tree: Optimized filter tree
+        cost: FilterCost of the tree
+        plan_cache_hit: Whether the compiled plan came from the plan cache
+        result_cache_hit: Whether the primary keys came from the result cache,
+            None when the result cache is disabled
+        result_cache_bytes: Size of the result cache entry stored after a miss
+        counters: Named event counts, e.g. which path adaptive subqueries took
+    """
+
+    enabled = True
+
+    def __init__(self, model: Optional[Type[Model]], callback: Optional[Callable] = None):
+        self.model = model
+        self.callback = callback
+        self.timings: Dict[str, float] = {}
+        self.tree: Optional[Node] = None
+        self.cost: Any = None
+        self.plan_cache_hit: Optional[bool] = None
+        self.result_cache_hit: Optional[bool] = None
+        self.result_cache_bytes: Optional[int] = None
+        self.counters: Dict[str, int] = {}
+
+    def phase(self, name: str) -> _Phase:
+        """Context manager adding the time spent in its block to a phase."""
+        return _Phase(self, name)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def increment(self, name: str) -> None:
+        self.counters[name] = self.counters.get(name, 0) + 1
+
+    @property
+    def node_count(self) -> int:
+        return self.cost.nodes if self.cost else 0
+
+    @property
+    def shape(self) -> str:
+        """Filter tree without values, e.g. `and(group1 =,integer in)`."""
+        return tree_shape(self.tree)
+
+    def emit(self) -> None:
+        """Pass the metrics to METRICS_CALLBACK and the filter_metrics signal."""
+        if self.callback:
+            self.callback(self)
+        filter_metrics.send(sender=self.model, metrics=self)
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+class NullMetrics:
+    """Metrics object used when nothing consumes metrics."""
+
+    __slots__ = ()
+
+    enabled = False
+
+    def phase(self, name: str) -> _NullPhase:
+        return _NULL_PHASE
+
+    def record(self, name: str, seconds: float) -> None:
+        pass
+
+    def increment(self, name: str) -> None:
+        pass
+
+    def emit(self) -> None:
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+NULL_METRICS = NullMetrics()
+
+
+def start_metrics(model: Optional[Type[Model]], callback: Optional[Callable] = None):
+    """Return a FilterMetrics when metrics are consumed, NULL_METRICS otherwise."""
+    if callback is None and not filter_metrics.receivers:
+        return NULL_METRICS
+    return FilterMetrics(model, callback)
@@ -0,0 +1,116 @@
+"""
+Logical rewrites of a filter tree that keep its meaning.
+
+Runs between parsing and compilation:
+
+- nested groups with the same operation are flattened into their parent
+- groups with a single child are replaced by the child
+- empty groups are removed, the same way empty queries are skipped when compiling
+- duplicate children of a group are removed
+- `or` of `=` conditions on one field is merged into a single `in`
+"""
+
+from typing import Dict, List, Optional, Tuple, Type
+
+from django.db.models import Model
+
+from drf_complex_filter.introspection import resolve_field_path
+from drf_complex_filter.tree import Condition, Group, Node, canonical_json
+
+MERGEABLE_TYPES = (str, int, float, bool)
+
+
+def optimize_tree(
+    tree: Optional[Node], model: Optional[Type[Model]] = None, merge_in: bool = True
+) -> Optional[Node]:
+    """
+    Simplify a filter tree.
+
+    Args:
+        tree: Root node of the filter tree
+        model: Model the tree filters, `=` conditions are only merged into `in`
+            for attributes that end on one of its fields
+        merge_in: Merge `or` of `=` conditions into `in`; only valid when `=` and
+            `in` have their default meaning
+
+    Returns:
+        Equivalent tree, None if nothing is left to filter by
+    """
+    if tree is None or isinstance(tree, Condition):
+        return tree
+
+    children: List[Node] = []
+    for child in tree.children:
+        child = optimize_tree(child, model, merge_in)
+        if child is None:
+            continue
+        if isinstance(child, Group) and child.operation == tree.operation:
+            children.extend(child.children)
+        else:
+            children.append(child)
+
+    children = _remove_duplicates(children)
+    if merge_in and tree.operation == "or":
+        children = _merge_equal_into_in(children, model)
+
+    if not children:
+        return None
+    if len(children) == 1:
+        return children[0]
+    return Group(tree.operation, tuple(children))
+
+
+def _node_key(node: Node) -> Optional[str]:
+    try:
+        return canonical_json(node)
+    except (TypeError, ValueError):
+        return None
+
+
+def _remove_duplicates(children: List[Node]) -> List[Node]:
+    seen = set()
+    unique = []
+    for child in children:
+        key = _node_key(child)
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        unique.append(child)
+    return unique
+
+
+def _is_mergeable_value(value) -> bool:
+    # "" and None have special meaning for `=` (IS NULL / empty string checks)
+    return isinstance(value, MERGEABLE_TYPES) and value != ""
+
+
+def _ends_on_field(model: Optional[Type[Model]], attribute: str) -> bool:
+    # `group__startswith` or `field__isnull` would become an invalid `__startswith__in`
+    field = resolve_field_path(model, attribute).field
+    return field is not None and field.name == attribute.rsplit("__", maxsplit=1)[-1]
+
+
+def _merge_equal_into_in(children: List[Node], model: Optional[Type[Model]]) -> List[Node]:
+    values: Dict[Tuple[str, Optional[str]], list] = {}
+    for child in children:
+        if (
+            isinstance(child, Condition)
+            and child.operator == "="
+            and _is_mergeable_value(child.value)
+            and _ends_on_field(model, child.attribute)
+        ):
+            values.setdefault((child.attribute, child.subquery), []).append(child.value)
+
+    merged = []
+    emitted = set()
+    for child in children:
+        if isinstance(child, Condition) and child.operator == "=":
+            key = (child.attribute, child.subquery)
+            if len(values.get(key, ())) > 1 and _is_mergeable_value(child.value):
+                if key not in emitted:
+                    emitted.add(key)
+                    merged.append(Condition(child.attribute, "in", values[key], child.subquery))
+                continue
+        merged.append(child)
+    return merged
@@ -0,0 +1,204 @@
+"""
+Compiled filter plans and the process-wide plan cache.
+
+A plan is a filter tree with everything that does not depend on the request already
+turned into Q objects. Binding a plan to a request only evaluates the late-bound
+leaves (dynamic operators such as `me`, or `{"func": ...}` values) and combines them
+with the precompiled parts.
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from django.db.models import Q
+
+from drf_complex_filter.settings import filter_settings, on_settings_change
+from drf_complex_filter.tree import Condition
+
+QueryResult = Tuple[Optional[Q], Dict[str, Any]]
+
+
+def combine_queries(operation: str, results: Iterable[QueryResult]) -> QueryResult:
+    """
+    Combine (Q, annotation) pairs with AND or OR.
+
+    Empty queries are skipped together with their annotations.
+    """
+    query = None
+    annotation: Dict[str, Any] = {}
+
+    for sub_query, sub_annotation in results:
+        if sub_query:
+            if operation == "and":
+                query = query & sub_query if query else sub_query
+            else:  # operation == "or"
+                query = query | sub_query if query else sub_query
+            annotation.update(sub_annotation)
+
+    return query, annotation
+
+
+class FilterPlan:
+    """
+    Base class for compiled filter plans.
+
+    Attributes:
+        cost: FilterCost of the tree, set on root plans by ComplexFilter.get_plan
+        models: Models the filter depends on, set on root plans by ComplexFilter.get_plan
+    """
+
+    __slots__ = ("cost", "models")
+
+    #: True when the plan does not depend on the request
+    is_static = False
+
+    def __init__(self):
+        self.cost = None
+        self.models = frozenset()
+
+    def bind(self, complex_filter, request=None) -> QueryResult:
+        """
+        Produce the Q object and annotations for a request.
+
+        Args:
+            complex_filter: ComplexFilter used to evaluate late-bound leaves
+            request: Optional request object for context-aware filtering
+
+        Returns:
+            Tuple of (Q object for filtering, Dict of annotations)
+        """
+        raise NotImplementedError
+
+    async def abind(self, complex_filter, request=None) -> QueryResult:
+        """Async version of bind, awaiting async value functions and comparisons."""
+        raise NotImplementedError
+
+
+class StaticPlan(FilterPlan):
+    """Plan that was fully evaluated at compile time."""
+
+    __slots__ = ("query", "annotation")
+    is_static = True
+
+    def __init__(self, query: Optional[Q], annotation: Dict[str, Any]):
+        super().__init__()
+        self.query = query
+        self.annotation = annotation
+
+    def bind(self, complex_filter, request=None) -> QueryResult:
+        return self.query, dict(self.annotation)
+
+    async def abind(self, complex_filter, request=None) -> QueryResult:
+        return self.bind(complex_filter, request)
+
+
+class ConditionPlan(FilterPlan):
+    """Leaf that must be evaluated for every request."""
+
+    __slots__ = ("condition",)
+
+    def __init__(self, condition: Condition):
+        super().__init__()
+        self.condition = condition.as_dict()
+
+    def bind(self, complex_filter, request=None) -> QueryResult:
+        return complex_filter._handle_operator(self.condition, request)
+
+    async def abind(self, complex_filter, request=None) -> QueryResult:
+        return await complex_filter._ahandle_operator(self.condition, request)
+
+
+class GroupPlan(FilterPlan):
+    """AND/OR node with at least one late-bound child."""
+
+    __slots__ = ("operation", "static", "children")
+
+    def __init__(self, operation: str, static: StaticPlan, children: Tuple[FilterPlan, ...]):
+        super().__init__()
+        self.operation = operation
+        self.static = static
+        self.children = children
+
+    def bind(self, complex_filter, request=None) -> QueryResult:
+        results = [(self.static.query, self.static.annotation)]
+        results.extend(child.bind(complex_filter, request) for child in self.children)
+        return combine_queries(self.operation, results)
+
+    async def abind(self, complex_filter, request=None) -> QueryResult:
+        # Children are awaited concurrently, so value functions can overlap their I/O
+        results = [(self.static.query, self.static.annotation)]
+        results.extend(
+            await asyncio.gather(
+                *(child.abind(complex_filter, request) for child in self.children)
+            )
+        )
+        return combine_queries(self.operation, results)
+
+
+class PlanCache:
+    """
+    Thread-safe bounded LRU cache of compiled plans.
+
+    The size limit is read from the PLAN_CACHE_SIZE setting on every insert,
+    a size of 0 disables caching.
+    """
+
+    def __init__(self):
+        self._plans: "OrderedDict[Hashable, FilterPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def maxsize(self) -> int:
+        return filter_settings["PLAN_CACHE_SIZE"] or 0
+
+    def get(self, key: Hashable) -> Optional[FilterPlan]:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+                return None
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+    def set(self, key: Hashable, plan: FilterPlan) -> None:
+        maxsize = self.maxsize
+        if maxsize <= 0:
+            return
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > maxsize:
+                self._plans.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all plans and reset the statistics."""
+        with self._lock:
+            self._plans.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._plans),
+                "maxsize": self.maxsize,
+            }
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+
+plan_cache = PlanCache()
+
+on_settings_change(plan_cache.clear)
+
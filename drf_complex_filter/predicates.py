@@ -0,0 +1,638 @@
+"""
+In-memory evaluation of filters.
+
+ComplexFilter turns a filter tree into a Q object for the database. This module
+compiles the same tree into a Python predicate of model instances or dicts, e.g.
+to tell whether a changed instance still matches the filters of its subscribers
+without running one query per filter:
+
+    predicate = compile_predicate(Order, filters, request)
+    predicate(order)  # True or False
+
+The built-in CommonComparison and DynamicComparison operators are supported, with
+the same NULL handling as the SQL they produce. Attribute paths may cross
+relations that are already loaded: forward relations cached by
+select_related() or assignment, and many-valued ones cached by prefetch_related().
+Dict rows hold related rows as nested dicts (lists of dicts for many-valued ones).
+
+Everything else raises PredicateError: `Model___field` subqueries, operators of
+custom comparison classes, `lookup_by_model` models, lookups in attribute paths,
+async value functions and relations that are not loaded. Value functions are
+called when compiling, so a predicate keeps the value of `now` it was compiled
+with.
+
+PredicateSet evaluates one instance against many compiled filters. Filters are
+indexed by a top-level `=` or `in` condition, so only the filters whose indexed
+value matches the instance are evaluated, and attribute values are read once per
+instance.
+"""
+
+import operator
+from typing import Any, Callable, Dict, FrozenSet, Hashable, List, Mapping, Optional, Tuple, Type
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Field, Model, fields
+from django.utils import timezone
+from rest_framework.request import Request
+
+from drf_complex_filter.comparisons import CommonComparison, DynamicComparison, wildcard_comparison
+from drf_complex_filter.exceptions import ComplexFilterError, PredicateError
+from drf_complex_filter.optimizer import optimize_tree
+from drf_complex_filter.search import get_search_fields, search_words
+from drf_complex_filter.settings import filter_settings
+from drf_complex_filter.tree import Condition, Node, parse_filters
+from drf_complex_filter.utils import ComplexFilter
+
+#: Operators compared on the lookup field of a relation, see CommonComparison.get_q_object
+LOOKUP_OPERATORS = (
+    "*", "!", "startswith", "istartswith", "endswith", "iendswith", ">", ">=", "<", "<=",
+)
+
+#: Operators matching rows the positive operator does not match, NULL included
+NEGATED_OPERATORS = {"!=": "=", "!": "*", "not_in": "in", "not_me": "me"}
+
+_STRING_TESTS = {
+    "icontains": lambda value: lambda item: value in str(item).lower(),
+    "istartswith": lambda value: lambda item: str(item).lower().startswith(value),
+    "iendswith": lambda value: lambda item: str(item).lower().endswith(value),
+    "startswith": lambda value: lambda item: str(item).startswith(value),
+    "endswith": lambda value: lambda item: str(item).endswith(value),
+}
+
+_ORDERING_TESTS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+
+class _Step:
+    """One field of an attribute path."""
+
+    __slots__ = ("field", "name", "many", "last", "pk_field")
+
+    def __init__(self, field: Any, last: bool):
+        self.field = field
+        self.name = field.name
+        self.many = field.many_to_many or field.one_to_many
+        self.last = last
+        self.pk_field = field.related_model._meta.pk if field.is_relation else None
+
+
+class AttributePath:
+    """
+    An attribute path resolved on a model, reading values from loaded rows.
+
+    Attributes:
+        path: Attribute path with `__` separators
+        field: Field compared by conditions on the path, the primary key of the
+            related model for a path ending with a relation
+    """
+
+    __slots__ = ("path", "steps", "field", "is_text")
+
+    def __init__(self, model: Type[Model], path: str):
+        self.path = path
+        self.steps: Tuple[_Step, ...] = ()
+        current: Optional[Type[Model]] = model
+        names = path.split("__")
+        for index, name in enumerate(names):
+            try:
+                if current is None:
+                    raise FieldDoesNotExist
+                field = current._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise PredicateError(
+                    f"'{path}' is not a field path of {model._meta.label} "
+                    "and cannot be evaluated in memory"
+                )
+            self.steps += (_Step(field, index == len(names) - 1),)
+            current = field.related_model if field.is_relation else None
+
+        last = self.steps[-1]
+        self.field: Field = last.pk_field or last.field
+        self.is_text = isinstance(self.field, (fields.CharField, fields.TextField))
+
+    @property
+    def is_relation(self) -> bool:
+        return self.steps[-1].pk_field is not None
+
+    def values(self, row: Any) -> List[Any]:
+        """
+        Return the values of the path in a model instance or a dict.
+
+        A NULL relation gives [None] and a many-valued one gives one value per
+        related row ([None] without rows), like the LEFT JOINs of the query.
+
+        Raises:
+            PredicateError: If a relation on the path is not loaded
+        """
+        items = [row]
+        for step in self.steps:
+            next_items: List[Any] = []
+            for item in items:
+                if item is None:
+                    next_items.append(None)
+                elif isinstance(item, Model):
+                    next_items.extend(self._instance_values(item, step))
+                elif isinstance(item, Mapping):
+                    next_items.extend(self._dict_values(item, step))
+                else:
+                    raise PredicateError(f"'{self.path}' is not loaded, got {item!r}")
+            items = next_items
+        return items
+
+    def _instance_values(self, instance: Model, step: _Step) -> List[Any]:
+        field = step.field
+        if step.many:
+            accessor = field.get_accessor_name() if field.auto_created else field.name
+            related = getattr(instance, accessor).all()
+            if related._result_cache is None:
+                raise PredicateError(
+                    f"'{self.path}' is not loaded, use prefetch_related('{accessor}')"
+                )
+            values = [item.pk if step.last else item for item in related]
+            return values or [None]
+
+        if not field.is_relation:
+            return [getattr(instance, field.attname)]
+        if step.last and field.concrete:
+            # The foreign key column, the related row is not needed
+            return [getattr(instance, field.attname)]
+        if field.concrete and getattr(instance, field.attname) is None:
+            return [None]
+        if not field.is_cached(instance):
+            raise PredicateError(f"'{self.path}' is not loaded, use select_related()")
+        related = field.get_cached_value(instance)
+        return [related.pk if step.last and related is not None else related]
+
+    def _dict_values(self, row: Mapping[str, Any], step: _Step) -> List[Any]:
+        field = step.field
+        if step.last and field.concrete and field.is_relation and field.attname in row:
+            return [row[field.attname]]
+        if step.name not in row:
+            raise PredicateError(f"'{self.path}' is not loaded, '{step.name}' is missing")
+
+        value = row[step.name]
+        if step.many:
+            values = list(value or ())
+            if step.last:
+                values = [_primary_key(item, step.pk_field) for item in values]
+            return values or [None]
+        if step.last and step.pk_field is not None:
+            return [_primary_key(value, step.pk_field)]
+        if step.last and value is not None:
+            # JSON rows hold dates and numbers as strings
+            return [_to_python(field, value, strict=False)]
+        return [value]
+
+
+def _primary_key(value: Any, pk_field: Field) -> Any:
+    if isinstance(value, Model):
+        return value.pk
+    if isinstance(value, Mapping):
+        return value.get(pk_field.attname, value.get("pk"))
+    return value
+
+
+def _to_python(field: Field, value: Any, strict: bool = True) -> Any:
+    """Convert a value the way the database would compare it to the field."""
+    try:
+        value = field.to_python(value)
+    except (ValidationError, TypeError, ValueError):
+        if strict:
+            raise PredicateError(f"Invalid value {value!r} for '{field.name}'")
+        return value
+    if settings.USE_TZ and field.get_internal_type() == "DateTimeField" and value is not None:
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.get_default_timezone())
+    return value
+
+
+RowTest = Callable[["_Row"], bool]
+
+
+class _Row:
+    """A row being evaluated, reading every attribute path once."""
+
+    __slots__ = ("row", "_values")
+
+    def __init__(self, row: Any):
+        self.row = row
+        self._values: Dict[str, List[Any]] = {}
+
+    def values(self, path: AttributePath) -> List[Any]:
+        values = self._values.get(path.path)
+        if values is None:
+            values = self._values[path.path] = path.values(self.row)
+        return values
+
+
+class ConditionTest:
+    """
+    A compiled condition.
+
+    Attributes:
+        path: AttributePath the condition reads
+        negated: The condition matches the rows the positive test does not match
+        equal_values: Values of a positive `=` or `in` condition, used by PredicateSet
+    """
+
+    __slots__ = ("path", "test", "negated", "equal_values")
+
+    def __init__(
+        self,
+        path: AttributePath,
+        test: Callable[[Any], bool],
+        negated: bool = False,
+        equal_values: Optional[FrozenSet[Hashable]] = None,
+    ):
+        self.path = path
+        self.test = test
+        self.negated = negated
+        self.equal_values = equal_values
+
+    def __call__(self, row: _Row) -> bool:
+        test = self.test
+        matched = any(test(value) for value in row.values(self.path))
+        return not matched if self.negated else matched
+
+
+class GroupTest:
+    """A compiled `and`/`or` group."""
+
+    __slots__ = ("operation", "children")
+
+    def __init__(self, operation: str, children: Tuple[RowTest, ...]):
+        self.operation = operation
+        self.children = children
+
+    def __call__(self, row: _Row) -> bool:
+        if self.operation == "and":
+            return all(child(row) for child in self.children)
+        return any(child(row) for child in self.children)
+
+
+class PredicateCompiler:
+    """
+    Compile filter trees of one model into row tests.
+
+    Args:
+        model: Model the filters apply to
+        request: Request of `me` conditions and value functions, if any
+    """
+
+    def __init__(self, model: Type[Model], request: Optional[Request] = None):
+        self.model = model
+        self.request = request
+        self.complex_filter = ComplexFilter(model)
+        self.registry = self.complex_filter.registry
+        self._paths: Dict[str, AttributePath] = {}
+
+    def parse(self, filters: Any) -> Optional[Node]:
+        """Decode and simplify a filter the way ComplexFilter.get_plan does."""
+        filters = self.complex_filter._decode_filters(filters)
+        if not filters:
+            return None
+        tree = parse_filters(filters)
+        if filter_settings["OPTIMIZE_FILTERS"]:
+            tree = optimize_tree(
+                tree, self.model, merge_in=self.complex_filter._can_merge_into_in()
+            )
+        return tree
+
+    def compile(self, tree: Optional[Node]) -> Optional[RowTest]:
+        """
+        Compile a tree into a row test.
+
+        Returns:
+            Row test, None if the tree does not filter anything
+
+        Raises:
+            PredicateError: If the tree cannot be evaluated in memory
+        """
+        if tree is None:
+            return None
+        if isinstance(tree, Condition):
+            return self.compile_condition(tree)
+
+        children = tuple(
+            test for test in (self.compile(child) for child in tree.children) if test is not None
+        )
+        if not children:
+            return None
+        if len(children) == 1:
+            return children[0]
+        return GroupTest(tree.operation, children)
+
+    def get_path(self, attribute: str) -> AttributePath:
+        path = self._paths.get(attribute)
+        if path is None:
+            path = self._paths[attribute] = AttributePath(self.model, attribute)
+        return path
+
+    def compile_condition(self, condition: Condition) -> Optional[ConditionTest]:
+        """
+        Compile a condition, None if its comparison gives no query.
+
+        Raises:
+            PredicateError: If the condition cannot be evaluated in memory
+        """
+        attribute, operator_name = condition.attribute, condition.operator
+        if "___" in attribute:
+            raise PredicateError(
+                f"'{attribute}' is a subquery and cannot be evaluated in memory"
+            )
+        comparison_class = self.registry.operator_classes.get(operator_name)
+        if comparison_class not in (CommonComparison, DynamicComparison):
+            raise PredicateError(
+                f"Operator '{operator_name}' is not built in and cannot be evaluated in memory"
+            )
+
+        try:
+            value = self.complex_filter.get_filter_value(condition.as_dict(), self.request)
+        except PredicateError:
+            raise
+        except ComplexFilterError as error:
+            # e.g. an async value function
+            raise PredicateError(str(error))
+        negated = operator_name in NEGATED_OPERATORS
+        operator_name = NEGATED_OPERATORS.get(operator_name, operator_name)
+
+        path = self.get_path(attribute)
+        if path.is_relation and operator_name in LOOKUP_OPERATORS:
+            path = self._lookup_field_path(path)
+            if path is None:
+                return None
+
+        if operator_name == "search":
+            return self._search_test(path, value)
+        test, equal_values = self._positive_test(path, operator_name, value)
+        if negated:
+            equal_values = None
+        return ConditionTest(path, test, negated, equal_values)
+
+    def _lookup_field_path(self, path: AttributePath) -> Optional[AttributePath]:
+        """Return the path of the lookup field a relation is compared by."""
+        related_model = path.field.model
+        if getattr(related_model._meta, "lookup_by_model", None):
+            raise PredicateError(
+                f"'{path.path}' uses lookup_by_model of {related_model._meta.label} "
+                "and cannot be evaluated in memory"
+            )
+        lookup_field = getattr(related_model._meta, "lookup_fields", None)
+        if not lookup_field:
+            lookup_field = filter_settings["DEFAULT_LOOKUP_FIELD"]
+        if not lookup_field or not hasattr(related_model, lookup_field):
+            return None
+        return self.get_path(f"{path.path}__{lookup_field}")
+
+    def _positive_test(
+        self, path: AttributePath, operator_name: str, value: Any
+    ) -> Tuple[Callable[[Any], bool], Optional[FrozenSet[Hashable]]]:
+        field = path.field
+        if operator_name == "=":
+            if value == "":
+                if path.is_text:
+                    return lambda item: item is None or item == "", None
+                return lambda item: item is None, None
+            value = _to_python(field, value) if value is not None else None
+            return lambda item: item == value, _hashable_set([value])
+
+        if operator_name == "*":
+            value, lookup = wildcard_comparison(value)
+            return self._string_test(lookup, value), None
+        if operator_name in _STRING_TESTS:
+            return self._string_test(operator_name, value), None
+
+        if operator_name in _ORDERING_TESTS:
+            compare = _ORDERING_TESTS[operator_name]
+            value = _to_python(field, value)
+            return lambda item: item is not None and compare(item, value), None
+
+        if operator_name == "in":
+            if not isinstance(value, (list, tuple)):
+                raise PredicateError("'in' needs a list of values to be evaluated in memory")
+            values = [_to_python(field, item) for item in value if item is not None]
+            equal_values = _hashable_set(values)
+            if equal_values is None:
+                return lambda item: item is not None and item in values, None
+            return lambda item: item in equal_values, equal_values
+
+        if operator_name == "me":
+            user = getattr(self.request, "user", None) if self.request else None
+            if not user:
+                return lambda item: item is None, None
+            user_id = user.id
+            return lambda item: item == user_id, None
+
+        raise PredicateError(f"Operator '{operator_name}' cannot be evaluated in memory")
+
+    @staticmethod
+    def _string_test(lookup: str, value: Any) -> Callable[[Any], bool]:
+        value = str(value)
+        test = _STRING_TESTS[lookup](value.lower() if lookup.startswith("i") else value)
+        return lambda item: item is not None and test(item)
+
+    def _search_test(self, path: AttributePath, value: Any) -> Optional[ConditionTest]:
+        """Mirror the portable SQL of FullTextMatch: every word in one of the search fields."""
+        if path.is_relation:
+            names = get_search_fields(path.field.model)
+            columns = [self.get_path(f"{path.path}__{name}") for name in names]
+        else:
+            field = path.steps[-1].field
+            columns = [path] if field.name in get_search_fields(field.model) else []
+
+        if not columns:
+            if path.is_relation:
+                path = self._lookup_field_path(path)
+                if path is None:
+                    return None
+            test, _ = self._positive_test(path, "*", value)
+            return ConditionTest(path, test)
+
+        words = [word.lower() for word in search_words(value)]
+        if not words:
+            return None
+        return _SearchTest(columns, words)
+
+
+class _SearchTest(ConditionTest):
+    __slots__ = ("columns", "words")
+
+    def __init__(self, columns: List[AttributePath], words: List[str]):
+        super().__init__(columns[0], lambda item: True)
+        self.columns = columns
+        self.words = words
+
+    def __call__(self, row: _Row) -> bool:
+        texts = [
+            str(value).lower()
+            for column in self.columns
+            for value in row.values(column)
+            if value is not None
+        ]
+        return all(any(word in text for text in texts) for word in self.words)
+
+
+def _hashable_set(values: List[Any]) -> Optional[FrozenSet[Hashable]]:
+    try:
+        return frozenset(values)
+    except TypeError:
+        return None
+
+
+class FilterPredicate:
+    """
+    A filter compiled into a function of model instances or dicts.
+
+    Calling the predicate returns whether a row matches the filter.
+
+    Raises:
+        PredicateError: When called with a row missing a relation of the filter
+    """
+
+    __slots__ = ("model", "test")
+
+    def __init__(self, model: Type[Model], test: Optional[RowTest]):
+        self.model = model
+        self.test = test
+
+    def __call__(self, row: Any) -> bool:
+        return self.test is None or self.test(_Row(row))
+
+
+def compile_predicate(
+    model: Type[Model], filters: Any, request: Optional[Request] = None
+) -> FilterPredicate:
+    """
+    Compile a filter into a Python predicate.
+
+    Args:
+        model: Model the filter applies to
+        filters: Filter as a dict or a JSON string
+        request: Optional request of `me` conditions and value functions
+
+    Returns:
+        FilterPredicate of model instances or dicts
+
+    Raises:
+        PredicateError: If the filter cannot be evaluated in memory
+
+    Example:
+        >>> predicate = compile_predicate(Order, {"type": "operator", "data": {...}})
+        >>> predicate(order)
+        True
+    """
+    compiler = PredicateCompiler(model, request)
+    return FilterPredicate(model, compiler.compile(compiler.parse(filters)))
+
+
+class PredicateSet:
+    """
+    Many compiled filters of one model, evaluated together.
+
+    Filters are indexed by a positive `=` or `in` condition at their top level
+    (the condition itself or a child of the top `and` group). matches() only runs
+    the filters whose indexed values contain the value of the row, plus the
+    filters without such a condition.
+
+    Args:
+        model: Model the filters apply to
+        request: Optional request of `me` conditions and value functions
+
+    Example:
+        >>> subscriptions = PredicateSet(Order)
+        >>> subscriptions.add("alice", alice_filter)
+        >>> subscriptions.matches(order)
+        ["alice"]
+    """
+
+    def __init__(self, model: Type[Model], request: Optional[Request] = None):
+        self.model = model
+        self.compiler = PredicateCompiler(model, request)
+        self._tests: Dict[Hashable, Optional[RowTest]] = {}
+        self._order: Dict[Hashable, int] = {}
+        self._unindexed: Dict[Hashable, None] = {}
+        self._index: Dict[str, Tuple[AttributePath, Dict[Hashable, Dict[Hashable, None]]]] = {}
+        self._indexed: Dict[Hashable, Tuple[str, FrozenSet[Hashable]]] = {}
+        self._counter = 0
+
+    def __len__(self) -> int:
+        return len(self._tests)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tests
+
+    def add(self, key: Hashable, filters: Any) -> None:
+        """
+        Compile a filter and add it under a key, replacing the filter of the key.
+
+        Raises:
+            PredicateError: If the filter cannot be evaluated in memory
+        """
+        test = self.compiler.compile(self.compiler.parse(filters))
+        self.discard(key)
+        self._tests[key] = test
+        self._order[key] = self._counter
+        self._counter += 1
+
+        guard = _find_guard(test)
+        if guard is None:
+            self._unindexed[key] = None
+            return
+        path = guard.path
+        buckets = self._index.setdefault(path.path, (path, {}))[1]
+        for value in guard.equal_values:
+            buckets.setdefault(value, {})[key] = None
+        self._indexed[key] = (path.path, guard.equal_values)
+
+    def discard(self, key: Hashable) -> None:
+        """Remove the filter of a key, if any."""
+        if key not in self._tests:
+            return
+        del self._tests[key]
+        del self._order[key]
+        self._unindexed.pop(key, None)
+        indexed = self._indexed.pop(key, None)
+        if indexed is not None:
+            path, values = indexed
+            buckets = self._index[path][1]
+            for value in values:
+                buckets[value].pop(key, None)
+                if not buckets[value]:
+                    del buckets[value]
+
+    def matches(self, row: Any) -> List[Hashable]:
+        """
+        Return the keys of the filters a model instance or dict matches.
+
+        Keys are in the order the filters were added.
+
+        Raises:
+            PredicateError: If the row misses a relation one of the filters reads
+        """
+        row = _Row(row)
+        candidates = set(self._unindexed)
+        for path, buckets in self._index.values():
+            for value in row.values(path):
+                try:
+                    candidates.update(buckets.get(value, ()))
+                except TypeError:
+                    # An unhashable value cannot equal a hashable filter value
+                    continue
+
+        tests = self._tests
+        return sorted(
+            (key for key in candidates if tests[key] is None or tests[key](row)),
+            key=self._order.__getitem__,
+        )
+
+
+def _find_guard(test: Optional[RowTest]) -> Optional[ConditionTest]:
+    """Pick the `=` / `in` condition every row matching the test also matches."""
+    if isinstance(test, ConditionTest):
+        return test if test.equal_values is not None else None
+    if isinstance(test, GroupTest) and test.operation == "and":
+        for child in test.children:
+            guard = _find_guard(child)
+            if guard is not None:
+                return guard
+    return None
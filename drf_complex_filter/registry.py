@@ -0,0 +1,185 @@
+"""
+Process-wide registry of filter operators and value functions.
+
+Loading COMPARISON_CLASSES, VALUE_FUNCTIONS and DEFAULT_COMPARISON_FUNCTION means
+importing and instantiating every configured class. The registry does it once per
+process and shares the result between all ComplexFilter instances. It is rebuilt
+lazily after COMPLEX_FILTER_SETTINGS changes (e.g. with override_settings in tests).
+"""
+
+import inspect
+import json
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
+
+from django.utils.module_loading import import_string
+
+from drf_complex_filter.decoders import get_json_decoder
+from drf_complex_filter.functions import FunctionPolicy, get_function_policy
+from drf_complex_filter.settings import filter_settings, on_settings_change
+
+
+class FilterRegistry:
+    """
+    Immutable set of operators and value functions built from filter settings.
+
+    Attributes:
+        comparisons: Read-only mapping of operator name to comparison callable
+        functions: Read-only mapping of function name to value function
+        function_policies: Read-only mapping of function name to its FunctionPolicy
+        default_comparison: Fallback comparison for unknown operators, if configured
+        request_dependent_operators: Operators whose result depends on the request
+        operator_classes: Read-only mapping of operator name to the class providing it
+        json_loads: JSON decoder for string filters
+        metrics_callback: Callable receiving FilterMetrics, if configured
+        debug_permission: Callable `(request, view) -> bool` allowing debug output
+
+    Comparison classes declare whether their operators read the request with a
+    `request_dependent` attribute. Classes without it are treated as request
+    dependent, so their conditions are never precompiled. Async comparisons always
+    count as request dependent, so only the async API calls them.
+    """
+
+    __slots__ = (
+        "comparisons",
+        "functions",
+        "function_policies",
+        "default_comparison",
+        "request_dependent_operators",
+        "operator_classes",
+        "json_loads",
+        "metrics_callback",
+        "debug_permission",
+    )
+
+    def __init__(
+        self,
+        comparisons: Mapping[str, Callable],
+        functions: Mapping[str, Callable],
+        default_comparison: Optional[Callable] = None,
+        request_dependent_operators: Iterable[str] = (),
+        operator_classes: Optional[Mapping[str, type]] = None,
+        json_loads: Callable = json.loads,
+        metrics_callback: Optional[Callable] = None,
+        debug_permission: Optional[Callable] = None,
+        function_policies: Optional[Mapping[str, FunctionPolicy]] = None,
+    ):
+        object.__setattr__(self, "comparisons", MappingProxyType(dict(comparisons)))
+        object.__setattr__(self, "functions", MappingProxyType(dict(functions)))
+        policies = {name: get_function_policy(function) for name, function in functions.items()}
+        policies.update(function_policies or {})
+        object.__setattr__(self, "function_policies", MappingProxyType(policies))
+        object.__setattr__(self, "default_comparison", default_comparison)
+        object.__setattr__(
+            self, "request_dependent_operators", frozenset(request_dependent_operators)
+        )
+        object.__setattr__(
+            self, "operator_classes", MappingProxyType(dict(operator_classes or {}))
+        )
+        object.__setattr__(self, "json_loads", json_loads)
+        object.__setattr__(self, "metrics_callback", metrics_callback)
+        object.__setattr__(self, "debug_permission", debug_permission)
+
+    def is_request_dependent(self, operator: str) -> bool:
+        """Tell whether the comparison used for an operator reads the request."""
+        if operator in self.comparisons:
+            return operator in self.request_dependent_operators
+        return getattr(
+            self.default_comparison, "request_dependent", True
+        ) or inspect.iscoroutinefunction(self.default_comparison)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("FilterRegistry is immutable")
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "FilterRegistry":
+        """
+        Build a registry by importing everything configured in settings.
+
+        Args:
+            settings: Filter settings dictionary, usually filter_settings
+
+        Returns:
+            A new FilterRegistry instance
+        """
+        comparisons: Dict[str, Callable] = {}
+        request_dependent = set()
+        operator_classes: Dict[str, type] = {}
+        for comparison_path in settings["COMPARISON_CLASSES"]:
+            comparison_module = import_string(comparison_path)()
+            operators = comparison_module.get_operators()
+            comparisons.update(operators)
+            operator_classes.update(dict.fromkeys(operators, type(comparison_module)))
+            if getattr(comparison_module, "request_dependent", True):
+                request_dependent.update(operators)
+            else:
+                request_dependent.difference_update(operators)
+                # Async comparisons only run when the async API binds a plan
+                request_dependent.update(
+                    name
+                    for name, comparison in operators.items()
+                    if inspect.iscoroutinefunction(comparison)
+                )
+
+        functions: Dict[str, Callable] = {}
+        for function_path in settings["VALUE_FUNCTIONS"]:
+            function_module = import_string(function_path)()
+            functions.update(function_module.get_functions())
+
+        function_policies = {
+            name: get_function_policy(functions[name])._replace(pure=False, time_bucket=seconds)
+            for name, seconds in settings["VALUE_FUNCTION_TIME_BUCKETS"].items()
+            if name in functions
+        }
+
+        default_comparison = None
+        if settings["DEFAULT_COMPARISON_FUNCTION"]:
+            default_comparison = import_string(settings["DEFAULT_COMPARISON_FUNCTION"])
+
+        metrics_callback = None
+        if settings["METRICS_CALLBACK"]:
+            metrics_callback = import_string(settings["METRICS_CALLBACK"])
+
+        debug_permission = None
+        if settings["DEBUG_PERMISSION"]:
+            debug_permission = import_string(settings["DEBUG_PERMISSION"])
+            if isinstance(debug_permission, type):
+                # A DRF permission class
+                debug_permission = debug_permission().has_permission
+
+        return cls(
+            comparisons,
+            functions,
+            default_comparison,
+            request_dependent,
+            operator_classes,
+            get_json_decoder(settings["JSON_DECODER"]),
+            metrics_callback,
+            debug_permission,
+            function_policies,
+        )
+
+
+_registry: Optional[FilterRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> FilterRegistry:
+    """Return the shared registry, building it on first use."""
+    global _registry
+    registry = _registry
+    if registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = FilterRegistry.from_settings(filter_settings)
+            registry = _registry
+    return registry
+
+
+@on_settings_change
+def clear_registry() -> None:
+    """Drop the shared registry so the next get_registry() call rebuilds it."""
+    global _registry
+    with _registry_lock:
+        _registry = None
@@ -0,0 +1,149 @@
+"""
+Replay of captured filters against the configured database.
+
+Captured filters are JSON lines, one filter per line:
+
+    {"model": "shop.Order", "filters": {"type": "operator", "data": {...}}}
+    {"viewset": "shop.views.OrderViewSet", "filters": "{\"type\": ...}", "name": "slow #12"}
+
+`model` is an `app_label.Model` label. `viewset` is the dotted path of a view whose
+`queryset` (or `get_queryset()`) is filtered. `filters` is the filter dictionary or
+the raw query parameter string.
+"""
+
+import json
+import time
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional
+
+from django.apps import apps
+from django.core.exceptions import EmptyResultSet
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.utils.module_loading import import_string
+
+from drf_complex_filter.exceptions import ComplexFilterError
+from drf_complex_filter.utils import ComplexFilter
+
+
+class ReplayResult(NamedTuple):
+    """
+    Outcome of replaying one filter.
+
+    Attributes:
+        name: Name from the capture file, or the line number
+        model: Label of the filtered model
+        nodes: Number of nodes of the filter tree
+        build_ms: Best time to build the filtered queryset
+        execute_ms: Best time to fetch every row
+        rows: Number of rows returned
+        sql: SQL of the filtered queryset
+        explain: Output of QuerySet.explain()
+        error: Error message when the filter could not be replayed
+    """
+
+    name: str
+    model: str
+    nodes: int = 0
+    build_ms: float = 0.0
+    execute_ms: float = 0.0
+    rows: int = 0
+    sql: str = ""
+    explain: str = ""
+    error: str = ""
+
+    def as_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+def load_captures(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Parse capture file lines, skipping empty lines and `#` comments."""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        capture = json.loads(line)
+        capture.setdefault("name", f"line {number}")
+        yield capture
+
+
+def get_base_queryset(capture: Dict[str, Any]) -> QuerySet:
+    """
+    Return the queryset a captured filter applies to.
+
+    Raises:
+        ValueError: If the capture has neither a known model nor a viewset
+    """
+    if capture.get("model"):
+        return apps.get_model(capture["model"])._default_manager.all()
+
+    if capture.get("viewset"):
+        view = import_string(capture["viewset"])()
+        view.request = None
+        view.format_kwarg = None
+        view.kwargs = {}
+        queryset = getattr(view, "queryset", None)
+        if queryset is None:
+            queryset = view.get_queryset()
+        return queryset.all()
+
+    raise ValueError("Capture needs a 'model' or a 'viewset'")
+
+
+def _best_of(repeat: int, func) -> float:
+    best = float("inf")
+    for _ in range(max(repeat, 1)):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def replay(
+    capture: Dict[str, Any],
+    repeat: int = 1,
+    explain_options: Optional[Dict[str, Any]] = None,
+) -> ReplayResult:
+    """
+    Rebuild a captured filter through ComplexFilter and run it.
+
+    Args:
+        capture: Parsed capture line
+        repeat: Times the build and the query are run, the best time is kept
+        explain_options: Keyword arguments of QuerySet.explain(), e.g. analyze=True
+
+    Returns:
+        ReplayResult, with `error` set instead of raising
+    """
+    name = str(capture["name"])
+    try:
+        queryset = get_base_queryset(capture)
+    except (LookupError, ImportError, ValueError) as error:
+        source = capture.get("model") or capture.get("viewset")
+        return ReplayResult(name, str(source), error=str(error))
+
+    model = queryset.model._meta.label
+    filters = capture.get("filters")
+    complex_filter = ComplexFilter(queryset.model)
+    try:
+        filtered = complex_filter.filter_queryset(queryset, filters)
+        build_ms = _best_of(
+            repeat, lambda: ComplexFilter(queryset.model).filter_queryset(queryset, filters)
+        )
+    except (ComplexFilterError, ValueError, KeyError, TypeError) as error:
+        return ReplayResult(name, model, error=f"{type(error).__name__}: {error}")
+
+    rows = 0
+
+    def execute():
+        nonlocal rows
+        rows = sum(1 for _ in filtered.all().iterator())
+
+    try:
+        execute_ms = _best_of(repeat, execute)
+        sql = str(filtered.query)
+        explain = filtered.explain(**(explain_options or {}))
+    except (DatabaseError, EmptyResultSet, ValueError) as error:
+        return ReplayResult(name, model, error=f"{type(error).__name__}: {error}")
+
+    nodes = complex_filter.cost.nodes if complex_filter.cost else 0
+    return ReplayResult(name, model, nodes, build_ms, execute_ms, rows, sql, explain)
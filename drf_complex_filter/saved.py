@@ -0,0 +1,142 @@
+"""
+Server-side saved filters.
+
+Large filters can be stored on the server and referenced by ID, e.g.
+`?saved_filter=42`, instead of being sent and parsed on every request. SAVED_FILTERS
+is a mapping of ID to model and filter tree, or the dotted path to a callable
+returning that mapping, e.g. read from a model:
+
+    COMPLEX_FILTER_SETTINGS = {
+        "SAVED_FILTERS": {
+            "42": {"model": "shop.Order", "filters": {"type": "and", "data": [...]}},
+        },
+    }
+
+Every saved filter is validated and compiled into a plan once per process, when
+the app is ready for a mapping and on first use for a callable. A request binds the
+plan, so only its request dependent leaves are evaluated again, and a client filter
+is ANDed onto the bound result without recompiling the saved part. The async
+filter API loads a callable's filters outside the event loop.
+"""
+
+import json
+import threading
+from typing import Any, Dict, Mapping, Optional, Type
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Model
+from django.utils.module_loading import import_string
+
+from drf_complex_filter.plan import FilterPlan
+from drf_complex_filter.settings import filter_settings, on_settings_change
+
+
+class SavedFilter:
+    """
+    A saved filter compiled for its model.
+
+    Attributes:
+        key: ID of the filter, as given in the query parameter
+        model: Model the filter applies to
+        filters: Filter dictionary
+        plan: Compiled plan, bound for every request
+    """
+
+    __slots__ = ("key", "model", "filters", "plan")
+
+    def __init__(self, key: str, model: Type[Model], filters: dict, plan: FilterPlan):
+        self.key = key
+        self.model = model
+        self.filters = filters
+        self.plan = plan
+
+    def __repr__(self) -> str:
+        return f"<SavedFilter {self.key} {self.model._meta.label}>"
+
+
+def compile_saved_filters(definitions: Mapping[Any, Mapping[str, Any]]) -> Dict[str, SavedFilter]:
+    """
+    Validate and compile saved filter definitions.
+
+    Args:
+        definitions: Mapping of ID to `{"model": "app_label.Model", "filters": {...}}`,
+            filters may also be JSON strings
+
+    Returns:
+        SavedFilter by ID, IDs converted to strings
+
+    Raises:
+        ImproperlyConfigured: If a definition has an unknown model or an invalid filter
+    """
+    from drf_complex_filter.utils import ComplexFilter
+
+    saved_filters = {}
+    for key, definition in definitions.items():
+        key = str(key)
+        try:
+            model = apps.get_model(definition["model"])
+            filters = definition["filters"]
+            if isinstance(filters, (str, bytes)):
+                # e.g. a TextField of a model
+                filters = json.loads(filters)
+            plan = ComplexFilter(model).get_plan(filters)
+        except (KeyError, LookupError, TypeError, ValueError) as error:
+            raise ImproperlyConfigured(f"Saved filter '{key}' is invalid: {error!r}")
+        saved_filters[key] = SavedFilter(key, model, filters, plan)
+    return saved_filters
+
+
+_saved_filters: Optional[Dict[str, SavedFilter]] = None
+_saved_filters_lock = threading.Lock()
+
+
+def get_saved_filters() -> Dict[str, SavedFilter]:
+    """Return the compiled saved filters, loading them on first use."""
+    global _saved_filters
+    saved_filters = _saved_filters
+    if saved_filters is None:
+        with _saved_filters_lock:
+            if _saved_filters is None:
+                definitions = filter_settings["SAVED_FILTERS"]
+                if isinstance(definitions, str):
+                    definitions = import_string(definitions)()
+                _saved_filters = compile_saved_filters(definitions)
+            saved_filters = _saved_filters
+    return saved_filters
+
+
+async def aget_saved_filters() -> Dict[str, SavedFilter]:
+    """
+    Async version of get_saved_filters.
+
+    A SAVED_FILTERS callable may use the ORM, the first load runs in a thread.
+    """
+    saved_filters = _saved_filters
+    if saved_filters is None:
+        saved_filters = await sync_to_async(get_saved_filters)()
+    return saved_filters
+
+
+def get_saved_filter(key: Any) -> Optional[SavedFilter]:
+    """Return the saved filter of an ID, None if there is none."""
+    return get_saved_filters().get(str(key))
+
+
+async def aget_saved_filter(key: Any) -> Optional[SavedFilter]:
+    """Async version of get_saved_filter."""
+    return (await aget_saved_filters()).get(str(key))
+
+
+@on_settings_change
+def clear_saved_filters(*args, **kwargs) -> None:
+    """
+    Drop the compiled saved filters so the next use loads them again.
+
+    Call it when the filters behind a SAVED_FILTERS callable change. It accepts
+    signal arguments, so it can be connected as a post_save receiver.
+    """
+    global _saved_filters
+    with _saved_filters_lock:
+        _saved_filters = None
@@ -0,0 +1,269 @@
+"""
+Full-text matching for the `search` operator.
+
+Models opt in by listing their searchable columns in `Meta.search_fields`:
+
+    class Article(models.Model):
+        class Meta:
+            search_fields = ("title", "body")
+
+A `search` condition on one of these fields, or on a relation to such a model (which
+searches all of its search fields), is compiled into a FullTextMatch expression:
+
+- PostgreSQL: `SearchVector(*columns, config=...) @@ SearchQuery(value, config=...)`,
+  served by a GIN index on the same SearchVector expression
+- SQLite: `pk IN (SELECT rowid FROM <table>_fts WHERE <table>_fts MATCH ...)` when
+  the FTS5 table created by create_search_table() exists
+- other databases, or SQLite without the FTS5 table: every word of the value must be
+  contained (icontains) in one of the columns
+
+Values are split into words and every word must match. Full-text matching compares
+whole words, the fallback compares substrings.
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import BooleanField, Expression, F, IntegerField, Model, Q
+from django.db.models.lookups import IContains
+from django.db.models.sql.where import AND, OR, WhereNode
+
+from drf_complex_filter.introspection import resolve_field_path
+from drf_complex_filter.settings import filter_settings
+
+_WORD_SEPARATORS = re.compile(r"\s+")
+
+_search_tables: Dict[Tuple[str, str], bool] = {}
+_search_tables_lock = threading.Lock()
+
+
+def get_search_fields(model: Optional[Type[Model]]) -> Tuple[str, ...]:
+    """Return the names of the fields a model declares in `Meta.search_fields`."""
+    fields = getattr(getattr(model, "_meta", None), "search_fields", None) or ()
+    if isinstance(fields, str):
+        return (fields,)
+    return tuple(fields)
+
+
+def search_words(value) -> List[str]:
+    """Split a search value into words."""
+    if value is None:
+        return []
+    return [word for word in _WORD_SEPARATORS.split(str(value)) if word]
+
+
+def search_table_name(model: Type[Model]) -> str:
+    """Return the name of the SQLite FTS5 table of a model."""
+    return f"{model._meta.db_table}_fts"
+
+
+def _search_columns(model: Type[Model]) -> List[str]:
+    return [model._meta.get_field(name).column for name in get_search_fields(model)]
+
+
+def search_table_sql(model: Type[Model], connection=None) -> List[str]:
+    """
+    Return the SQLite statements creating and filling the FTS5 table of a model.
+
+    The table is an external content table over the model's table, kept in sync by
+    triggers, with the primary key as rowid.
+
+    Raises:
+        ValueError: If the model has no search fields or no integer primary key
+    """
+    connection = connection or connections[DEFAULT_DB_ALIAS]
+    columns = _search_columns(model)
+    if not columns:
+        raise ValueError(f"{model._meta.label} has no Meta.search_fields")
+    if not isinstance(model._meta.pk, IntegerField):
+        raise ValueError(f"{model._meta.label} needs an integer primary key for FTS5")
+
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+    fts = search_table_name(model)
+    pk = model._meta.pk.column
+    names = ", ".join(quote(column) for column in columns)
+    new = ", ".join(f"new.{quote(column)}" for column in columns)
+    old = ", ".join(f"old.{quote(column)}" for column in columns)
+    insert = f"INSERT INTO {quote(fts)}(rowid, {names}) VALUES (new.{quote(pk)}, {new});"
+    delete = (
+        f"INSERT INTO {quote(fts)}({quote(fts)}, rowid, {names}) "
+        f"VALUES ('delete', old.{quote(pk)}, {old});"
+    )
+    return [
+        f"CREATE VIRTUAL TABLE {quote(fts)} USING fts5({names}, "
+        f"content='{table}', content_rowid='{pk}')",
+        f"CREATE TRIGGER {quote(fts + '_ai')} AFTER INSERT ON {quote(table)} BEGIN {insert} END",
+        f"CREATE TRIGGER {quote(fts + '_ad')} AFTER DELETE ON {quote(table)} BEGIN {delete} END",
+        f"CREATE TRIGGER {quote(fts + '_au')} AFTER UPDATE ON {quote(table)} "
+        f"BEGIN {delete} {insert} END",
+        f"INSERT INTO {quote(fts)}({quote(fts)}) VALUES ('rebuild')",
+    ]
+
+
+def drop_search_table_sql(model: Type[Model], connection=None) -> List[str]:
+    """Return the SQLite statements dropping the FTS5 table of a model and its triggers."""
+    quote = (connection or connections[DEFAULT_DB_ALIAS]).ops.quote_name
+    fts = search_table_name(model)
+    return [
+        *(f"DROP TRIGGER IF EXISTS {quote(fts + suffix)}" for suffix in ("_ai", "_ad", "_au")),
+        f"DROP TABLE IF EXISTS {quote(fts)}",
+    ]
+
+
+def _execute(model: Type[Model], using: str, statements: Sequence[str]) -> None:
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    clear_search_tables()
+
+
+def create_search_table(model: Type[Model], using: str = DEFAULT_DB_ALIAS) -> None:
+    """
+    Create the FTS5 table of a model on a SQLite database and index existing rows.
+
+    Meant for a RunPython migration operation or the `complex_filter_search_tables`
+    management command. Does nothing on other databases.
+    """
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        _execute(model, using, search_table_sql(model, connection))
+
+
+def drop_search_table(model: Type[Model], using: str = DEFAULT_DB_ALIAS) -> None:
+    """Drop the FTS5 table of a model from a SQLite database."""
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        _execute(model, using, drop_search_table_sql(model, connection))
+
+
+def has_search_table(connection, model: Type[Model]) -> bool:
+    """Tell whether the FTS5 table of a model exists, checked once per connection alias."""
+    key = (connection.alias, search_table_name(model))
+    exists = _search_tables.get(key)
+    if exists is None:
+        with connection.cursor() as cursor:
+            exists = key[1] in connection.introspection.table_names(cursor)
+        with _search_tables_lock:
+            _search_tables[key] = exists
+    return exists
+
+
+def clear_search_tables(*args, **kwargs) -> None:
+    """Forget which FTS5 tables exist, e.g. after creating one outside create_search_table()."""
+    with _search_tables_lock:
+        _search_tables.clear()
+
+
+def _fts_string(word: str) -> str:
+    return '"' + word.replace('"', '""') + '"'
+
+
+class FullTextMatch(Expression):
+    """Boolean expression matching every word of a value against text columns."""
+
+    conditional = True
+
+    def __init__(
+        self,
+        pk,
+        columns: Sequence,
+        model: Type[Model],
+        words: Sequence[str],
+        column_names: Sequence[str],
+    ):
+        super().__init__(output_field=BooleanField())
+        self.pk = pk
+        self.columns = list(columns)
+        self.model = model
+        self.words = list(words)
+        self.column_names = list(column_names)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.model._meta.label}, {self.column_names}, {self.words})"
+
+    def get_source_expressions(self):
+        return [self.pk, *self.columns]
+
+    def set_source_expressions(self, exprs):
+        self.pk, *self.columns = exprs
+
+    def as_sql(self, compiler, connection):
+        words = WhereNode(
+            [
+                WhereNode([IContains(column, word) for column in self.columns], OR)
+                for word in self.words
+            ],
+            AND,
+        )
+        return compiler.compile(words)
+
+    def as_postgresql(self, compiler, connection):
+        from django.contrib.postgres.search import SearchQuery, SearchVector
+
+        config = filter_settings["SEARCH_CONFIG"]
+        # Same expression as SearchVector(*fields, config=...) in a GIN index
+        vector = SearchVector(*self.columns, config=config).resolve_expression(compiler.query)
+        query = SearchQuery(" ".join(self.words), config=config).resolve_expression(
+            compiler.query
+        )
+        vector_sql, vector_params = compiler.compile(vector)
+        query_sql, query_params = compiler.compile(query)
+        return f"{vector_sql} @@ {query_sql}", [*vector_params, *query_params]
+
+    def as_sqlite(self, compiler, connection):
+        if not has_search_table(connection, self.model):
+            return self.as_sql(compiler, connection)
+
+        pk_sql, pk_params = compiler.compile(self.pk)
+        fts = connection.ops.quote_name(search_table_name(self.model))
+        columns = " ".join(_fts_string(column) for column in self.column_names)
+        match = f"{{{columns}}} : ({' AND '.join(_fts_string(word) for word in self.words)})"
+        sql = f"{pk_sql} IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)"
+        return sql, [*pk_params, match]
+
+
+def search_query(model: Optional[Type[Model]], path: str, value) -> Optional[Q]:
+    """
+    Build the Q object of a `search` condition.
+
+    Args:
+        model: Model the condition applies to
+        path: Attribute path with `__` separators
+        value: Words to search
+
+    Returns:
+        Q object, or None when the path is neither a search field nor a relation
+        to a model with search fields
+    """
+    field_path = resolve_field_path(model, path)
+    field = field_path.field
+    if field is None or field.name != path.rsplit("__", maxsplit=1)[-1]:
+        return None
+
+    if field_path.is_relation:
+        search_model = field_path.model
+        names = get_search_fields(search_model)
+        prefix = path
+        pk = F(path)
+    else:
+        search_model = field.model
+        if field.name not in get_search_fields(search_model):
+            return None
+        names = (field.name,)
+        prefix = path.rsplit("__", maxsplit=1)[0] if "__" in path else ""
+        pk = F(prefix) if prefix else F("pk")
+
+    if not names:
+        return None
+
+    words = search_words(value)
+    if not words:
+        return Q()
+
+    columns = [F(f"{prefix}__{name}" if prefix else name) for name in names]
+    column_names = [search_model._meta.get_field(name).column for name in names]
+    return Q(FullTextMatch(pk, columns, search_model, words, column_names))
@@ -5,9 +5,10 @@ This module handles the configuration settings for the DRF Complex Filter packag
 Settings can be overridden in your Django settings file using the COMPLEX_FILTER_SETTINGS dictionary.
 """
 
-from typing import Any, Dict
+from typing import Any, Callable, Dict
 
 from django.conf import settings
+from django.core.signals import setting_changed
 
 DEFAULTS: Dict[str, Any] = {
     # Classes that provide filter operators
@@ -21,14 +22,115 @@ DEFAULTS: Dict[str, Any] = {
         "drf_complex_filter.functions.DateFunctions",
     ],
     
+    # Value functions computed once per bucket of that many seconds, e.g. {"now": 60}
+    # truncates `now` to the minute so filters using it can hit the result cache
+    "VALUE_FUNCTION_TIME_BUCKETS": {},
+
     # The query parameter name for filters in the URL
     "QUERY_PARAMETER": "filters",
+
+    # The query parameter name of a saved filter ID, e.g. ?saved_filter=42
+    "SAVED_FILTER_PARAMETER": "saved_filter",
+
+    # Saved filters by ID, {"42": {"model": "shop.Order", "filters": {...}}}, or the
+    # dotted path to a callable returning that mapping, e.g. read from a model
+    "SAVED_FILTERS": {},
     
     # Default field to use when no field is specified
     "DEFAULT_LOOKUP_FIELD": None,
     
     # Default comparison function to use when no operator is specified
     "DEFAULT_COMPARISON_FUNCTION": None,
+
+    # Dotted path to the JSON decoder for the query parameter, e.g. "orjson.loads".
+    # None uses orjson or ujson when installed and the json module otherwise.
+    "JSON_DECODER": None,
+
+    # Maximum size in bytes of the raw query parameter, None means unlimited.
+    # Also applies to the JSON of a compressed filter once decompressed, which is
+    # limited to 1 MiB when this is None.
+    "MAX_FILTER_BYTES": None,
+
+    # Maximum nesting depth of arrays/objects in the raw query parameter, checked
+    # before decoding. A condition inside one and/or group has a depth of 4,
+    # or 2 in the compact array form.
+    "MAX_FILTER_JSON_DEPTH": None,
+
+    # How `Model___field` conditions are turned into SQL: "in" (id IN subquery),
+    # "exists" (correlated EXISTS) or "join" (plain join when the path is a forward
+    # relation to the model, "in" otherwise)
+    "SUBQUERY_STRATEGY": "in",
+
+    # `in`/`not_in` lists longer than this are sent as a single array/JSON parameter
+    # (PostgreSQL/SQLite) or as chunked IN lists (other databases), None disables it
+    "LARGE_IN_LIST_THRESHOLD": 1000,
+
+    # Chunk size of IN lists on databases without an array/JSON form
+    "IN_LIST_CHUNK_SIZE": 500,
+
+    # Treat a leading/trailing `*` in `*` and `!` values as a wildcard: `abc*` is a
+    # prefix match (istartswith), `*abc` a suffix match (iendswith)
+    "WILDCARD_SYNTAX": False,
+
+    # PostgreSQL text search configuration of the `search` operator. GIN indexes
+    # must use the same configuration, e.g. to_tsvector('simple', ...)
+    "SEARCH_CONFIG": "simple",
+
+    # Limits checked before a filter is compiled, None means unlimited.
+    # Keys: "nodes", "depth", "joins", "subqueries", "in_list_size"
+    "COST_LIMITS": {},
+
+    # Simplify filter trees before compiling (flatten groups, remove duplicates,
+    # merge `or` of `=` on one attribute into `in`)
+    "OPTIMIZE_FILTERS": True,
+
+    # Dotted path to a callable receiving a FilterMetrics object with per-phase
+    # timings after every filtered queryset, None disables the callback
+    "METRICS_CALLBACK": None,
+
+    # Django cache used by the filter result caches
+    "CACHE_ALIAS": "default",
+
+    # Seconds a filtered queryset's count() is cached for, e.g. by pagination;
+    # None disables the count cache
+    "COUNT_CACHE_TIMEOUT": None,
+
+    # Seconds the primary keys matching a filter are cached for, later requests
+    # with the same filter become `pk IN (...)`; None disables the result cache
+    "RESULT_CACHE_TIMEOUT": None,
+
+    # Results with more primary keys than this are not cached, None for no limit
+    "RESULT_CACHE_MAX_IDS": 10000,
+
+    # The "adaptive" subquery strategy inlines the IDs of subqueries matching at
+    # most this many rows and keeps the nested subquery otherwise
+    "SUBQUERY_INLINE_THRESHOLD": 100,
+
+    # Count the (model, attribute, operator) predicates clients filter by, for the
+    # complex_filter_indexes management command
+    "RECORD_USAGE": False,
+
+    # Seconds between merges of the recorded usage into the cache, None to only
+    # merge on explicit usage_recorder.flush() calls
+    "USAGE_FLUSH_INTERVAL": 60,
+
+    # Dotted path to a DRF permission class or a `(request, view) -> bool` callable
+    # allowing the debug output of ComplexQueryFilter, None disables debugging
+    "DEBUG_PERMISSION": None,
+
+    # Query parameter requesting the debug output, e.g. ?filters_debug=1
+    "DEBUG_PARAMETER": "filters_debug",
+
+    # Maximum number of filters counted by one ComplexFilter.count_many call,
+    # None means unlimited
+    "BATCH_COUNT_LIMIT": 50,
+
+    # Maximum number of compiled filter plans kept in memory, 0 disables the cache
+    "PLAN_CACHE_SIZE": 256,
+
+    # Attribute paths resolved at startup, {"app_label.Model": ["user__profile__name"]}.
+    # A value of None resolves every field of the model.
+    "WARM_FIELD_PATHS": {},
 }
 
 # Get user-defined settings
@@ -36,3 +138,36 @@ COMPLEX_FILTER_SETTINGS: Dict[str, Any] = getattr(settings, "COMPLEX_FILTER_SETT
 
 # Merge default settings with user-defined settings
 filter_settings: Dict[str, Any] = {**DEFAULTS, **COMPLEX_FILTER_SETTINGS}
+
+
+def reload_filter_settings(*args, **kwargs) -> None:
+    """
+    Rebuild filter_settings in place when COMPLEX_FILTER_SETTINGS is changed.
+
+    The dictionary is updated in place because other modules import it by name.
+    """
+    if kwargs.get("setting") != "COMPLEX_FILTER_SETTINGS":
+        return
+
+    user_settings = kwargs.get("value") or {}
+    filter_settings.clear()
+    filter_settings.update({**DEFAULTS, **user_settings})
+
+
+setting_changed.connect(reload_filter_settings)
+
+
+def on_settings_change(func: Callable[[], Any]) -> Callable[[], Any]:
+    """
+    Call `func` without arguments whenever COMPLEX_FILTER_SETTINGS is changed.
+
+    Used by the process-wide caches built from the settings, e.g. to drop them under
+    override_settings in tests. Returns `func`, so it can be used as a decorator.
+    """
+    def receiver(*args, **kwargs):
+        if kwargs.get("setting") == "COMPLEX_FILTER_SETTINGS":
+            func()
+
+    # The receiver is the only reference to the closure, keep it alive
+    setting_changed.connect(receiver, weak=False)
+    return func
@@ -0,0 +1,180 @@
+"""
+Internal representation of a filter tree.
+
+Filters arrive as nested dictionaries:
+
+    {"type": "and", "data": [{"type": "operator", "data": {...}}, ...]}
+
+or in the compact array form, without the `type`/`data` envelope:
+
+    ["and", ["age", ">", 18], ["or", ["name", "*", "ann"], ["owner", "me"]]]
+
+Both are parsed into Condition and Group nodes, which the compiler, the plan cache
+and the other tree passes work on.
+"""
+
+import json
+from typing import Any, List, NamedTuple, Optional, Tuple, Union
+
+from drf_complex_filter.exceptions import ComplexFilterError
+
+LOGICAL_OPERATIONS = ("and", "or")
+
+
+class Condition(NamedTuple):
+    """
+    A single `attribute operator value` leaf.
+
+    `subquery` optionally overrides SUBQUERY_STRATEGY for `Model___field` attributes.
+    """
+
+    attribute: str
+    operator: str
+    value: Any = None
+    subquery: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        """Return the condition in the `data` format of an operator node."""
+        data = {"attribute": self.attribute, "operator": self.operator, "value": self.value}
+        if self.subquery is not None:
+            data["subquery"] = self.subquery
+        return data
+
+
+class Group(NamedTuple):
+    """An `and`/`or` node combining child nodes."""
+
+    operation: str
+    children: Tuple[Any, ...]
+
+
+Node = Union[Condition, Group]
+
+
+def parse_tree(filters: dict) -> Optional[Node]:
+    """
+    Convert a filter dictionary into a tree of Condition and Group nodes.
+
+    Nodes of an unknown type are dropped, the same way generate_query ignores them.
+
+    Args:
+        filters: Filter configuration dictionary
+
+    Returns:
+        Root node or None if the filter is empty
+    """
+    filter_type = filters["type"]
+    if filter_type == "operator":
+        data = filters["data"]
+        return Condition(
+            data["attribute"].replace(".", "__"),
+            data["operator"],
+            data.get("value"),
+            data.get("subquery"),
+        )
+
+    if filter_type in LOGICAL_OPERATIONS:
+        children = []
+        for child in filters["data"]:
+            node = parse_tree(child)
+            if node is not None:
+                children.append(node)
+        return Group(filter_type, tuple(children))
+
+    return None
+
+
+def parse_compact(filters: list) -> Optional[Node]:
+    """
+    Convert a filter in the compact array form into a tree.
+
+    Groups are `[operation, child, ...]` and conditions `[attribute, operator]`,
+    `[attribute, operator, value]` or `[attribute, operator, value, subquery]`.
+    A list starting with `and`/`or` followed by lists only is a group.
+
+    Args:
+        filters: Filter in the compact array form
+
+    Returns:
+        Root node
+
+    Raises:
+        ComplexFilterError: If a node is neither a group nor a condition
+    """
+    if not isinstance(filters, list) or not filters:
+        raise ComplexFilterError(f"Invalid compact filter node: {filters!r}")
+
+    head = filters[0]
+    if head in LOGICAL_OPERATIONS:
+        children = [parse_compact(child) for child in filters[1:] if isinstance(child, list)]
+        if len(children) == len(filters) - 1:
+            return Group(head, tuple(children))
+
+    size = len(filters)
+    if not isinstance(head, str) or not 2 <= size <= 4 or not isinstance(filters[1], str):
+        raise ComplexFilterError(f"Invalid compact filter node: {filters!r}")
+    attribute = head.replace(".", "__")
+    # Unpacked by size, the most common shapes are the cheapest
+    if size == 3:
+        return Condition(attribute, filters[1], filters[2])
+    if size == 2:
+        return Condition(attribute, filters[1])
+    return Condition(attribute, filters[1], filters[2], filters[3])
+
+
+def parse_filters(filters: Union[dict, list]) -> Optional[Node]:
+    """Convert a filter in the dictionary or the compact array form into a tree."""
+    if isinstance(filters, list):
+        return parse_compact(filters)
+    return parse_tree(filters)
+
+
+def tree_to_compact(node: Optional[Node]) -> Optional[List[Any]]:
+    """Convert a node into the compact array form, None for an empty tree."""
+    if node is None:
+        return None
+    if isinstance(node, Condition):
+        if node.subquery is not None:
+            return [node.attribute, node.operator, node.value, node.subquery]
+        if node.value is None:
+            return [node.attribute, node.operator]
+        return [node.attribute, node.operator, node.value]
+    return [node.operation] + [tree_to_compact(child) for child in node.children]
+
+
+def tree_to_dict(node: Node) -> dict:
+    """Convert a node back into the verbose dictionary format."""
+    if isinstance(node, Condition):
+        return {"type": "operator", "data": node.as_dict()}
+    return {"type": node.operation, "data": [tree_to_dict(child) for child in node.children]}
+
+
+def _to_canonical(node: Node) -> list:
+    if isinstance(node, Condition):
+        if node.subquery is not None:
+            return [node.attribute, node.operator, node.value, node.subquery]
+        return [node.attribute, node.operator, node.value]
+    return [node.operation] + [_to_canonical(child) for child in node.children]
+
+
+def canonical_json(node: Optional[Node]) -> str:
+    """
+    Serialize a tree into a stable JSON string usable as a cache key.
+
+    Raises:
+        TypeError: If a value is not JSON serializable
+    """
+    if node is None:
+        return "null"
+    return json.dumps(
+        _to_canonical(node), sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+
+
+def tree_shape(node: Optional[Node]) -> str:
+    """Describe a tree without its values, e.g. `and(group1 =,or(integer >,user me))`."""
+    if node is None:
+        return ""
+    if isinstance(node, Condition):
+        return f"{node.attribute} {node.operator}"
+    return f"{node.operation}({','.join(tree_shape(child) for child in node.children)})"
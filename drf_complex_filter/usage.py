@@ -0,0 +1,148 @@
+"""
+Recorder of the attributes and operators clients filter by.
+
+With RECORD_USAGE on, every filter adds one count per (model, attribute path,
+operator) of its conditions. Counts are kept in memory and merged into the Django
+cache every USAGE_FLUSH_INTERVAL seconds, where the `complex_filter_indexes`
+management command reads them. Merges run in a background thread, so neither sync
+requests nor the event loop of the async API wait for the cache. Merging is a
+plain read-modify-write, concurrent flushes from several processes can lose a few
+counts.
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple, Type
+
+from django.db.models import Model
+
+from drf_complex_filter.caching import KEY_PREFIX, get_cache
+from drf_complex_filter.comparisons import wildcard_comparison
+from drf_complex_filter.introspection import get_model_index, split_model_reference
+from drf_complex_filter.settings import filter_settings, on_settings_change
+from drf_complex_filter.tree import Condition, Node
+
+USAGE_KEY = f"{KEY_PREFIX}:usage"
+
+#: Upper bound of distinct predicates kept, attribute paths come from client input
+MAX_USAGE_KEYS = 10000
+
+UsageKey = Tuple[str, str, str]
+
+
+def _effective_operator(condition: Condition) -> str:
+    """Return the operator of a condition, or the prefix/suffix lookup of a wildcard value."""
+    if condition.operator in ("*", "!"):
+        value, lookup = wildcard_comparison(condition.value)
+        if lookup != "icontains":
+            return lookup
+    return condition.operator
+
+
+class UsageRecorder:
+    """Thread-safe counter of (model label, attribute path, operator) usage."""
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+        self._flush_thread: Optional[threading.Thread] = None
+
+    def record_tree(self, model: Optional[Type[Model]], tree: Optional[Node]) -> None:
+        """Count every condition of a filter tree, following `Model___field` subqueries."""
+        if model is None or tree is None:
+            return
+        nodes = [tree]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, Condition):
+                self._record_attribute(model, node.attribute, _effective_operator(node))
+            else:
+                nodes.extend(node.children)
+        self._maybe_flush()
+
+    def _record_attribute(self, model: Type[Model], attribute: str, operator: str) -> None:
+        if "___" not in attribute:
+            self.record(model, attribute, operator)
+            return
+
+        main_attribute, sub_attribute = attribute.split("___", maxsplit=1)
+        path, sub_model_name = split_model_reference(main_attribute)
+        if path:
+            # The outer side of the subquery compares the relation's column with IN
+            self.record(model, path, "in")
+        sub_model = get_model_index().get(sub_model_name)
+        if sub_model is not None:
+            self._record_attribute(sub_model, sub_attribute, operator)
+
+    def record(self, model: Type[Model], attribute: str, operator: str) -> None:
+        key = (model._meta.label_lower, attribute, operator)
+        with self._lock:
+            if key in self._counts or len(self._counts) < MAX_USAGE_KEYS:
+                self._counts[key] += 1
+
+    def _maybe_flush(self) -> None:
+        interval = filter_settings["USAGE_FLUSH_INTERVAL"]
+        if interval is None or time.monotonic() - self._flushed_at < interval:
+            return
+        with self._lock:
+            if self._flush_thread is not None and self._flush_thread.is_alive():
+                return
+            # Requests do not wait for the cache, the merge happens in the background
+            self._flushed_at = time.monotonic()
+            self._flush_thread = threading.Thread(
+                target=self.flush, name="complex-filter-usage-flush", daemon=True
+            )
+            self._flush_thread.start()
+
+    def wait_for_flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until a background merge started by a request is done."""
+        flush_thread = self._flush_thread
+        if flush_thread is not None:
+            flush_thread.join(timeout)
+
+    def flush(self) -> None:
+        """Merge the counts recorded by this process into the Django cache."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._flushed_at = time.monotonic()
+        if not counts:
+            return
+
+        cache = get_cache()
+        stored = cache.get(USAGE_KEY) or {}
+        for (label, attribute, operator), count in counts.items():
+            key = f"{label}|{attribute}|{operator}"
+            if key in stored or len(stored) < MAX_USAGE_KEYS:
+                stored[key] = stored.get(key, 0) + count
+        cache.set(USAGE_KEY, stored, timeout=None)
+
+    def load(self) -> Dict[UsageKey, int]:
+        """Return the counts stored in the cache plus the ones not flushed yet."""
+        counts: Counter = Counter()
+        for key, count in (get_cache().get(USAGE_KEY) or {}).items():
+            label, attribute, operator = key.split("|", maxsplit=2)
+            counts[(label, attribute, operator)] += count
+        with self._lock:
+            counts.update(self._counts)
+        return dict(counts)
+
+    def clear(self) -> None:
+        """
+        Forget the counts of this process.
+
+        Counts already in the cache are kept unless `reset_cache()` is called.
+        """
+        with self._lock:
+            self._counts.clear()
+            self._flushed_at = time.monotonic()
+
+    def reset_cache(self) -> None:
+        """Delete the counts stored in the cache."""
+        get_cache().delete(USAGE_KEY)
+
+
+usage_recorder = UsageRecorder()
+
+on_settings_change(usage_recorder.clear)
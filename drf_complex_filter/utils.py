@@ -1,12 +1,62 @@
-import json
-from typing import Any, Callable, Dict, Optional, Tuple, Type, Union
+import asyncio
+import inspect
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
 
-from django.apps import apps
-from django.db.models import Model, Q, QuerySet
-from django.utils.module_loading import import_string
+from django.db.models import Count, Exists, F, Model, OuterRef, Q, QuerySet
 from rest_framework.request import Request
 
+from drf_complex_filter.caching import acached_result, cached_result, filter_models
+from drf_complex_filter.comparisons import CommonComparison
+from drf_complex_filter.cost import FilterCost, check_cost, estimate_cost
+from drf_complex_filter.decoders import (
+    COMPRESSED_PREFIX,
+    check_payload,
+    decompress_filter,
+    is_compressed,
+)
+from drf_complex_filter.evaluation import (
+    EvaluationContext,
+    afloor_to_bucket,
+    function_key,
+    get_request_context,
+    time_bucket_cache,
+)
+from drf_complex_filter.exceptions import ComplexFilterError, FilterPayloadTooLarge
+from drf_complex_filter.functions import FunctionPolicy, get_function_policy
+from drf_complex_filter.introspection import (
+    get_model_index,
+    resolve_field_path,
+    split_model_reference,
+)
+from drf_complex_filter.metrics import NULL_METRICS, start_metrics
+from drf_complex_filter.optimizer import optimize_tree
+from drf_complex_filter.plan import (
+    ConditionPlan,
+    FilterPlan,
+    GroupPlan,
+    StaticPlan,
+    combine_queries,
+    plan_cache,
+)
+from drf_complex_filter.registry import get_registry
+from drf_complex_filter.saved import SavedFilter, aget_saved_filter, get_saved_filter
 from drf_complex_filter.settings import filter_settings
+from drf_complex_filter.tree import Condition, Node, canonical_json, parse_filters
+from drf_complex_filter.usage import usage_recorder
+
+SUBQUERY_STRATEGIES = ("in", "exists", "join", "adaptive")
 
 
 class ComplexFilter:
@@ -18,58 +68,63 @@ class ComplexFilter:
 
     Attributes:
         model: The Django model to filter
+        registry: Shared registry of operators and functions
         comparisons: Dictionary of available comparison operators
         functions: Dictionary of available value computation functions
         default_comparison: Default comparison function for custom operators
+        cost: Cost of the last filter compiled or taken from the plan cache
+        models: Models the last filter depends on, used to invalidate cached results
+        metrics: Phase timings of the current filter, NULL_METRICS when disabled
+        is_subquery_filter: Filter built for a `Model___field` subquery, whose
+            conditions are already recorded by the outer filter
+        context: Memoized value function results of filters without a request,
+            shared with subquery filters
     """
 
     def __init__(self, model: Optional[Type[Model]] = None):
         """
         Initialize the ComplexFilter.
 
+        Operators and functions come from the process-wide registry, so creating
+        a filter does not import or instantiate any configured class.
+
         Args:
             model: Django model class to filter
         """
         self.model = model
-        self.comparisons: Dict[str, Callable] = {}
-        self._load_comparisons()
-
-        self.functions: Dict[str, Callable] = {}
-        self._load_functions()
-
-        self.default_comparison = self._load_default_comparison()
-
-    def _load_comparisons(self) -> None:
-        """Load comparison operators from settings."""
-        for comparison_path in filter_settings["COMPARISON_CLASSES"]:
-            comparison_module = import_string(comparison_path)()
-            self.comparisons.update(comparison_module.get_operators())
 
-    def _load_functions(self) -> None:
-        """Load value computation functions from settings."""
-        for function_path in filter_settings["VALUE_FUNCTIONS"]:
-            function_module = import_string(function_path)()
-            self.functions.update(function_module.get_functions())
+        self.registry = registry = get_registry()
+        self.comparisons: Mapping[str, Callable] = registry.comparisons
+        self.functions: Mapping[str, Callable] = registry.functions
+        self.default_comparison: Optional[Callable] = registry.default_comparison
 
-    def _load_default_comparison(self) -> Optional[Callable]:
-        """Load default comparison function from settings."""
-        if filter_settings["DEFAULT_COMPARISON_FUNCTION"]:
-            return import_string(filter_settings["DEFAULT_COMPARISON_FUNCTION"])
-        return None
+        self.cost: Optional[FilterCost] = None
+        self.models: FrozenSet[Type[Model]] = frozenset()
+        self.metrics = start_metrics(model, registry.metrics_callback)
+        self.is_subquery_filter = False
+        self.context = EvaluationContext()
 
     def filter_queryset(
         self,
         queryset: QuerySet,
         filters: Union[dict, str, None],
-        request: Optional[Request] = None
+        request: Optional[Request] = None,
+        saved_filter: Union[SavedFilter, str, None] = None
     ) -> QuerySet:
         """
         Apply complex filters to a queryset.
 
+        When RESULT_CACHE_TIMEOUT is set, the primary keys of the matching rows are
+        cached and the queryset is filtered by them instead.
+
+        When metrics are enabled, the phase timings are reported to METRICS_CALLBACK
+        and the filter_metrics signal once the queryset is built.
+
         Args:
             queryset: Base queryset to filter
             filters: Filter configuration as dict or JSON string
             request: Optional request object for context-aware filtering
+            saved_filter: Optional SavedFilter or ID of one, ANDed with the filter
 
         Returns:
             Filtered queryset
@@ -90,58 +145,342 @@ class ComplexFilter:
             ... }
             >>> filtered_qs = complex_filter.filter_queryset(User.objects.all(), filter_config)
         """
-        query, annotation = self.generate_query(filters, request)
+        query, annotation = self.generate_query(filters, request, saved_filter)
         if query:
-            queryset = queryset.annotate(**annotation).filter(query)
+            with self.metrics.phase("annotate"):
+                filtered = queryset.annotate(**annotation).filter(query)
+            if filter_settings["RESULT_CACHE_TIMEOUT"] is not None:
+                queryset = cached_result(queryset, filtered, self.models, self.metrics)
+            else:
+                queryset = filtered
+
+        if filters or saved_filter:
+            self._emit_metrics()
 
         return queryset
 
-    def generate_query(
+    async def afilter_queryset(
         self,
+        queryset: QuerySet,
         filters: Union[dict, str, None],
+        request: Optional[Request] = None,
+        saved_filter: Union[SavedFilter, str, None] = None
+    ) -> QuerySet:
+        """
+        Async version of filter_queryset.
+
+        Async value functions and comparisons are awaited, the result cache uses
+        the async cache and ORM APIs.
+        """
+        query, annotation = await self.agenerate_query(filters, request, saved_filter)
+        if query:
+            with self.metrics.phase("annotate"):
+                filtered = queryset.annotate(**annotation).filter(query)
+            if filter_settings["RESULT_CACHE_TIMEOUT"] is not None:
+                queryset = await acached_result(queryset, filtered, self.models, self.metrics)
+            else:
+                queryset = filtered
+
+        if filters or saved_filter:
+            self._emit_metrics()
+
+        return queryset
+
+    def count_many(
+        self,
+        queryset: QuerySet,
+        filters: Union[Mapping[str, Any], Sequence[Any]],
+        request: Optional[Request] = None
+    ) -> Union[Dict[str, int], List[int]]:
+        """
+        Count the rows matching each of many filters with a single query.
+
+        Every filter becomes a `Count("pk", filter=Q)` of one aggregate() call.
+        Annotations of all filters are added to the queryset, and counts are
+        distinct when a filter crosses a many-valued relation. The models the
+        counts depend on are stored in `self.models`.
+
+        Args:
+            queryset: Base queryset, the same for every filter
+            filters: Filters as dicts or JSON strings, by name or in a list.
+                Empty filters count every row.
+            request: Optional request object for context-aware filtering
+
+        Returns:
+            Counts by name, or in the order of the list
+
+        Raises:
+            ComplexFilterError: If there are more than BATCH_COUNT_LIMIT filters, a
+                filter is not valid (e.g. `filters` is a single filter in the compact
+                form) or two filters add different annotations under the same name
+
+        Example:
+            >>> complex_filter.count_many(Order.objects.all(), {"open": open_filter, "late": late_filter})
+            {"open": 12, "late": 3}
+        """
+        names, items = self._start_batch(filters)
+        results, models = [], set()
+        for item in items:
+            results.append(self.generate_query_from_dict(item, request) if item else (None, {}))
+            models.update(self.models if item else ())
+        self.models = frozenset(models)
+        annotation, aggregates = self._count_aggregates(results)
+        counts = queryset.annotate(**annotation).aggregate(**aggregates)
+        return self._collect_counts(names, counts)
+
+    async def acount_many(
+        self,
+        queryset: QuerySet,
+        filters: Union[Mapping[str, Any], Sequence[Any]],
         request: Optional[Request] = None
+    ) -> Union[Dict[str, int], List[int]]:
+        """Async version of count_many."""
+        names, items = self._start_batch(filters)
+        results, models = [], set()
+        for item in items:
+            results.append(
+                await self.agenerate_query_from_dict(item, request) if item else (None, {})
+            )
+            models.update(self.models if item else ())
+        self.models = frozenset(models)
+        annotation, aggregates = self._count_aggregates(results)
+        counts = await queryset.annotate(**annotation).aaggregate(**aggregates)
+        return self._collect_counts(names, counts)
+
+    def _start_batch(
+        self, filters: Union[Mapping[str, Any], Sequence[Any]]
+    ) -> Tuple[Optional[List[str]], List[Optional[dict]]]:
+        names = list(filters) if isinstance(filters, Mapping) else None
+        items = list(filters.values()) if names is not None else list(filters)
+        limit = filter_settings["BATCH_COUNT_LIMIT"]
+        if limit is not None and len(items) > limit:
+            raise ComplexFilterError(f"Too many filters: {len(items)}, maximum is {limit}")
+
+        if names is None and items and self._is_compact_head(items[0]):
+            # e.g. ["and", [...], [...]], a single filter and not a list of filters
+            raise ComplexFilterError(
+                "Expected a list of filters, got a filter in the compact form"
+            )
+
+        # One evaluation context for the whole batch
+        self._start_evaluation()
+        decoded = []
+        for index, item in enumerate(items):
+            filters = self._decode_filters(item)
+            if item and not isinstance(filters, (dict, list)):
+                # Counting every row would look like a valid answer
+                name = names[index] if names is not None else index
+                raise ComplexFilterError(f"Filter '{name}' is not valid")
+            decoded.append(filters)
+        return names, decoded
+
+    @staticmethod
+    def _is_compact_head(item: Any) -> bool:
+        """Tell whether a list item is the operation or attribute of a compact filter."""
+        if not isinstance(item, str):
+            return False
+        item = item.strip()
+        return bool(item) and not item.startswith(("{", "[", COMPRESSED_PREFIX))
+
+    def _count_aggregates(
+        self, results: List[Tuple[Optional[Q], Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], Dict[str, Count]]:
+        annotation: Dict[str, Any] = {}
+        for _, sub_annotation in results:
+            for name, expression in sub_annotation.items():
+                if name in annotation and annotation[name] != expression:
+                    raise ComplexFilterError(f"Filters add different annotations named '{name}'")
+                annotation[name] = expression
+
+        # Rows joined through a many-valued relation would be counted more than once
+        paths = [path for query, _ in results for path in self._lookup_paths(query)]
+        paths += [path for expression in annotation.values() for path in self._lookup_paths(expression)]
+        distinct = any(resolve_field_path(self.model, path).is_multi_valued for path in paths)
+        aggregates = {
+            f"count_{index}": Count("pk", filter=query or None, distinct=distinct)
+            for index, (query, _) in enumerate(results)
+        }
+        return annotation, aggregates
+
+    @classmethod
+    def _lookup_paths(cls, node: Any) -> List[str]:
+        """Return the field paths a Q object or an expression refers to."""
+        if node is None:
+            return []
+        if isinstance(node, Q):
+            return [path for child in node.children for path in cls._lookup_paths(child)]
+        if isinstance(node, tuple):
+            return [node[0]] + cls._lookup_paths(node[1])
+        if hasattr(node, "flatten"):
+            return [expression.name for expression in node.flatten() if isinstance(expression, F)]
+        return []
+
+    @staticmethod
+    def _collect_counts(
+        names: Optional[List[str]], counts: Dict[str, int]
+    ) -> Union[Dict[str, int], List[int]]:
+        values = [counts[f"count_{index}"] for index in range(len(counts))]
+        if names is None:
+            return values
+        return dict(zip(names, values))
+
+    def _emit_metrics(self) -> None:
+        """Report the metrics of the current filter and start new ones."""
+        metrics, self.metrics = self.metrics, start_metrics(
+            self.model, self.registry.metrics_callback
+        )
+        metrics.emit()
+
+    def generate_query(
+        self,
+        filters: Union[dict, str, None],
+        request: Optional[Request] = None,
+        saved_filter: Union[SavedFilter, str, None] = None
     ) -> Tuple[Optional[Q], Dict[str, Any]]:
         """
         Generate Django Q object from filter configuration.
 
         Args:
-            filters: Filter configuration as dict or JSON string
+            filters: Filter configuration as dict, compact array, JSON string or
+                compressed string (see decoders.encode_filter)
             request: Optional request object for context-aware filtering
+            saved_filter: Optional SavedFilter or ID of one, ANDed with the filter
 
         Returns:
             Tuple of (Q object for filtering, Dict of annotations)
+
+        Raises:
+            FilterPayloadTooLarge: If a JSON string is over MAX_FILTER_BYTES
+                or MAX_FILTER_JSON_DEPTH
+            ComplexFilterError: If the saved filter does not exist or is for
+                another model
         """
-        if not filters:
-            return None, {}
+        self._start_evaluation()
+        saved_filter = self.resolve_saved_filter(saved_filter)
+        filters = self._decode_filters(filters)
+        result = self.generate_query_from_dict(filters, request) if filters else (None, {})
+        if saved_filter is None:
+            return result
 
-        if isinstance(filters, str):
-            try:
-                filters = json.loads(filters)
-            except (TypeError, json.decoder.JSONDecodeError):
-                return None, {}
+        with self.metrics.phase("bind"):
+            saved_result = saved_filter.plan.bind(self, request)
+        return self._and_saved_filter(saved_filter, saved_result, result, bool(filters))
+
+    async def agenerate_query(
+        self,
+        filters: Union[dict, str, None],
+        request: Optional[Request] = None,
+        saved_filter: Union[SavedFilter, str, None] = None
+    ) -> Tuple[Optional[Q], Dict[str, Any]]:
+        """Async version of generate_query."""
+        self._start_evaluation()
+        saved_filter = await self.aresolve_saved_filter(saved_filter)
+        filters = self._decode_filters(filters)
+        result = await self.agenerate_query_from_dict(filters, request) if filters else (None, {})
+        if saved_filter is None:
+            return result
+
+        with self.metrics.phase("bind"):
+            saved_result = await saved_filter.plan.abind(self, request)
+        return self._and_saved_filter(saved_filter, saved_result, result, bool(filters))
+
+    def resolve_saved_filter(
+        self, saved_filter: Union[SavedFilter, str, None]
+    ) -> Optional[SavedFilter]:
+        """
+        Return the SavedFilter of an ID.
+
+        Raises:
+            ComplexFilterError: If the saved filter does not exist or is for
+                another model
+        """
+        if saved_filter is None or isinstance(saved_filter, SavedFilter):
+            found = saved_filter
+        else:
+            found = get_saved_filter(saved_filter)
+        return self._check_saved_filter(saved_filter, found)
+
+    async def aresolve_saved_filter(
+        self, saved_filter: Union[SavedFilter, str, None]
+    ) -> Optional[SavedFilter]:
+        """Async version of resolve_saved_filter."""
+        if saved_filter is None or isinstance(saved_filter, SavedFilter):
+            found = saved_filter
+        else:
+            found = await aget_saved_filter(saved_filter)
+        return self._check_saved_filter(saved_filter, found)
+
+    def _check_saved_filter(
+        self, saved_filter: Union[SavedFilter, str, None], found: Optional[SavedFilter]
+    ) -> Optional[SavedFilter]:
+        if found is None:
+            if saved_filter is not None:
+                raise ComplexFilterError(f"Saved filter '{saved_filter}' not found")
+            return None
+        if found.model is not self.model:
+            raise ComplexFilterError(
+                f"Saved filter '{found.key}' is for {found.model._meta.label}, "
+                f"not {self.model._meta.label}"
+            )
+        return found
+
+    def _and_saved_filter(
+        self,
+        saved_filter: SavedFilter,
+        saved_result: Tuple[Optional[Q], Dict[str, Any]],
+        result: Tuple[Optional[Q], Dict[str, Any]],
+        has_filters: bool,
+    ) -> Tuple[Optional[Q], Dict[str, Any]]:
+        if has_filters:
+            # COST_LIMITS only apply to the client filter
+            self.models = self.models | saved_filter.plan.models
+        else:
+            self.cost = saved_filter.plan.cost
+            self.models = saved_filter.plan.models
+        return combine_queries("and", [saved_result, result])
 
-        return self.generate_query_from_dict(filters, request)
+    def _decode_filters(
+        self, filters: Union[dict, list, str, bytes, None]
+    ) -> Optional[Union[dict, list]]:
+        """
+        Decode a JSON or compressed filter string.
 
-    def generate_query(self, filters: Union[dict, str, None], request: Optional[Request] = None):
+        Returns:
+            Filter in the dictionary or the compact array form, None if it is empty
+            or not valid
+        """
         if not filters:
-            return None, {}
+            return None
 
-        if isinstance(filters, str):
+        if isinstance(filters, (str, bytes)):
+            max_bytes = filter_settings["MAX_FILTER_BYTES"]
+            max_depth = filter_settings["MAX_FILTER_JSON_DEPTH"]
+            check_payload(filters, max_bytes, max_depth)
             try:
-                filters = json.loads(filters)  # Converts string to dictionary
-            except (TypeError, json.decoder.JSONDecodeError):
-                return None, {}
+                with self.metrics.phase("parse"):
+                    if is_compressed(filters):
+                        filters = decompress_filter(filters, max_bytes)
+                        check_payload(filters, None, max_depth)
+                    filters = self.registry.json_loads(filters)
+            except FilterPayloadTooLarge:
+                raise
+            except (TypeError, ValueError):
+                return None
 
-        return self.generate_query_from_dict(filters, request)
+        return filters
 
     def generate_query_from_dict(
         self,
-        filters: dict,
+        filters: Union[dict, list],
         request: Optional[Request] = None
     ) -> Tuple[Optional[Q], Dict[str, Any]]:
         """
         Create a Django Q object from a dictionary of filter conditions.
 
+        The dictionary is compiled into a plan (or taken from the plan cache)
+        and the plan is bound to the request. A filter in the compact array form
+        is accepted as well.
+
         Args:
             filters: Dictionary containing filter configuration
             request: Optional request object for context-aware filtering
@@ -152,16 +491,152 @@ class ComplexFilter:
         Raises:
             ValueError: If an invalid operator is specified and no default comparison is set
         """
-        query = None
-        annotation: Dict[str, Any] = {}
+        plan = self.get_plan(filters)
+        with self.metrics.phase("bind"):
+            return plan.bind(self, request)
+
+    async def agenerate_query_from_dict(
+        self,
+        filters: Union[dict, list],
+        request: Optional[Request] = None
+    ) -> Tuple[Optional[Q], Dict[str, Any]]:
+        """
+        Async version of generate_query_from_dict.
 
-        filter_type = filters["type"]
-        if filter_type == "operator":
-            query, annotation = self._handle_operator(filters["data"], request)
-        elif filter_type in ("and", "or"):
-            query, annotation = self._handle_logical_operation(filter_type, filters["data"], request)
+        Compiling runs inline, it does not touch the database. Late-bound conditions
+        are awaited when they use async value functions or comparisons.
+        """
+        plan = self.get_plan(filters)
+        with self.metrics.phase("bind"):
+            return await plan.abind(self, request)
 
-        return query, annotation
+    def _start_evaluation(self) -> None:
+        if not self.is_subquery_filter:
+            # Filters without a request get fresh values on every call
+            self.context = EvaluationContext()
+
+    def get_plan(self, filters: Union[dict, list]) -> FilterPlan:
+        """
+        Get the compiled plan for a filter dictionary.
+
+        The filter is simplified by optimize_tree unless OPTIMIZE_FILTERS is off.
+        Plans are cached by filter class, model and canonical filter JSON.
+        Filters with values that cannot be serialized to JSON are compiled
+        without being cached. The cost of the filter is checked against
+        COST_LIMITS before compiling and stored in `self.cost`, the models it
+        depends on are stored in `self.models`.
+
+        Args:
+            filters: Dictionary containing filter configuration, or the
+                filter in the compact array form
+
+        Returns:
+            Compiled filter plan
+
+        Raises:
+            FilterCostExceeded: If the filter is over one of the COST_LIMITS
+        """
+        metrics = self.metrics
+        with metrics.phase("parse"):
+            tree = parse_filters(filters)
+            if filter_settings["OPTIMIZE_FILTERS"]:
+                tree = optimize_tree(tree, self.model, merge_in=self._can_merge_into_in())
+        if filter_settings["RECORD_USAGE"] and not self.is_subquery_filter:
+            # Recorded on every call, cached plans skip _handle_operator
+            usage_recorder.record_tree(self.model, tree)
+
+        with metrics.phase("compile"):
+            try:
+                key = (type(self), self.model, canonical_json(tree))
+            except (TypeError, ValueError):
+                key = None
+
+            plan = plan_cache.get(key) if key is not None else None
+            cache_hit = plan is not None
+            if plan is None:
+                cost = estimate_cost(tree, self.model)
+                check_cost(cost, filter_settings["COST_LIMITS"])
+                plan = self.compile(tree)
+                plan.cost = cost
+                plan.models = filter_models(tree, self.model)
+                if key is not None:
+                    plan_cache.set(key, plan)
+            else:
+                check_cost(plan.cost, filter_settings["COST_LIMITS"])
+
+        if metrics.enabled:
+            metrics.tree = tree
+            metrics.cost = plan.cost
+            metrics.plan_cache_hit = cache_hit
+
+        self.cost = plan.cost
+        self.models = plan.models
+        return plan
+
+    def compile(self, tree: Optional[Node]) -> FilterPlan:
+        """
+        Compile a filter tree into a plan.
+
+        Conditions that do not depend on the request are turned into Q objects
+        right away, the rest are evaluated when the plan is bound.
+
+        Args:
+            tree: Root node of the filter tree
+
+        Returns:
+            Compiled filter plan
+        """
+        if tree is None:
+            return StaticPlan(None, {})
+
+        if isinstance(tree, Condition):
+            if self._is_late_bound(tree):
+                return ConditionPlan(tree)
+            return StaticPlan(*self._handle_operator(tree.as_dict(), None))
+
+        static_results = []
+        late_bound = []
+        for child in tree.children:
+            plan = self.compile(child)
+            if plan.is_static:
+                static_results.append((plan.query, plan.annotation))
+            else:
+                late_bound.append(plan)
+
+        static = StaticPlan(*combine_queries(tree.operation, static_results))
+        if not late_bound:
+            return static
+        return GroupPlan(tree.operation, static, tuple(late_bound))
+
+    def _can_merge_into_in(self) -> bool:
+        """Tell whether `=` and `in` have the meaning the optimizer relies on."""
+        equal_class = self.registry.operator_classes.get("=")
+        return (
+            equal_class is not None
+            and equal_class is self.registry.operator_classes.get("in")
+            and issubclass(equal_class, CommonComparison)
+        )
+
+    def _is_late_bound(self, condition: Condition) -> bool:
+        """Tell whether a condition has to be evaluated for every request."""
+        value = condition.value
+        if isinstance(value, dict) and "func" in value and not self._is_pure(value["func"]):
+            return True
+        if "___" in condition.attribute and (
+            condition.subquery or filter_settings["SUBQUERY_STRATEGY"]
+        ) == "adaptive":
+            # The inlined IDs depend on the data at the time of the request
+            return True
+        return self.registry.is_request_dependent(condition.operator)
+
+    def _is_pure(self, func: Any) -> bool:
+        """Tell whether a value function can be computed when the filter is compiled."""
+        function = self.functions.get(func) if isinstance(func, str) else None
+        return (
+            function is not None
+            and self._function_policy(func, function).pure
+            and not inspect.iscoroutinefunction(function)
+        )
 
     def _handle_operator(
         self,
@@ -173,41 +648,144 @@ class ComplexFilter:
         attribute = condition["attribute"].replace(".", "__")
 
         if "___" in attribute:
-            attribute, operator, value = self._calculate_subquery(
-                attribute, operator, condition.get("value"), request
-            )
-        else:
-            value = self.get_filter_value(condition, request)
+            return self._handle_subquery(attribute, condition, request)
+
+        value = self.get_filter_value(condition, request)
+        return self._apply_comparison(attribute, operator, value, request)
+
+    async def _ahandle_operator(
+        self,
+        condition: dict,
+        request: Optional[Request]
+    ) -> Tuple[Optional[Q], Dict[str, Any]]:
+        """Async version of _handle_operator."""
+        operator = condition["operator"]
+        attribute = condition["attribute"].replace(".", "__")
+
+        if "___" in attribute:
+            return await self._ahandle_subquery(attribute, condition, request)
+
+        value = await self.aget_filter_value(condition, request)
+        return await self._aapply_comparison(attribute, operator, value, request)
 
+    def _call_comparison(
+        self,
+        attribute: str,
+        operator: str,
+        value: Any,
+        request: Optional[Request]
+    ) -> Any:
         if operator in self.comparisons:
-            result = self.comparisons[operator](attribute, value, request, self.model)
-        elif self.default_comparison:
-            result = self.default_comparison(attribute, operator, value, request, self.model)
-        else:
-            raise ValueError(f"Operator '{operator}' not found")
+            return self.comparisons[operator](attribute, value, request, self.model)
+        if self.default_comparison:
+            return self.default_comparison(attribute, operator, value, request, self.model)
+        raise ValueError(f"Operator '{operator}' not found")
+
+    def _apply_comparison(
+        self,
+        attribute: str,
+        operator: str,
+        value: Any,
+        request: Optional[Request]
+    ) -> Tuple[Optional[Q], Dict[str, Any]]:
+        """
+        Call the comparison registered for an operator.
 
+        Raises:
+            ComplexFilterError: If the comparison is async
+        """
+        result = self._call_comparison(attribute, operator, value, request)
+        if inspect.isawaitable(result):
+            if inspect.iscoroutine(result):
+                result.close()
+            raise ComplexFilterError(
+                f"Operator '{operator}' is async, use the async filter API"
+            )
         return result if isinstance(result, tuple) else (result, {})
 
-    def _handle_logical_operation(
+    async def _aapply_comparison(
         self,
-        operation: str,
-        conditions: list,
+        attribute: str,
+        operator: str,
+        value: Any,
         request: Optional[Request]
     ) -> Tuple[Optional[Q], Dict[str, Any]]:
-        """Handle AND/OR operations."""
-        query = None
-        annotation: Dict[str, Any] = {}
+        """Call the comparison registered for an operator, awaiting async ones."""
+        result = self._call_comparison(attribute, operator, value, request)
+        if inspect.isawaitable(result):
+            result = await result
+        return result if isinstance(result, tuple) else (result, {})
 
-        for filter_data in conditions:
-            sub_query, sub_annotation = self.generate_query_from_dict(filter_data, request)
-            if sub_query:
-                if operation == "and":
-                    query = query & sub_query if query else sub_query
-                else:  # operation == "or"
-                    query = query | sub_query if query else sub_query
-                annotation.update(sub_annotation)
+    @staticmethod
+    def _get_subquery_strategy(condition: dict) -> str:
+        strategy = condition.get("subquery") or filter_settings["SUBQUERY_STRATEGY"]
+        if strategy not in SUBQUERY_STRATEGIES:
+            raise ComplexFilterError(f"Subquery strategy '{strategy}' not found")
+        return strategy
 
-        return query, annotation
+    def _handle_subquery(
+        self,
+        attribute: str,
+        condition: dict,
+        request: Optional[Request]
+    ) -> Tuple[Optional[Q], Dict[str, Any]]:
+        """
+        Handle a `Model___field` condition with the configured subquery strategy.
+
+        The strategy comes from the condition's `subquery` key or from the
+        SUBQUERY_STRATEGY setting. The "join" strategy falls back to "in" when the
+        path before the model name is not a single-valued relation to that model.
+        The "adaptive" strategy is "in" with small results inlined as literal IDs.
+        """
+        strategy = self._get_subquery_strategy(condition)
+        operator = condition["operator"]
+        value = condition.get("value")
+
+        if strategy == "join":
+            result = self._join_subquery(attribute, operator, value, request)
+            if result is not None:
+                return result
+        elif strategy == "exists":
+            return self._exists_subquery(attribute, operator, value, request), {}
+
+        attribute, operator, value = self._calculate_subquery(
+            attribute, operator, value, request
+        )
+        if strategy == "adaptive":
+            value = self._materialize_subquery(value)
+        return self._apply_comparison(attribute, operator, value, request)
+
+    async def _ahandle_subquery(
+        self,
+        attribute: str,
+        condition: dict,
+        request: Optional[Request]
+    ) -> Tuple[Optional[Q], Dict[str, Any]]:
+        """Async version of _handle_subquery."""
+        strategy = self._get_subquery_strategy(condition)
+        operator = condition["operator"]
+        value = condition.get("value")
+
+        if strategy == "join":
+            join = self._get_join_condition(attribute, operator, value)
+            if join is not None:
+                join_condition, path = join
+                return self._require_join(
+                    path, *await self._ahandle_operator(join_condition, request)
+                )
+
+        main_attribute, sub_attribute = attribute.split("___", maxsplit=1)
+        path, sub_model = self._split_model_reference(main_attribute)
+        sub_queryset = await self._abuild_subquery(
+            sub_model, sub_attribute, operator, value, request
+        )
+        if strategy == "exists":
+            return self._exists_query(path, sub_queryset), {}
+
+        attribute, operator, value = self._in_subquery(path, sub_queryset)
+        if strategy == "adaptive":
+            value = await self._amaterialize_subquery(value)
+        return await self._aapply_comparison(attribute, operator, value, request)
 
     def get_filter_value(
         self,
@@ -223,27 +801,146 @@ class ComplexFilter:
 
         Returns:
             Computed or raw filter value
+
+        Raises:
+            ComplexFilterError: If the value function is async
         """
+        value = self._call_value_function(condition, request)
+        if inspect.isawaitable(value):
+            if inspect.iscoroutine(value):
+                value.close()
+            raise ComplexFilterError(
+                f"Value function '{condition['value']['func']}' is async, "
+                "use the async filter API"
+            )
+        return value
+
+    async def aget_filter_value(
+        self,
+        condition: dict,
+        request: Optional[Request] = None
+    ) -> Any:
+        """Async version of get_filter_value, awaiting async value functions."""
+        value = self._call_value_function(condition, request, is_async=True)
+        if inspect.isawaitable(value):
+            value = await value
+        return value
+
+    def _call_value_function(
+        self, condition: dict, request: Optional[Request], is_async: bool = False
+    ) -> Any:
         if "value" not in condition:
             return None
 
         value = condition["value"]
         if isinstance(value, dict) and "func" in value:
             func = value["func"]
-            if func in self.functions:
+            if isinstance(func, str) and func in self.functions:
                 kwargs = value.get("kwargs", {})
-                return self.functions[func](request=request, model=self.model, **kwargs)
+                return self._evaluate_function(func, kwargs, request, is_async)
 
         return value
 
+    def _function_policy(self, func: str, function: Callable) -> FunctionPolicy:
+        """Return the policy of a value function, also when it is not registered."""
+        return self.registry.function_policies.get(func) or get_function_policy(function)
+
+    def _evaluate_function(
+        self, func: str, kwargs: Dict[str, Any], request: Optional[Request], is_async: bool
+    ) -> Any:
+        """
+        Call a value function at most once per evaluation context and kwargs.
+
+        Time-bucketed sync functions are memoized process-wide instead. With
+        is_async, async functions are memoized as tasks that every leaf awaits.
+        """
+        function = self.functions[func]
+        policy = self._function_policy(func, function)
+
+        def compute():
+            result = function(request=request, model=self.model, **kwargs)
+            if is_async and inspect.isawaitable(result):
+                if policy.time_bucket:
+                    result = afloor_to_bucket(result, policy.time_bucket)
+                return asyncio.ensure_future(result)
+            return result
+
+        key = function_key(func, kwargs, self.model if policy.uses_model else None)
+        if key is None:
+            return compute()
+        if policy.time_bucket and not inspect.iscoroutinefunction(function):
+            # Tasks are bound to an event loop, async functions are memoized per request
+            return time_bucket_cache.get(key, policy.time_bucket, compute)
+        context = get_request_context(request) or self.context
+        return context.get(key + (is_async,), compute)
+
     @staticmethod
     def _get_model_by_name(model_name: str) -> Optional[Type[Model]]:
-        """Get Django model class by its name."""
-        all_models = apps.get_models(include_auto_created=True, include_swapped=True)
-        for model in all_models:
-            if model_name.lower() == model.__name__.lower():
-                return model
-        return None
+        """
+        Get Django model class by its name or `app_label.Model` label.
+
+        Raises:
+            AmbiguousModelError: If a bare name matches models from several apps
+        """
+        return get_model_index().get(model_name)
+
+    def _split_model_reference(self, main_attribute: str) -> Tuple[str, Type[Model]]:
+        """
+        Split the part before `___` into a relation path and the subquery model.
+
+        The model may be qualified with its app label, e.g. `user__auth__User`.
+        """
+        path, sub_model_name = split_model_reference(main_attribute)
+        sub_model = self._get_model_by_name(sub_model_name)
+        if not sub_model:
+            raise ComplexFilterError(f"Model '{sub_model_name}' not found")
+        return path, sub_model
+
+    def _get_sub_filter(self, sub_model: Type[Model]) -> "ComplexFilter":
+        sub_filter = ComplexFilter(sub_model)
+        # Time spent in the sub filter is part of this filter's subquery phase
+        sub_filter.metrics = NULL_METRICS
+        sub_filter.is_subquery_filter = True
+        sub_filter.context = self.context
+        return sub_filter
+
+    def _build_subquery(
+        self,
+        sub_model: Type[Model],
+        sub_attribute: str,
+        operator: str,
+        value: Any,
+        request: Optional[Request]
+    ) -> QuerySet:
+        """Build the queryset of sub model rows matching the condition."""
+        filters = {
+            "type": "operator",
+            "data": {"attribute": sub_attribute, "operator": operator, "value": value},
+        }
+        with self.metrics.phase("subquery"):
+            sub_filter = self._get_sub_filter(sub_model)
+            sub_query, sub_annotation = sub_filter.generate_query_from_dict(filters, request)
+            return sub_model.objects.annotate(**sub_annotation).filter(sub_query)
+
+    async def _abuild_subquery(
+        self,
+        sub_model: Type[Model],
+        sub_attribute: str,
+        operator: str,
+        value: Any,
+        request: Optional[Request]
+    ) -> QuerySet:
+        """Async version of _build_subquery."""
+        filters = {
+            "type": "operator",
+            "data": {"attribute": sub_attribute, "operator": operator, "value": value},
+        }
+        with self.metrics.phase("subquery"):
+            sub_filter = self._get_sub_filter(sub_model)
+            sub_query, sub_annotation = await sub_filter.agenerate_query_from_dict(
+                filters, request
+            )
+            return sub_model.objects.annotate(**sub_annotation).filter(sub_query)
 
     def _calculate_subquery(
         self,
@@ -259,7 +956,8 @@ class ComplexFilter:
         that gets the IDs of matching related objects.
 
         Args:
-            attribute: Field path with model prefix (e.g., "Profile___is_verified")
+            attribute: Field path with model prefix (e.g., "Profile___is_verified",
+                "user__Profile___is_verified" or "accounts.Profile___is_verified")
             operator: Comparison operator
             value: Filter value
             request: Optional request object
@@ -268,24 +966,120 @@ class ComplexFilter:
             Tuple of (modified attribute, new operator, computed value)
         """
         main_attribute, sub_attribute = attribute.split("___", maxsplit=1)
-        sub_model_name = main_attribute.rsplit("__", maxsplit=1)[-1]
-        sub_model = self._get_model_by_name(sub_model_name)
+        path, sub_model = self._split_model_reference(main_attribute)
+        sub_queryset = self._build_subquery(sub_model, sub_attribute, operator, value, request)
+        return self._in_subquery(path, sub_queryset)
 
-        if not sub_model:
-            raise ValueError(f"Model '{sub_model_name}' not found")
+    @staticmethod
+    def _in_subquery(path: str, sub_queryset: QuerySet) -> Tuple[str, str, Any]:
+        # Make reference to current model's ID or to the related model's FK column
+        attribute = f"{path}_id" if path else "id"
+        return attribute, "in", sub_queryset.values_list("id", flat=True)
 
-        filters = {
-            "type": "operator",
-            "data": {"attribute": sub_attribute, "operator": operator, "value": value},
-        }
-        sub_query, sub_annotation = ComplexFilter(sub_model).generate_query_from_dict(
-            filters, request
-        )
-        sub_queryset = sub_model.objects.annotate(**sub_annotation).filter(sub_query)
+    def _exists_subquery(
+        self,
+        attribute: str,
+        operator: str,
+        value: Any,
+        request: Optional[Request]
+    ) -> Q:
+        """
+        Build a correlated EXISTS subquery for related model filtering.
 
-        if "__" in main_attribute:
-            # Make reference to current model's ID instead of related model
-            sub_model_name = "_" + sub_model_name
+        Matches the same rows as _calculate_subquery, with the sub model's ID
+        compared to an OuterRef instead of an IN list.
+        """
+        main_attribute, sub_attribute = attribute.split("___", maxsplit=1)
+        path, sub_model = self._split_model_reference(main_attribute)
+        sub_queryset = self._build_subquery(sub_model, sub_attribute, operator, value, request)
+        return self._exists_query(path, sub_queryset)
 
-        attribute = main_attribute.replace(sub_model_name, "id")
-        return attribute, "in", sub_queryset.values_list("id", flat=True)
+    def _materialize_subquery(self, values: QuerySet) -> Union[QuerySet, List[Any]]:
+        """
+        Inline the IDs of a small subquery.
+
+        Fetches at most SUBQUERY_INLINE_THRESHOLD + 1 IDs and returns them as a list
+        when they fit, or the unchanged subquery otherwise.
+        """
+        threshold = filter_settings["SUBQUERY_INLINE_THRESHOLD"]
+        with self.metrics.phase("execute"):
+            ids = list(values[:threshold + 1])
+        return self._choose_subquery_form(values, ids, threshold)
+
+    async def _amaterialize_subquery(self, values: QuerySet) -> Union[QuerySet, List[Any]]:
+        """Async version of _materialize_subquery."""
+        threshold = filter_settings["SUBQUERY_INLINE_THRESHOLD"]
+        with self.metrics.phase("execute"):
+            ids = [value async for value in values[:threshold + 1]]
+        return self._choose_subquery_form(values, ids, threshold)
+
+    def _choose_subquery_form(
+        self, values: QuerySet, ids: List[Any], threshold: int
+    ) -> Union[QuerySet, List[Any]]:
+        if len(ids) <= threshold:
+            self.metrics.increment("subquery_inlined")
+            return ids
+        self.metrics.increment("subquery_nested")
+        return values
+
+    @staticmethod
+    def _exists_query(path: str, sub_queryset: QuerySet) -> Q:
+        outer_attribute = f"{path}_id" if path else "id"
+        return Q(Exists(sub_queryset.filter(id=OuterRef(outer_attribute))))
+
+    def _join_subquery(
+        self,
+        attribute: str,
+        operator: str,
+        value: Any,
+        request: Optional[Request]
+    ) -> Optional[Tuple[Optional[Q], Dict[str, Any]]]:
+        """
+        Rewrite a `relation__Model___field` condition into a plain join.
+
+        Only possible when the relation is a single-valued forward relation to
+        the model, or when there is no relation and the model is the filtered one.
+
+        Returns:
+            Tuple of (Q object, Dict of annotations) or None if a join is not possible
+        """
+        join = self._get_join_condition(attribute, operator, value)
+        if join is None:
+            return None
+        condition, path = join
+        return self._require_join(path, *self._handle_operator(condition, request))
+
+    def _get_join_condition(
+        self, attribute: str, operator: str, value: Any
+    ) -> Optional[Tuple[dict, str]]:
+        """Return the condition on the joined path and the relation path, if joinable."""
+        main_attribute, sub_attribute = attribute.split("___", maxsplit=1)
+        path, sub_model = self._split_model_reference(main_attribute)
+
+        if not path:
+            if sub_model is not self.model:
+                return None
+            return {"attribute": sub_attribute, "operator": operator, "value": value}, path
+
+        field_path = resolve_field_path(self.model, path)
+        field = field_path.field
+        if (
+            field is None
+            or field.name != path.rsplit("__", maxsplit=1)[-1]
+            or field_path.model is not sub_model
+            or field_path.is_multi_valued
+            or not (field.many_to_one or field.one_to_one)
+        ):
+            return None
+
+        condition = {"attribute": f"{path}__{sub_attribute}", "operator": operator, "value": value}
+        return condition, path
+
+    @staticmethod
+    def _require_join(
+        path: str, query: Optional[Q], annotation: Dict[str, Any]
+    ) -> Tuple[Optional[Q], Dict[str, Any]]:
+        if path and query:
+            # Rows without a related object never match the IN form either
+            query = Q(**{f"{path}__isnull": False}) & query
+        return query, annotation
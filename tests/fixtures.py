@@ -60,3 +60,11 @@ RECORDS = [
         "boolean": False,
     },
 ]
+
+
+def operator(attribute, operator, value=None, subquery=None):
+    """Return a single condition in the dictionary form."""
+    data = {"attribute": attribute, "operator": operator, "value": value}
+    if subquery:
+        data["subquery"] = subquery
+    return {"type": "operator", "data": data}
@@ -7,6 +7,7 @@ class LookupFieldTestModel(models.Model):
 
     class Meta:
         lookup_fields = "lookup_field"
+        search_fields = ("lookup_field",)
 
 
 class MultipleLookupFieldsTestModel(models.Model):
@@ -47,3 +48,6 @@ class TestCaseModel(models.Model):
     multiple_field_lookup = models.ForeignKey(
         MultipleLookupFieldsTestModel, on_delete=models.CASCADE, blank=True, null=True
     )
+
+    class Meta:
+        search_fields = ("group1", "group2")
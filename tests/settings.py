@@ -1,6 +1,6 @@
 import django.db.models.options as options
 
-options.DEFAULT_NAMES = options.DEFAULT_NAMES + ("lookup_fields", "lookup_by_model")
+options.DEFAULT_NAMES = options.DEFAULT_NAMES + ("lookup_fields", "lookup_by_model", "search_fields")
 
 SECRET_KEY = "secret"
 
@@ -8,6 +8,7 @@ INSTALLED_APPS = [
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "rest_framework",
+    "drf_complex_filter",
     "tests",
 ]
 
@@ -0,0 +1,189 @@
+import asyncio
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from drf_complex_filter.caching import result_cache_stats
+from drf_complex_filter.exceptions import ComplexFilterError
+from drf_complex_filter.filters import AsyncComplexQueryFilter
+from drf_complex_filter.plan import ConditionPlan, plan_cache
+from drf_complex_filter.registry import get_registry
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import RECORDS, operator
+from .models import LookupFieldTestModel, TestCaseModel
+
+
+class Awaitable:
+    """Awaitable that is not a coroutine and has no close()."""
+
+    def __init__(self, result):
+        self.result = result
+
+    def __await__(self):
+        yield from asyncio.sleep(0).__await__()
+        return self.result
+
+
+class AsyncComparison:
+    request_dependent = False
+
+    def get_operators(self):
+        return {
+            "async_gte": self.greater_or_equal,
+            "awaitable_gte": self.awaitable_greater_or_equal,
+        }
+
+    @staticmethod
+    async def greater_or_equal(field, value=None, request=None, model=None):
+        await asyncio.sleep(0)
+        return Q(**{f"{field}__gte": value})
+
+    @staticmethod
+    def awaitable_greater_or_equal(field, value=None, request=None, model=None):
+        return Awaitable(Q(**{f"{field}__gte": value}))
+
+
+class AsyncFunctions:
+    def get_functions(self):
+        return {"async_limit": self.limit}
+
+    @staticmethod
+    async def limit(request=None, model=None, value=0, **kwargs):
+        await asyncio.sleep(0)
+        return value
+
+
+ASYNC_SETTINGS = {
+    "COMPARISON_CLASSES": [
+        "drf_complex_filter.comparisons.CommonComparison",
+        "drf_complex_filter.comparisons.DynamicComparison",
+        "tests.test_async.AsyncComparison",
+    ],
+    "VALUE_FUNCTIONS": [
+        "drf_complex_filter.functions.DateFunctions",
+        "tests.test_async.AsyncFunctions",
+    ],
+}
+
+
+ASYNC_FUNCTION_FILTER = operator("integer", ">=", {"func": "async_limit", "kwargs": {"value": 3}})
+
+
+@override_settings(COMPLEX_FILTER_SETTINGS=ASYNC_SETTINGS)
+class AsyncFilterTests(TestCase):
+    def setUp(self):
+        plan_cache.clear()
+        lookup = LookupFieldTestModel.objects.create(lookup_field="value")
+        for record in RECORDS:
+            TestCaseModel.objects.create(simple_lookup=lookup, **record)
+
+    async def filter_count(self, filters):
+        queryset = await ComplexFilter(TestCaseModel).afilter_queryset(
+            TestCaseModel.objects.all(), filters
+        )
+        return await queryset.acount()
+
+    def test_async_comparison_is_late_bound(self):
+        self.assertTrue(get_registry().is_request_dependent("async_gte"))
+        plan = ComplexFilter(TestCaseModel).get_plan(operator("integer", "async_gte", 3))
+        self.assertIsInstance(plan, ConditionPlan)
+
+    async def test_async_value_function(self):
+        expected = await TestCaseModel.objects.filter(integer__gte=3).acount()
+        self.assertEqual(await self.filter_count(ASYNC_FUNCTION_FILTER), expected)
+
+    async def test_async_comparison(self):
+        expected = await TestCaseModel.objects.filter(integer__gte=2).acount()
+        self.assertEqual(await self.filter_count(operator("integer", "async_gte", 2)), expected)
+
+    async def test_group_with_sync_and_async_leaves(self):
+        filters = {
+            "type": "and",
+            "data": [
+                ASYNC_FUNCTION_FILTER,
+                operator("integer", "async_gte", 2),
+                operator("group1", "=", "GROUP3"),
+            ],
+        }
+        expected = await TestCaseModel.objects.filter(integer__gte=3, group1="GROUP3").acount()
+        self.assertEqual(await self.filter_count(filters), expected)
+
+    async def test_async_subquery(self):
+        for strategy in ("in", "exists", "join", "adaptive"):
+            filters = {
+                "type": "operator",
+                "data": {
+                    "attribute": "simple_lookup.LookupFieldTestModel___lookup_field",
+                    "operator": "async_gte",
+                    "value": "value",
+                    "subquery": strategy,
+                },
+            }
+            with self.subTest(strategy=strategy):
+                self.assertEqual(await self.filter_count(filters), len(RECORDS))
+
+    def test_sync_api_rejects_async_function(self):
+        with self.assertRaisesMessage(ValueError, "async_limit"):
+            ComplexFilter(TestCaseModel).generate_query(ASYNC_FUNCTION_FILTER)
+
+    def test_sync_api_rejects_async_comparison(self):
+        with self.assertRaisesMessage(ValueError, "async_gte"):
+            ComplexFilter(TestCaseModel).generate_query(operator("integer", "async_gte", 1))
+
+    def test_sync_api_rejects_awaitable_comparison(self):
+        with self.assertRaisesMessage(ComplexFilterError, "awaitable_gte"):
+            ComplexFilter(TestCaseModel).generate_query(operator("integer", "awaitable_gte", 1))
+
+    async def test_result_cache(self):
+        cache.clear()
+        result_cache_stats.clear()
+        filters = operator("integer", ">=", 2)
+        expected = await TestCaseModel.objects.filter(integer__gte=2).acount()
+        with override_settings(COMPLEX_FILTER_SETTINGS={**ASYNC_SETTINGS, "RESULT_CACHE_TIMEOUT": 60}):
+            self.assertEqual(await self.filter_count(filters), expected)
+            self.assertEqual(await self.filter_count(filters), expected)
+            self.assertEqual(result_cache_stats.stats()["hits"], 1)
+
+    async def test_result_cache_keeps_filter_of_large_results(self):
+        cache.clear()
+        result_cache_stats.clear()
+        filters = operator("integer", ">=", 0)
+        settings = {**ASYNC_SETTINGS, "RESULT_CACHE_TIMEOUT": 60, "RESULT_CACHE_MAX_IDS": 1}
+        with override_settings(COMPLEX_FILTER_SETTINGS=settings):
+            self.assertEqual(await self.filter_count(filters), len(RECORDS))
+            self.assertEqual(result_cache_stats.stats()["skipped"], 1)
+
+
+@override_settings(COMPLEX_FILTER_SETTINGS=ASYNC_SETTINGS)
+class AsyncBackendTests(TestCase):
+    def setUp(self):
+        for record in RECORDS:
+            TestCaseModel.objects.create(**record)
+
+    def get_request(self, filters):
+        return Request(APIRequestFactory().get("/test/", data={"filters": filters}))
+
+    async def test_backend(self):
+        request = self.get_request(
+            '{"type":"operator","data":{"attribute":"integer","operator":"async_gte","value":4}}'
+        )
+        queryset = await AsyncComplexQueryFilter().afilter_queryset(
+            request, TestCaseModel.objects.all(), None
+        )
+        expected = await TestCaseModel.objects.filter(integer__gte=4).acount()
+        self.assertEqual(await queryset.acount(), expected)
+        self.assertEqual(request.complex_filter_cost.nodes, 1)
+
+    async def test_backend_invalid_filter(self):
+        request = self.get_request(
+            '{"type":"operator","data":{"attribute":"Missing___id","operator":"=","value":1}}'
+        )
+        with self.assertRaises(ValidationError):
+            await AsyncComplexQueryFilter().afilter_queryset(
+                request, TestCaseModel.objects.all(), None
+            )
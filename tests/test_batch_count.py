@@ -0,0 +1,167 @@
+import json
+
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from parameterized import parameterized
+from rest_framework.test import APITestCase
+
+from drf_complex_filter.exceptions import ComplexFilterError
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import operator
+from .models import LookupFieldTestModel, MultipleLookupFieldsTestModel, TestCaseModel
+
+
+FILTERS = {
+    "first": operator("group1", "=", "first"),
+    "large": operator("integer", ">", 1),
+    "either": {
+        "type": "or",
+        "data": [operator("group2", "=", "b"), operator("integer", "=", 1)],
+    },
+    "related": operator("simple_lookup", "*", "apple"),
+    "combined": operator("multiple_field_lookup", "*", "ada love"),
+    "subquery": operator("simple_lookup.LookupFieldTestModel___lookup_field", "=", "apple"),
+    "grouped": operator("user.groups.name", "=", "staff"),
+    "all": None,
+}
+
+
+class BatchCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        apple = LookupFieldTestModel.objects.create(lookup_field="apple")
+        ada = MultipleLookupFieldsTestModel.objects.create(
+            lookup_field1="Ada", lookup_field2="Lovelace"
+        )
+        user = User.objects.create(username="user")
+        user.groups.add(Group.objects.create(name="staff"), Group.objects.create(name="admin"))
+        TestCaseModel.objects.create(
+            group1="first", group2="a", integer=1, simple_lookup=apple,
+            multiple_field_lookup=ada, user=user,
+        )
+        TestCaseModel.objects.create(group1="first", group2="b", integer=2, user=user)
+        TestCaseModel.objects.create(group1="second", group2="b", integer=3)
+        TestCaseModel.objects.create(group1="second", group2="c", integer=None)
+
+    def expected(self, filters):
+        queryset = TestCaseModel.objects.all()
+        return {
+            name: ComplexFilter(TestCaseModel).filter_queryset(queryset, item).count()
+            for name, item in filters.items()
+        }
+
+    def test_counts_match_separate_queries(self):
+        counts = ComplexFilter(TestCaseModel).count_many(TestCaseModel.objects.all(), FILTERS)
+        self.assertEqual(counts, self.expected(FILTERS))
+        self.assertEqual(counts["grouped"], 2)
+        self.assertEqual(counts["all"], 4)
+
+    def test_single_query(self):
+        complex_filter = ComplexFilter(TestCaseModel)
+        with CaptureQueriesContext(connection) as queries:
+            complex_filter.count_many(TestCaseModel.objects.all(), FILTERS)
+        self.assertEqual(len(queries), 1)
+        self.assertIn("COUNT(DISTINCT", queries[0]["sql"])
+
+    def test_counts_are_not_distinct_without_multi_valued_relations(self):
+        with CaptureQueriesContext(connection) as queries:
+            ComplexFilter(TestCaseModel).count_many(
+                TestCaseModel.objects.all(), [FILTERS["first"], FILTERS["related"]]
+            )
+        self.assertNotIn("DISTINCT", queries[0]["sql"])
+
+    def test_list_and_json_strings(self):
+        counts = ComplexFilter(TestCaseModel).count_many(
+            TestCaseModel.objects.all(),
+            [json.dumps(FILTERS["first"]), FILTERS["large"], ""],
+        )
+        self.assertEqual(counts, [2, 2, 4])
+
+    def test_base_queryset(self):
+        counts = ComplexFilter(TestCaseModel).count_many(
+            TestCaseModel.objects.filter(group2="b"), [FILTERS["first"], FILTERS["large"]]
+        )
+        self.assertEqual(counts, [1, 2])
+
+    def test_shared_annotation(self):
+        filters = [FILTERS["combined"], operator("multiple_field_lookup", "*", "bob")]
+        counts = ComplexFilter(TestCaseModel).count_many(TestCaseModel.objects.all(), filters)
+        self.assertEqual(counts, [1, 0])
+
+    def test_models(self):
+        complex_filter = ComplexFilter(TestCaseModel)
+        complex_filter.count_many(
+            TestCaseModel.objects.all(), [FILTERS["first"], FILTERS["related"]]
+        )
+        self.assertEqual(complex_filter.models, {TestCaseModel, LookupFieldTestModel})
+
+    @override_settings(COMPLEX_FILTER_SETTINGS={"BATCH_COUNT_LIMIT": 2})
+    def test_limit(self):
+        with self.assertRaises(ComplexFilterError):
+            ComplexFilter(TestCaseModel).count_many(
+                TestCaseModel.objects.all(), [FILTERS["first"]] * 3
+            )
+
+    @parameterized.expand([
+        ("compact_group", ["and", ["integer", ">", 1], ["group1", "=", "first"]]),
+        ("compact_condition", ["integer", ">", 1]),
+        ("invalid_json", [FILTERS["first"], "{not json"]),
+        ("not_a_filter", {"first": FILTERS["first"], "number": 5}),
+    ])
+    def test_invalid_items_are_rejected(self, name, filters):
+        with self.assertRaises(ComplexFilterError):
+            ComplexFilter(TestCaseModel).count_many(TestCaseModel.objects.all(), filters)
+
+    def test_empty_batch(self):
+        counts = ComplexFilter(TestCaseModel).count_many(TestCaseModel.objects.all(), {})
+        self.assertEqual(counts, {})
+
+    async def test_async(self):
+        filters = {name: FILTERS[name] for name in ("first", "either", "combined")}
+        counts = await ComplexFilter(TestCaseModel).acount_many(
+            TestCaseModel.objects.all(), filters
+        )
+        self.assertEqual(counts, {"first": 2, "either": 3, "combined": 1})
+
+
+class FilterCountsViewTests(APITestCase):
+    def setUp(self):
+        TestCaseModel.objects.create(group1="first", group2="a", integer=1)
+        TestCaseModel.objects.create(group1="second", group2="b", integer=2)
+
+    def test_get(self):
+        filters = {"first": FILTERS["first"], "large": FILTERS["large"]}
+        response = self.client.get("/counts/filter-counts/", {"filters": json.dumps(filters)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"first": 1, "large": 1})
+
+    def test_post(self):
+        response = self.client.post(
+            "/counts/filter-counts/", [FILTERS["first"], FILTERS["all"]], format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [1, 2])
+
+    def test_invalid_filters(self):
+        response = self.client.post("/counts/filter-counts/", "first", format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("filters", response.json())
+
+    def test_compact_filter_is_not_a_batch(self):
+        filters = json.dumps(["and", ["integer", ">", 1], ["group1", "=", "second"]])
+        response = self.client.get("/counts/filter-counts/", {"filters": filters})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            "/counts/filter-counts/", [["integer", ">", 1]], format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [1])
+
+    def test_invalid_item_is_not_counted_as_every_row(self):
+        response = self.client.post(
+            "/counts/filter-counts/", {"first": FILTERS["first"], "broken": "{"}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
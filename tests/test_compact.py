@@ -0,0 +1,162 @@
+import base64
+import json
+import zlib
+
+from django.test import TestCase, override_settings
+from parameterized import parameterized
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from drf_complex_filter.decoders import decompress_filter, encode_filter
+from drf_complex_filter.exceptions import ComplexFilterError, FilterPayloadTooLarge
+from drf_complex_filter.plan import plan_cache
+from drf_complex_filter.tree import (
+    Condition,
+    Group,
+    parse_compact,
+    parse_tree,
+    tree_to_compact,
+    tree_to_dict,
+)
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import RECORDS
+from .models import TestCaseModel
+from .test_filter import TEST_CASES
+
+VERBOSE_FILTERS = [
+    (str(index), json.loads(query["filters"]), expected)
+    for index, (query, expected) in enumerate(TEST_CASES)
+    if query["filters"]
+]
+
+NESTED = {
+    "type": "and",
+    "data": [
+        {"type": "operator", "data": {"attribute": "integer", "operator": ">", "value": 1}},
+        {
+            "type": "or",
+            "data": [
+                {"type": "operator", "data": {"attribute": "user", "operator": "me"}},
+                {
+                    "type": "operator",
+                    "data": {
+                        "attribute": "simple_lookup.LookupFieldTestModel___id",
+                        "operator": "in",
+                        "value": [1, 2],
+                        "subquery": "exists",
+                    },
+                },
+            ],
+        },
+    ],
+}
+
+
+class CompactTreeTests(TestCase):
+    def test_parse(self):
+        self.assertEqual(
+            parse_compact(
+                ["and", ["integer", ">", 1], ["or", ["user", "me"], ["a.b", "in", [1, 2]]]]
+            ),
+            Group("and", (
+                Condition("integer", ">", 1),
+                Group("or", (Condition("user", "me"), Condition("a__b", "in", [1, 2]))),
+            )),
+        )
+
+    def test_round_trip(self):
+        tree = parse_tree(NESTED)
+        self.assertEqual(parse_compact(tree_to_compact(tree)), tree)
+        self.assertEqual(parse_tree(tree_to_dict(parse_compact(tree_to_compact(tree)))), tree)
+
+    def test_attribute_named_like_an_operation(self):
+        self.assertEqual(parse_compact(["or", "=", 1]), Condition("or", "=", 1))
+        self.assertEqual(parse_compact(["and"]), Group("and", ()))
+
+    @parameterized.expand([
+        ("empty", []),
+        ("scalar", 5),
+        ("one_element", ["integer"]),
+        ("too_long", ["integer", "=", 1, "in", "extra"]),
+        ("operator_not_a_string", ["integer", 5, 1]),
+        ("invalid_child", ["and", ["integer", "=", 1], "x"]),
+    ])
+    def test_invalid(self, name, filters):
+        with self.assertRaises(ComplexFilterError):
+            parse_compact(filters)
+
+    def test_encode(self):
+        self.assertEqual(encode_filter(NESTED["data"][0]), '["integer",">",1]')
+        self.assertEqual(encode_filter(["integer", ">", 1]), '["integer",">",1]')
+        self.assertEqual(encode_filter({"type": "and", "data": []}), '["and"]')
+        self.assertEqual(encode_filter(None), "")
+
+        compressed = encode_filter(NESTED, compress=True)
+        self.assertTrue(compressed.startswith("~"))
+        self.assertRegex(compressed[1:], r"^[A-Za-z0-9_-]+$")
+        self.assertEqual(decompress_filter(compressed).decode(), encode_filter(NESTED))
+
+    def test_compact_form_is_smaller(self):
+        verbose = json.dumps(NESTED, separators=(",", ":"))
+        self.assertLess(len(encode_filter(NESTED)), len(verbose) / 2)
+
+    def test_forms_share_the_plan_cache(self):
+        plan_cache.clear()
+        plan = ComplexFilter(TestCaseModel).get_plan(NESTED["data"][0])
+        self.assertIs(ComplexFilter(TestCaseModel).get_plan(["integer", ">", 1]), plan)
+
+
+class CompactFilterTests(APITestCase):
+    URL = "/test/"
+
+    def setUp(self):
+        for record in RECORDS:
+            TestCaseModel.objects.create(**record)
+
+    def get_ids(self, filters):
+        response = self.client.get(self.URL, {"filters": filters})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        return sorted(item["id"] for item in response.json())
+
+    @parameterized.expand(VERBOSE_FILTERS)
+    def test_same_results_as_verbose(self, name, filters, expected_queryset):
+        expected = sorted(record.id for record in expected_queryset)
+        self.assertEqual(self.get_ids(json.dumps(filters)), expected)
+        self.assertEqual(self.get_ids(encode_filter(filters)), expected)
+        self.assertEqual(self.get_ids(encode_filter(filters, compress=True)), expected)
+
+    def test_invalid_compact_filter(self):
+        response = self.client.get(self.URL, {"filters": '["integer", 5]'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_compressed_filter_is_ignored(self):
+        self.assertEqual(len(self.get_ids("~not base64!")), len(RECORDS))
+
+    @override_settings(COMPLEX_FILTER_SETTINGS={"MAX_FILTER_BYTES": 200})
+    def test_decompressed_size_is_limited(self):
+        filters = ["group1", "in", ["GROUP1"] * 1000]
+        compressed = encode_filter(filters, compress=True)
+        self.assertLess(len(compressed), 200)
+        with self.assertRaises(FilterPayloadTooLarge):
+            ComplexFilter(TestCaseModel).generate_query(compressed)
+        response = self.client.get(self.URL, {"filters": compressed})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_decompressed_size_is_limited_without_max_filter_bytes(self):
+        bomb = b"~" + base64.urlsafe_b64encode(
+            zlib.compress(b" " * (64 * 1024 * 1024), 9)[2:-4]
+        )
+        self.assertLess(len(bomb), 128 * 1024)
+        with self.assertRaises(FilterPayloadTooLarge):
+            decompress_filter(bomb)
+        response = self.client.get(self.URL, {"filters": bomb.decode()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(COMPLEX_FILTER_SETTINGS={"MAX_FILTER_JSON_DEPTH": 3})
+    def test_decompressed_depth_is_limited(self):
+        filters = encode_filter(
+            ["and", ["or", ["integer", "in", [1]], ["integer", "=", 2]]], compress=True
+        )
+        with self.assertRaises(FilterPayloadTooLarge):
+            ComplexFilter(TestCaseModel).generate_query(filters)
@@ -0,0 +1,86 @@
+import json
+
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from drf_complex_filter.cost import FilterCost, check_cost, estimate_cost
+from drf_complex_filter.exceptions import FilterCostExceeded
+from drf_complex_filter.tree import parse_tree
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import operator
+from .models import TestCaseModel
+
+
+NESTED_FILTER = {
+    "type": "and",
+    "data": [
+        operator("group1", "=", "GROUP1"),
+        {
+            "type": "or",
+            "data": [
+                operator("simple_lookup.lookup_field", "=", "value1"),
+                operator("integer", "in", [1, 2, 3]),
+                operator("simple_lookup.LookupFieldTestModel___lookup_field", "*", "v"),
+            ],
+        },
+    ],
+}
+
+
+class CostEstimateTests(SimpleTestCase):
+    def test_single_condition(self):
+        cost = estimate_cost(parse_tree(operator("group1", "=", "A")), TestCaseModel)
+        self.assertEqual(cost, FilterCost(nodes=1, depth=1))
+
+    def test_nested_filter(self):
+        cost = estimate_cost(parse_tree(NESTED_FILTER), TestCaseModel)
+        self.assertEqual(cost.nodes, 6)
+        self.assertEqual(cost.depth, 3)
+        self.assertEqual(cost.joins, 2)
+        self.assertEqual(cost.subqueries, 1)
+        self.assertEqual(cost.in_list_size, 3)
+
+    def test_related_lookup_counts_join(self):
+        cost = estimate_cost(parse_tree(operator("user.groups.name", "=", "A")), TestCaseModel)
+        self.assertEqual(cost.joins, 2)
+
+    def test_empty_filter(self):
+        self.assertEqual(estimate_cost(None), FilterCost())
+
+    def test_check_cost(self):
+        cost = FilterCost(nodes=10, depth=3)
+        check_cost(cost, {"nodes": 10, "depth": None})
+        with self.assertRaises(FilterCostExceeded) as error:
+            check_cost(cost, {"nodes": 9})
+        self.assertEqual(error.exception.limit, "nodes")
+        self.assertEqual(error.exception.maximum, 9)
+
+    def test_cost_is_exposed(self):
+        complex_filter = ComplexFilter(TestCaseModel)
+        complex_filter.generate_query(NESTED_FILTER)
+        self.assertEqual(complex_filter.cost.nodes, 6)
+        # Second call is served from the plan cache and keeps the cost
+        complex_filter = ComplexFilter(TestCaseModel)
+        complex_filter.generate_query(NESTED_FILTER)
+        self.assertEqual(complex_filter.cost.nodes, 6)
+
+
+class CostLimitTests(APITestCase):
+    URL = "/test/"
+
+    def test_over_budget_filter_is_rejected(self):
+        query = {"filters": json.dumps(NESTED_FILTER)}
+        with override_settings(COMPLEX_FILTER_SETTINGS={"COST_LIMITS": {"in_list_size": 2}}):
+            response = self.client.get(self.URL, query, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("in_list_size", str(response.data["filters"]))
+
+    def test_within_budget_filter_is_accepted(self):
+        query = {"filters": json.dumps(NESTED_FILTER)}
+        with override_settings(
+            COMPLEX_FILTER_SETTINGS={"COST_LIMITS": {"nodes": 6, "depth": 3, "subqueries": 1}}
+        ):
+            response = self.client.get(self.URL, query, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,115 @@
+import json
+import pickle
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from drf_complex_filter.caching import filter_models, with_count_cache
+from drf_complex_filter.tree import parse_tree
+
+from .fixtures import RECORDS, operator
+from .models import LookupFieldTestModel, TestCaseModel
+
+COUNT_CACHE = {"COUNT_CACHE_TIMEOUT": 60}
+
+
+def count_queries(queries):
+    return sum("COUNT(" in query["sql"] for query in queries)
+
+
+class FilterModelsTests(TestCase):
+    def test_plain_attribute(self):
+        tree = parse_tree(operator("integer", ">", 1))
+        self.assertEqual(filter_models(tree, TestCaseModel), {TestCaseModel})
+
+    def test_related_and_subquery_models(self):
+        tree = parse_tree({
+            "type": "or",
+            "data": [
+                operator("simple_lookup.lookup_field", "=", "a"),
+                operator("user.User___groups.name", "=", "admins"),
+            ],
+        })
+        self.assertEqual(
+            filter_models(tree, TestCaseModel),
+            {TestCaseModel, LookupFieldTestModel, User, Group, User.groups.through},
+        )
+
+
+@override_settings(COMPLEX_FILTER_SETTINGS=COUNT_CACHE)
+class CountCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        lookup = LookupFieldTestModel.objects.create(lookup_field="value")
+        for record in RECORDS:
+            TestCaseModel.objects.create(simple_lookup=lookup, **record)
+
+    def get(self, filters, page=1):
+        return self.client.get(
+            "/paginated/", data={"filters": json.dumps(filters), "page": page}
+        )
+
+    def test_count_is_cached_across_pages(self):
+        filters = operator("integer", ">=", 0)
+        with CaptureQueriesContext(connection) as queries:
+            first = self.get(filters, page=1)
+            second = self.get(filters, page=2)
+        self.assertEqual(first.data["count"], len(RECORDS))
+        self.assertEqual(second.data["count"], len(RECORDS))
+        self.assertEqual(count_queries(queries), 1)
+
+    def test_key_includes_values(self):
+        with CaptureQueriesContext(connection) as queries:
+            first = self.get(operator("integer", ">=", 0))
+            second = self.get(operator("integer", ">=", 2))
+        self.assertEqual(count_queries(queries), 2)
+        self.assertNotEqual(first.data["count"], second.data["count"])
+
+    def test_save_invalidates(self):
+        filters = operator("integer", ">=", 0)
+        self.get(filters)
+        TestCaseModel.objects.create(group1="new", group2="new", integer=10)
+        self.assertEqual(self.get(filters).data["count"], len(RECORDS) + 1)
+
+    def test_related_model_change_invalidates(self):
+        filters = operator("simple_lookup.lookup_field", "=", "value")
+        self.assertEqual(self.get(filters).data["count"], len(RECORDS))
+        LookupFieldTestModel.objects.update(lookup_field="other")
+        # update() sends no signal, the cached count is still used
+        self.assertEqual(self.get(filters).data["count"], len(RECORDS))
+        LookupFieldTestModel.objects.get().save()
+        self.assertEqual(self.get(filters).data["count"], 0)
+
+    def test_delete_invalidates(self):
+        filters = operator("integer", ">=", 0)
+        self.get(filters)
+        TestCaseModel.objects.filter(integer=0).get().delete()
+        self.assertEqual(self.get(filters).data["count"], len(RECORDS) - 1)
+
+    def test_disabled_by_default(self):
+        with override_settings(COMPLEX_FILTER_SETTINGS={}):
+            with CaptureQueriesContext(connection) as queries:
+                self.get(operator("integer", ">=", 0))
+                self.get(operator("integer", ">=", 0), page=2)
+        self.assertEqual(count_queries(queries), 2)
+
+    def test_result_cache_alone_does_not_cache_counts(self):
+        filters = operator("integer", ">=", 0)
+        with override_settings(COMPLEX_FILTER_SETTINGS={"RESULT_CACHE_TIMEOUT": 60}):
+            with CaptureQueriesContext(connection) as queries:
+                self.get(filters)
+                self.get(filters, page=2)
+        self.assertEqual(count_queries(queries), 2)
+
+    def test_queryset_class_survives_clones_and_pickling(self):
+        queryset = with_count_cache(TestCaseModel.objects.all(), {TestCaseModel})
+        ordered = queryset.order_by("-id")
+        self.assertIsInstance(ordered, type(queryset))
+        self.assertEqual(ordered.count(), len(RECORDS))
+        restored = pickle.loads(pickle.dumps(ordered))
+        self.assertEqual(type(restored), type(TestCaseModel.objects.all()))
+        self.assertEqual(list(restored), list(ordered))
@@ -0,0 +1,100 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from drf_complex_filter.filters import DEBUG_HEADER, ComplexQueryFilter
+from drf_complex_filter.registry import get_registry
+
+from .fixtures import RECORDS
+from .models import TestCaseModel
+
+GROUP_FILTER = {
+    "type": "and",
+    "data": [
+        {"type": "operator", "data": {"attribute": "group1", "operator": "=", "value": "A"}},
+        {"type": "operator", "data": {"attribute": "integer", "operator": ">", "value": 1}},
+    ],
+}
+
+
+def allow_debug(request, view):
+    return request.query_params.get("secret") == "yes"
+
+
+@override_settings(COMPLEX_FILTER_SETTINGS={"DEBUG_PERMISSION": "tests.test_debug.allow_debug"})
+class DebugHeaderTests(APITestCase):
+    def setUp(self):
+        for record in RECORDS:
+            TestCaseModel.objects.create(**record)
+
+    def get(self, **params):
+        return self.client.get("/debug/", data={"filters": json.dumps(GROUP_FILTER), **params})
+
+    def test_debug_output(self):
+        response = self.get(filters_debug=1, secret="yes")
+        self.assertEqual(response.status_code, 200)
+        debug = json.loads(response[DEBUG_HEADER])
+        self.assertIn('"group1" = A', debug["sql"])
+        self.assertTrue(debug["explain"])
+        self.assertEqual(debug["annotations"], {})
+        self.assertEqual(debug["shape"], "and(group1 =,integer >)")
+        self.assertEqual(debug["nodes"], 3)
+        self.assertIn("compile", debug["timings_ms"])
+
+    def test_denied_request_gets_no_output(self):
+        response = self.get(filters_debug=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(DEBUG_HEADER, response)
+
+    def test_not_requested(self):
+        response = self.get(secret="yes")
+        self.assertNotIn(DEBUG_HEADER, response)
+
+    def test_results_are_unchanged(self):
+        plain = self.get()
+        debugged = self.get(filters_debug=1, secret="yes")
+        self.assertEqual(plain.data, debugged.data)
+
+
+class DebugPermissionTests(APITestCase):
+    def test_disabled_by_default(self):
+        self.assertIsNone(get_registry().debug_permission)
+        request = self.make_request()
+        self.assertFalse(ComplexQueryFilter().debug_allowed(request, None))
+
+    @override_settings(COMPLEX_FILTER_SETTINGS={
+        "DEBUG_PERMISSION": "rest_framework.permissions.IsAdminUser",
+    })
+    def test_permission_class(self):
+        request = self.make_request()
+        self.assertFalse(ComplexQueryFilter().debug_allowed(request, None))
+
+        request = self.make_request(User(is_staff=True))
+        self.assertTrue(ComplexQueryFilter().debug_allowed(request, None))
+
+    @override_settings(COMPLEX_FILTER_SETTINGS={
+        "DEBUG_PERMISSION": "rest_framework.permissions.AllowAny",
+        "DEBUG_PARAMETER": "explain",
+    })
+    def test_custom_parameter(self):
+        self.assertFalse(ComplexQueryFilter().debug_allowed(self.make_request(), None))
+        request = self.make_request(params={"explain": "1"})
+        self.assertTrue(ComplexQueryFilter().debug_allowed(request, None))
+
+    def test_request_attribute(self):
+        with self.settings(COMPLEX_FILTER_SETTINGS={
+            "DEBUG_PERMISSION": "rest_framework.permissions.AllowAny",
+        }):
+            request = self.make_request()
+            ComplexQueryFilter().filter_queryset(request, TestCaseModel.objects.all(), None)
+        self.assertEqual(request.complex_filter_debug["shape"], "and(group1 =,integer >)")
+
+    def make_request(self, user=None, params=None):
+        params = {"filters_debug": "1"} if params is None else params
+        params.setdefault("filters", json.dumps(GROUP_FILTER))
+        request = Request(APIRequestFactory().get("/", params))
+        request.user = user or User()
+        return request
@@ -0,0 +1,74 @@
+import json
+import unittest
+
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from drf_complex_filter.decoders import check_payload, get_json_decoder, json_depth
+from drf_complex_filter.exceptions import FilterPayloadTooLarge
+from drf_complex_filter.registry import get_registry
+from drf_complex_filter.utils import ComplexFilter
+
+from .models import TestCaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FILTERS = json.dumps(
+    {
+        "type": "and",
+        "data": [
+            {"type": "operator", "data": {"attribute": "group1", "operator": "=", "value": "[{"}},
+        ],
+    }
+)
+
+
+class DecoderTests(SimpleTestCase):
+    @unittest.skipUnless(orjson, "orjson is not installed")
+    def test_fast_decoder_is_used_when_installed(self):
+        self.assertIs(get_json_decoder(), orjson.loads)
+
+    def test_configured_decoder(self):
+        with override_settings(COMPLEX_FILTER_SETTINGS={"JSON_DECODER": "json.loads"}):
+            self.assertIs(get_registry().json_loads, json.loads)
+
+    def test_decoded_filter(self):
+        query, _ = ComplexFilter(TestCaseModel).generate_query(FILTERS)
+        self.assertEqual(query.children, [("group1", "[{")])
+
+    def test_invalid_json_is_ignored(self):
+        self.assertEqual(ComplexFilter(TestCaseModel).generate_query("{invalid"), (None, {}))
+
+    def test_json_depth_ignores_strings(self):
+        self.assertEqual(json_depth(FILTERS), 4)
+        self.assertEqual(json_depth(b'{"a": "\\"]]]", "b": [[1]]}'), 3)
+        self.assertEqual(json_depth('"plain"'), 0)
+
+    def test_check_payload(self):
+        check_payload(FILTERS, max_bytes=len(FILTERS), max_depth=4)
+        with self.assertRaises(FilterPayloadTooLarge):
+            check_payload(FILTERS, max_bytes=len(FILTERS) - 1)
+        with self.assertRaises(FilterPayloadTooLarge):
+            check_payload(FILTERS, max_depth=3)
+
+    def test_size_is_counted_in_bytes(self):
+        with self.assertRaises(FilterPayloadTooLarge):
+            check_payload('"ééé"', max_bytes=6)
+
+
+class PayloadLimitTests(APITestCase):
+    URL = "/test/"
+
+    def test_oversized_filter_is_rejected(self):
+        with override_settings(COMPLEX_FILTER_SETTINGS={"MAX_FILTER_BYTES": 64}):
+            response = self.client.get(self.URL, {"filters": FILTERS}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deeply_nested_filter_is_rejected(self):
+        with override_settings(COMPLEX_FILTER_SETTINGS={"MAX_FILTER_JSON_DEPTH": 3}):
+            response = self.client.get(self.URL, {"filters": FILTERS}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import Group, User
+from django.test import SimpleTestCase
+from parameterized import parameterized
+
+from drf_complex_filter.introspection import (
+    _field_paths,
+    clear_field_paths,
+    resolve_field_path,
+    warm_field_paths,
+)
+
+from .models import LookupFieldTestModel, TestCaseModel
+
+FIELD_PATH_CASES = [
+    ("group1", TestCaseModel, "group1", False, False, True),
+    ("integer", TestCaseModel, "integer", False, False, False),
+    ("date__year", TestCaseModel, "date", False, False, False),
+    ("simple_lookup", LookupFieldTestModel, "simple_lookup", True, False, False),
+    ("simple_lookup__lookup_field", LookupFieldTestModel, "lookup_field", False, False, True),
+    ("user__groups__name", Group, "name", False, True, True),
+    ("unknown", TestCaseModel, None, False, False, False),
+]
+
+
+class FieldPathTests(SimpleTestCase):
+    def setUp(self):
+        clear_field_paths()
+
+    @parameterized.expand(FIELD_PATH_CASES)
+    def test_resolve(self, path, model, field_name, is_relation, is_multi_valued, is_text):
+        field_path = resolve_field_path(TestCaseModel, path)
+        self.assertIs(field_path.model, model)
+        self.assertEqual(getattr(field_path.field, "name", None), field_name)
+        self.assertEqual(field_path.is_relation, is_relation)
+        self.assertEqual(field_path.is_multi_valued, is_multi_valued)
+        self.assertEqual(field_path.is_text, is_text)
+
+    def test_resolution_is_cached(self):
+        first = resolve_field_path(TestCaseModel, "simple_lookup__lookup_field")
+        second = resolve_field_path(TestCaseModel, "simple_lookup__lookup_field")
+        self.assertIs(first, second)
+
+    def test_without_model(self):
+        field_path = resolve_field_path(None, "group1")
+        self.assertIsNone(field_path.model)
+        self.assertIsNone(field_path.field)
+
+    def test_warm(self):
+        warm_field_paths(User, ["groups.name"])
+        self.assertIn("groups__name", _field_paths[User])
+
+        warm_field_paths(TestCaseModel)
+        self.assertIn("simple_lookup", _field_paths[TestCaseModel])
+        self.assertIn("group1", _field_paths[TestCaseModel])
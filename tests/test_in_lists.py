@@ -0,0 +1,106 @@
+import json
+
+from django.db import connection
+from django.db.models import F, Q
+from django.test import TestCase, override_settings
+from parameterized import parameterized
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from drf_complex_filter.large_lists import InValues
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import RECORDS, operator
+from .models import LookupFieldTestModel, TestCaseModel
+
+LARGE_LISTS = {"LARGE_IN_LIST_THRESHOLD": 1, "IN_LIST_CHUNK_SIZE": 2}
+
+LIST_CASES = [
+    ("group1", ["GROUP1", "group1", "GROUP3"]),
+    ("with_empty", ["filled", "missing"]),
+    ("integer", [1, "2", 5, 5]),
+    ("float", [1.0, 4]),
+    ("date", ["2020-11-01", "2020-10-01"]),
+    ("boolean", [False, "0"]),
+    ("simple_lookup.lookup_field", ["value1", "value3"]),
+    ("simple_lookup", [1, 2]),
+]
+
+
+class LargeListTests(TestCase):
+    def setUp(self):
+        lookups = [
+            LookupFieldTestModel.objects.create(lookup_field=f"value{index}")
+            for index in range(3)
+        ]
+        for index, record in enumerate(RECORDS):
+            # Every fourth record has no related object
+            simple_lookup = lookups[index % 4 - 1] if index % 4 else None
+            TestCaseModel.objects.create(simple_lookup=simple_lookup, **record)
+
+    def filtered_ids(self, filters):
+        queryset = ComplexFilter(TestCaseModel).filter_queryset(
+            TestCaseModel.objects.all(), filters
+        )
+        return sorted(queryset.values_list("id", flat=True))
+
+    def expected_ids(self, query):
+        return sorted(TestCaseModel.objects.filter(query).values_list("id", flat=True))
+
+    @parameterized.expand(LIST_CASES)
+    def test_large_in(self, attribute, values):
+        path = attribute.replace(".", "__")
+        with override_settings(COMPLEX_FILTER_SETTINGS=LARGE_LISTS):
+            ids = self.filtered_ids(operator(attribute, "in", values))
+        self.assertEqual(ids, self.expected_ids(Q(**{f"{path}__in": values})))
+
+    @parameterized.expand(LIST_CASES)
+    def test_large_not_in(self, attribute, values):
+        path = attribute.replace(".", "__")
+        with override_settings(COMPLEX_FILTER_SETTINGS=LARGE_LISTS):
+            ids = self.filtered_ids(operator(attribute, "not_in", values))
+        self.assertEqual(ids, self.expected_ids(~Q(**{f"{path}__in": values})))
+
+    def test_sqlite_uses_single_parameter(self):
+        values = list(range(5000))
+        with override_settings(COMPLEX_FILTER_SETTINGS={"LARGE_IN_LIST_THRESHOLD": 1000}):
+            queryset = ComplexFilter(TestCaseModel).filter_queryset(
+                TestCaseModel.objects.all(), operator("integer", "in", values)
+            )
+            sql, params = queryset.query.sql_with_params()
+        self.assertIn("json_each", sql)
+        self.assertEqual(len(params), 1)
+        self.assertEqual(queryset.count(), len(RECORDS))
+
+    def test_small_list_uses_plain_in(self):
+        queryset = ComplexFilter(TestCaseModel).filter_queryset(
+            TestCaseModel.objects.all(), operator("integer", "in", [1, 2])
+        )
+        self.assertNotIn("json_each", str(queryset.query))
+
+    def test_values_are_deduplicated(self):
+        queryset = ComplexFilter(TestCaseModel).filter_queryset(
+            TestCaseModel.objects.all(), operator("integer", "in", [1, "1", 1.0, 2])
+        )
+        _, params = queryset.query.sql_with_params()
+        self.assertEqual(list(params), [1, 2])
+
+    def test_chunked_fallback(self):
+        expression = InValues(
+            F("integer"), [1, 2, 3, 4, 5], TestCaseModel._meta.get_field("integer"), chunk_size=2
+        )
+        query = TestCaseModel.objects.filter(expression).query
+        compiler = query.get_compiler(connection=connection)
+        sql, params = expression.resolve_expression(query).as_sql(compiler, connection)
+        self.assertEqual(sql.count(" IN ("), 3)
+        self.assertEqual(sql.count(" OR "), 2)
+        self.assertEqual(list(params), [1, 2, 3, 4, 5])
+
+
+class InvalidListValueTests(APITestCase):
+    URL = "/test/"
+
+    def test_invalid_value_is_rejected(self):
+        query = {"filters": json.dumps(operator("integer", "in", [1, "abc"]))}
+        response = self.client.get(self.URL, query, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
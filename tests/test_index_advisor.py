@@ -0,0 +1,198 @@
+import threading
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.contrib.postgres.indexes import OpClass
+from django.core.management import call_command
+from django.db import models
+from django.db.models.functions import Upper
+from django.test import TestCase, override_settings
+
+from drf_complex_filter.index_advisor import advise, has_prefix_index, propose_index
+from drf_complex_filter import usage
+from drf_complex_filter.usage import usage_recorder
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import operator
+from .models import LookupFieldTestModel, TestCaseModel
+
+RECORD_USAGE = {"RECORD_USAGE": True, "USAGE_FLUSH_INTERVAL": None}
+
+
+def run_filter(filters):
+    ComplexFilter(TestCaseModel).filter_queryset(TestCaseModel.objects.all(), filters)
+
+
+@override_settings(COMPLEX_FILTER_SETTINGS=RECORD_USAGE)
+class UsageRecorderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        usage_recorder.clear()
+
+    def test_conditions_are_counted_on_every_call(self):
+        filters = {
+            "type": "and",
+            "data": [operator("group1", "=", "a"), operator("integer", ">", 1)],
+        }
+        for _ in range(3):
+            run_filter(filters)
+        usage = usage_recorder.load()
+        self.assertEqual(usage[("tests.testcasemodel", "group1", "=")], 3)
+        self.assertEqual(usage[("tests.testcasemodel", "integer", ">")], 3)
+
+    def test_subquery_conditions(self):
+        run_filter(operator("simple_lookup.LookupFieldTestModel___lookup_field", "*", "a"))
+        self.assertEqual(
+            usage_recorder.load(),
+            {
+                ("tests.testcasemodel", "simple_lookup", "in"): 1,
+                ("tests.lookupfieldtestmodel", "lookup_field", "*"): 1,
+            },
+        )
+
+    def test_wildcard_values_are_recorded_as_prefix_matches(self):
+        with self.settings(COMPLEX_FILTER_SETTINGS={**RECORD_USAGE, "WILDCARD_SYNTAX": True}):
+            run_filter(operator("group1", "*", "ab*"))
+            run_filter(operator("group1", "*", "ab"))
+            self.assertEqual(
+                usage_recorder.load(),
+                {
+                    ("tests.testcasemodel", "group1", "istartswith"): 1,
+                    ("tests.testcasemodel", "group1", "*"): 1,
+                },
+            )
+
+    def test_flush_merges_into_cache(self):
+        run_filter(operator("group1", "=", "a"))
+        usage_recorder.flush()
+        run_filter(operator("group1", "=", "a"))
+        usage_recorder.flush()
+        self.assertEqual(cache.get("drf_complex_filter:usage"), {"tests.testcasemodel|group1|=": 2})
+
+    def test_interval_flush_runs_in_the_background(self):
+        threads = []
+        real_get_cache = usage.get_cache
+
+        def get_cache():
+            threads.append(threading.current_thread())
+            return real_get_cache()
+
+        with self.settings(COMPLEX_FILTER_SETTINGS={**RECORD_USAGE, "USAGE_FLUSH_INTERVAL": 0}):
+            with mock.patch.object(usage, "get_cache", get_cache):
+                run_filter(operator("group1", "=", "a"))
+                usage_recorder.wait_for_flush()
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+        self.assertEqual(cache.get("drf_complex_filter:usage"), {"tests.testcasemodel|group1|=": 1})
+
+    def test_disabled_by_default(self):
+        with override_settings(COMPLEX_FILTER_SETTINGS={}):
+            run_filter(operator("group1", "=", "a"))
+        self.assertEqual(usage_recorder.load(), {})
+
+
+class IndexAdvisorTests(TestCase):
+    def test_unindexed_columns(self):
+        advice = advise({
+            ("tests.testcasemodel", "group1", "="): 5,
+            ("tests.testcasemodel", "group1", "in"): 2,
+            ("tests.testcasemodel", "id", "="): 9,
+            ("tests.testcasemodel", "simple_lookup", "="): 4,
+            ("tests.testcasemodel", "simple_lookup", "*"): 3,
+            ("tests.testcasemodel", "date__year", "="): 3,
+            ("missing.model", "id", "="): 3,
+        })
+        summary = [
+            (item.model, item.field.name, item.kind, item.count, item.indexed)
+            for item in advice
+        ]
+        self.assertEqual(
+            summary,
+            [
+                (TestCaseModel, "id", "btree", 9, True),
+                (TestCaseModel, "group1", "btree", 7, False),
+                (TestCaseModel, "simple_lookup", "btree", 4, True),
+                (LookupFieldTestModel, "lookup_field", "trigram", 3, False),
+            ],
+        )
+
+    def test_prefix_matches(self):
+        advice = advise({
+            ("tests.testcasemodel", "group1", "startswith"): 2,
+            ("tests.testcasemodel", "group2", "istartswith"): 1,
+            ("tests.testcasemodel", "simple_lookup", "iendswith"): 1,
+        })
+        summary = [(item.model, item.field.name, item.kind, item.indexed) for item in advice]
+        self.assertEqual(
+            summary,
+            [
+                (TestCaseModel, "group1", "prefix", False),
+                (LookupFieldTestModel, "lookup_field", "trigram", False),
+                (TestCaseModel, "group2", "upper_prefix", False),
+            ],
+        )
+
+    def test_min_count(self):
+        advice = advise({("tests.testcasemodel", "group1", "="): 1}, min_count=2)
+        self.assertEqual(advice, [])
+
+    def test_proposals(self):
+        field = TestCaseModel._meta.get_field("group1")
+        self.assertEqual(
+            propose_index(TestCaseModel, field, "btree"),
+            'migrations.AddIndex(model_name="testcasemodel", '
+            'index=models.Index(fields=["group1"], name="testcasemode_group1_idx"))',
+        )
+        self.assertIn('OpClass(Upper("group1"), name="gin_trgm_ops")',
+                      propose_index(TestCaseModel, field, "trigram"))
+        self.assertIn('opclasses=["varchar_pattern_ops"]',
+                      propose_index(TestCaseModel, field, "prefix"))
+        self.assertIn('OpClass(Upper("group1"), name="varchar_pattern_ops")',
+                      propose_index(TestCaseModel, field, "upper_prefix"))
+
+    def test_existing_prefix_indexes(self):
+        code = models.CharField(max_length=10, db_index=True)
+        code.set_attributes_from_name("code")
+        name = models.CharField(max_length=10)
+        name.set_attributes_from_name("name")
+        indexed = SimpleNamespace(_meta=SimpleNamespace(indexes=[
+            models.Index(fields=["name"], opclasses=["varchar_pattern_ops"], name="name_like"),
+            models.Index(OpClass(Upper("name"), name="varchar_pattern_ops"), name="name_ulike"),
+        ]))
+        self.assertTrue(has_prefix_index(indexed, code))
+        self.assertFalse(has_prefix_index(indexed, code, upper=True))
+        self.assertTrue(has_prefix_index(indexed, name))
+        self.assertTrue(has_prefix_index(indexed, name, upper=True))
+
+        field = TestCaseModel._meta.get_field("group1")
+        self.assertFalse(has_prefix_index(TestCaseModel, field))
+        self.assertFalse(has_prefix_index(TestCaseModel, field, upper=True))
+
+
+@override_settings(COMPLEX_FILTER_SETTINGS=RECORD_USAGE)
+class IndexCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        usage_recorder.clear()
+
+    def test_command(self):
+        run_filter(operator("group1", "=", "a"))
+        run_filter(operator("simple_lookup", "*", "a"))
+        run_filter(operator("id", "=", 1))
+        usage_recorder.flush()
+
+        output = StringIO()
+        call_command("complex_filter_indexes", stdout=output, reset=True)
+        report = output.getvalue()
+        self.assertIn("tests.TestCaseModel.group1 [btree] NOT INDEXED (= x1)", report)
+        self.assertIn("tests.LookupFieldTestModel.lookup_field [trigram] NOT INDEXED", report)
+        self.assertNotIn("TestCaseModel.id", report)
+        self.assertIn("TrigramExtension()", report)
+        self.assertEqual(usage_recorder.load(), {})
+
+    def test_command_without_usage(self):
+        output = StringIO()
+        call_command("complex_filter_indexes", stdout=output)
+        self.assertIn("No recorded filter usage.", output.getvalue())
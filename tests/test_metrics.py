@@ -0,0 +1,103 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from drf_complex_filter.metrics import NULL_METRICS, FilterMetrics, filter_metrics
+from drf_complex_filter.plan import plan_cache
+from drf_complex_filter.utils import ComplexFilter
+
+from .models import LookupFieldTestModel, TestCaseModel
+
+REPORTED = []
+
+GROUP_FILTER = {
+    "type": "and",
+    "data": [
+        {"type": "operator", "data": {"attribute": "group1", "operator": "=", "value": "A"}},
+        {"type": "operator", "data": {"attribute": "integer", "operator": ">", "value": 1}},
+    ],
+}
+
+SUBQUERY_FILTER = {
+    "type": "operator",
+    "data": {
+        "attribute": "simple_lookup.LookupFieldTestModel___lookup_field",
+        "operator": "=",
+        "value": "a",
+    },
+}
+
+
+def record_metrics(metrics):
+    REPORTED.append(metrics)
+
+
+@override_settings(COMPLEX_FILTER_SETTINGS={"METRICS_CALLBACK": "tests.test_metrics.record_metrics"})
+class MetricsCallbackTests(TestCase):
+    def setUp(self):
+        REPORTED.clear()
+        plan_cache.clear()
+
+    def test_phases_are_reported(self):
+        ComplexFilter(TestCaseModel).filter_queryset(TestCaseModel.objects.all(), GROUP_FILTER)
+        self.assertEqual(len(REPORTED), 1)
+        metrics = REPORTED[0]
+        self.assertIs(metrics.model, TestCaseModel)
+        self.assertEqual(set(metrics.timings), {"parse", "compile", "bind", "annotate"})
+        self.assertTrue(all(seconds >= 0 for seconds in metrics.timings.values()))
+        self.assertEqual(metrics.node_count, 3)
+        self.assertEqual(metrics.shape, "and(group1 =,integer >)")
+        self.assertFalse(metrics.plan_cache_hit)
+
+    def test_plan_cache_hit_is_reported(self):
+        for _ in range(2):
+            ComplexFilter(TestCaseModel).filter_queryset(TestCaseModel.objects.all(), GROUP_FILTER)
+        self.assertEqual([metrics.plan_cache_hit for metrics in REPORTED], [False, True])
+
+    def test_subquery_phase(self):
+        ComplexFilter(TestCaseModel).filter_queryset(TestCaseModel.objects.all(), SUBQUERY_FILTER)
+        self.assertEqual(len(REPORTED), 1)
+        self.assertIn("subquery", REPORTED[0].timings)
+        self.assertLessEqual(REPORTED[0].timings["subquery"], REPORTED[0].timings["compile"])
+
+    def test_each_call_is_reported_separately(self):
+        complex_filter = ComplexFilter(TestCaseModel)
+        complex_filter.filter_queryset(TestCaseModel.objects.all(), GROUP_FILTER)
+        complex_filter.filter_queryset(TestCaseModel.objects.all(), SUBQUERY_FILTER)
+        self.assertEqual(len(REPORTED), 2)
+        self.assertNotIn("subquery", REPORTED[0].timings)
+        self.assertIn("subquery", REPORTED[1].timings)
+
+    def test_empty_filter_is_not_reported(self):
+        ComplexFilter(TestCaseModel).filter_queryset(TestCaseModel.objects.all(), None)
+        self.assertEqual(REPORTED, [])
+
+
+class MetricsSignalTests(APITestCase):
+    def setUp(self):
+        REPORTED.clear()
+        plan_cache.clear()
+
+    def test_disabled_by_default(self):
+        self.assertIs(ComplexFilter(TestCaseModel).metrics, NULL_METRICS)
+
+    def test_signal_receiver_enables_metrics(self):
+        def receiver(sender, metrics, **kwargs):
+            REPORTED.append((sender, metrics))
+
+        filter_metrics.connect(receiver)
+        try:
+            self.assertIsInstance(ComplexFilter(TestCaseModel).metrics, FilterMetrics)
+            response = self.client.get(
+                "/test/",
+                data={"filters": '{"type":"operator","data":'
+                                 '{"attribute":"integer","operator":">","value":1}}'},
+            )
+        finally:
+            filter_metrics.disconnect(receiver)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(REPORTED), 1)
+        sender, metrics = REPORTED[0]
+        self.assertIs(sender, TestCaseModel)
+        self.assertEqual(metrics.shape, "integer >")
+        self.assertIs(ComplexFilter(LookupFieldTestModel).metrics, NULL_METRICS)
@@ -0,0 +1,89 @@
+import json
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from drf_complex_filter.exceptions import AmbiguousModelError
+from drf_complex_filter.introspection import ModelIndex, get_model_index
+from drf_complex_filter.utils import ComplexFilter
+
+from .models import LookupFieldTestModel, TestCaseModel
+
+
+def fake_model(name, app_label, swapped=None):
+    meta = SimpleNamespace(app_label=app_label, swapped=swapped, label=f"{app_label}.{name}")
+    return type(name, (), {"_meta": meta})
+
+
+class ModelIndexTests(SimpleTestCase):
+    def test_lookup_is_case_insensitive(self):
+        index = get_model_index()
+        self.assertIs(index.get("testcasemodel"), TestCaseModel)
+        self.assertIs(index.get("TESTCASEMODEL"), TestCaseModel)
+        self.assertIsNone(index.get("UnknownModel"))
+
+    def test_qualified_lookup(self):
+        index = get_model_index()
+        self.assertIs(index.get("auth.User"), User)
+        self.assertIs(index.get("tests.TestCaseModel"), TestCaseModel)
+        self.assertIsNone(index.get("auth.TestCaseModel"))
+        self.assertIs(index.get_by_label("tests", "testcasemodel"), TestCaseModel)
+
+    def test_ambiguous_name(self):
+        first = fake_model("Profile", "accounts")
+        second = fake_model("Profile", "crm")
+        index = ModelIndex([first, second])
+        with self.assertRaises(AmbiguousModelError) as error:
+            index.get("profile")
+        self.assertIn("accounts.Profile", str(error.exception))
+        self.assertIs(index.get("crm.Profile"), second)
+
+    def test_swapped_model_does_not_make_name_ambiguous(self):
+        swapped = fake_model("User", "auth", swapped="accounts.User")
+        custom = fake_model("User", "accounts")
+        index = ModelIndex([swapped, custom])
+        self.assertIs(index.get("User"), custom)
+        self.assertIs(index.get("auth.User"), swapped)
+
+    def test_ambiguous_subquery_raises(self):
+        complex_filter = ComplexFilter(TestCaseModel)
+        complex_filter._get_model_by_name = lambda name: ModelIndex(
+            [fake_model("Profile", "a"), fake_model("Profile", "b")]
+        ).get(name)
+        with self.assertRaises(AmbiguousModelError):
+            complex_filter.generate_query(
+                {
+                    "type": "operator",
+                    "data": {"attribute": "Profile___id", "operator": "=", "value": 1},
+                }
+            )
+
+
+class SubqueryModelNameTests(APITestCase):
+    URL = "/test/"
+
+    def setUp(self):
+        first = LookupFieldTestModel.objects.create(lookup_field="value1")
+        second = LookupFieldTestModel.objects.create(lookup_field="value2")
+        TestCaseModel.objects.create(group1="g1", group2="g2", simple_lookup=first)
+        TestCaseModel.objects.create(group1="g1", group2="g2", simple_lookup=second)
+        self.first = first
+
+    def get(self, attribute):
+        filters = {
+            "type": "operator",
+            "data": {"attribute": attribute, "operator": "=", "value": "value1"},
+        }
+        return self.client.get(self.URL, {"filters": json.dumps(filters)}, format="json")
+
+    def test_bare_model_name(self):
+        response = self.get("simple_lookup.LookupFieldTestModel___lookup_field")
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["simple_lookup"]["id"], self.first.id)
+
+    def test_qualified_model_name(self):
+        response = self.get("simple_lookup.tests.lookupfieldtestmodel___lookup_field")
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["simple_lookup"]["id"], self.first.id)
@@ -0,0 +1,220 @@
+import random
+
+from django.test import SimpleTestCase, TestCase
+from parameterized import parameterized
+
+from drf_complex_filter.optimizer import optimize_tree
+from drf_complex_filter.tree import Condition, Group, parse_tree
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import RECORDS, operator
+from .models import TestCaseModel
+
+ATTRIBUTES = ["group1", "group2", "with_empty", "integer", "float", "boolean", "date"]
+OPERATORS = ["=", "=", "=", "!=", "*", "!", ">", "<=", "in", "not_in"]
+# Attributes ending in a lookup, with the values compared by it
+LOOKUP_ATTRIBUTES = {
+    "group1__startswith": "group1",
+    "group2__iexact": "group2",
+    "with_empty__isnull": None,
+    "integer__gte": "integer",
+}
+
+
+def record_values(attribute):
+    values = [record[attribute] for record in RECORDS if attribute in record]
+    return [str(value) if attribute == "date" else value for value in values] + [""]
+
+
+def random_condition(rng):
+    attribute = rng.choice(ATTRIBUTES)
+    op = rng.choice(OPERATORS)
+    values = record_values(attribute)
+    if op in ("in", "not_in"):
+        value = rng.sample([value for value in values if value != ""], 2)
+    elif op in ("*", "!"):
+        value = str(rng.choice(values))[:3]
+    elif op in (">", "<="):
+        value = rng.choice([value for value in values if value != ""])
+    else:
+        value = rng.choice(values)
+    return operator(attribute, op, value)
+
+
+def random_lookup_condition(rng):
+    attribute = rng.choice(sorted(LOOKUP_ATTRIBUTES))
+    source = LOOKUP_ATTRIBUTES[attribute]
+    if source is None:
+        value = rng.choice([True, False])
+    else:
+        value = rng.choice([value for value in record_values(source) if value != ""])
+        if isinstance(value, str):
+            value = value[: rng.randint(1, len(value))]
+    return operator(attribute, "=", value)
+
+
+def random_filter(rng, depth, pool):
+    if depth == 0 or rng.random() < 0.3:
+        if pool and rng.random() < 0.3:
+            return rng.choice(pool)
+        condition = random_condition(rng)
+        pool.append(condition)
+        return condition
+    width = rng.randint(0, 4)
+    return {
+        "type": rng.choice(["and", "or"]),
+        "data": [random_filter(rng, depth - 1, pool) for _ in range(width)],
+    }
+
+
+class OptimizerTests(SimpleTestCase):
+    def test_flatten_same_operation(self):
+        tree = parse_tree(
+            {
+                "type": "and",
+                "data": [
+                    operator("a", "=", 1),
+                    {"type": "and", "data": [operator("b", "=", 2), operator("c", "=", 3)]},
+                ],
+            }
+        )
+        self.assertEqual(
+            optimize_tree(tree),
+            Group("and", (Condition("a", "=", 1), Condition("b", "=", 2), Condition("c", "=", 3))),
+        )
+
+    def test_single_child_group_is_unwrapped(self):
+        tree = parse_tree({"type": "or", "data": [operator("a", "=", 1)]})
+        self.assertEqual(optimize_tree(tree), Condition("a", "=", 1))
+
+    def test_empty_groups_are_removed(self):
+        tree = parse_tree(
+            {
+                "type": "and",
+                "data": [
+                    {"type": "or", "data": []},
+                    {"type": "and", "data": [{"type": "or", "data": []}]},
+                ],
+            }
+        )
+        self.assertIsNone(optimize_tree(tree))
+
+    def test_duplicates_are_removed(self):
+        tree = parse_tree(
+            {"type": "and", "data": [operator("a", ">", 1), operator("a", ">", 1)]}
+        )
+        self.assertEqual(optimize_tree(tree), Condition("a", ">", 1))
+
+    def test_or_of_equal_is_merged_into_in(self):
+        tree = parse_tree(
+            {
+                "type": "or",
+                "data": [
+                    operator("group1", "=", 1),
+                    operator("group2", "=", 1),
+                    operator("group1", "=", 2),
+                    operator("group1", "=", ""),
+                ],
+            }
+        )
+        self.assertEqual(
+            optimize_tree(tree, TestCaseModel),
+            Group(
+                "or",
+                (
+                    Condition("group1", "in", [1, 2]),
+                    Condition("group2", "=", 1),
+                    Condition("group1", "=", ""),
+                ),
+            ),
+        )
+
+    def test_and_of_equal_is_not_merged(self):
+        tree = parse_tree(
+            {"type": "and", "data": [operator("group1", "=", 1), operator("group1", "=", 2)]}
+        )
+        self.assertEqual(optimize_tree(tree, TestCaseModel).operation, "and")
+
+    def test_merge_can_be_disabled(self):
+        tree = parse_tree(
+            {"type": "or", "data": [operator("group1", "=", 1), operator("group1", "=", 2)]}
+        )
+        self.assertEqual(len(optimize_tree(tree, TestCaseModel, merge_in=False).children), 2)
+
+    @parameterized.expand(
+        [
+            ("lookup", "group1__startswith"),
+            ("isnull", "with_empty__isnull"),
+            ("transform", "date__year"),
+            ("unknown_field", "missing"),
+        ]
+    )
+    def test_attributes_not_ending_on_a_field_are_not_merged(self, _, attribute):
+        tree = parse_tree(
+            {"type": "or", "data": [operator(attribute, "=", 1), operator(attribute, "=", 2)]}
+        )
+        self.assertEqual(
+            optimize_tree(tree, TestCaseModel),
+            Group("or", (Condition(attribute, "=", 1), Condition(attribute, "=", 2))),
+        )
+
+    def test_equal_is_not_merged_without_a_model(self):
+        tree = parse_tree(
+            {"type": "or", "data": [operator("group1", "=", 1), operator("group1", "=", 2)]}
+        )
+        self.assertEqual(len(optimize_tree(tree).children), 2)
+
+    def test_function_values_are_not_merged(self):
+        tree = parse_tree(
+            {
+                "type": "or",
+                "data": [operator("date", "=", {"func": "now"}), operator("date", "=", 1)],
+            }
+        )
+        self.assertEqual(len(optimize_tree(tree, TestCaseModel).children), 2)
+
+
+class OptimizerEquivalenceTests(TestCase):
+    """Optimized and original trees must match the same rows of the fixture data."""
+
+    def setUp(self):
+        for record in RECORDS:
+            TestCaseModel(**record).save()
+
+    def matching_ids(self, tree):
+        complex_filter = ComplexFilter(TestCaseModel)
+        query, annotation = complex_filter.compile(tree).bind(complex_filter)
+        queryset = TestCaseModel.objects.all()
+        if query:
+            queryset = queryset.annotate(**annotation).filter(query)
+        return sorted(queryset.values_list("id", flat=True))
+
+    @parameterized.expand([(seed,) for seed in range(20)])
+    def test_random_filters_are_equivalent(self, seed):
+        rng = random.Random(seed)
+        pool = []
+        for _ in range(10):
+            tree = parse_tree(random_filter(rng, depth=3, pool=pool))
+            optimized = optimize_tree(tree, TestCaseModel)
+            self.assertEqual(
+                self.matching_ids(optimized),
+                self.matching_ids(tree),
+                msg=f"Original: {tree}\nOptimized: {optimized}",
+            )
+
+    @parameterized.expand([(seed,) for seed in range(10)])
+    def test_lookup_attributes_are_equivalent(self, seed):
+        rng = random.Random(seed)
+        for _ in range(10):
+            tree = parse_tree(
+                {
+                    "type": "or",
+                    "data": [random_lookup_condition(rng) for _ in range(rng.randint(2, 5))],
+                }
+            )
+            optimized = optimize_tree(tree, TestCaseModel)
+            self.assertEqual(
+                self.matching_ids(optimized),
+                self.matching_ids(tree),
+                msg=f"Original: {tree}\nOptimized: {optimized}",
+            )
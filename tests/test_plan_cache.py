@@ -0,0 +1,111 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from mixer.backend.django import mixer
+from rest_framework.test import APITestCase
+
+from drf_complex_filter.plan import ConditionPlan, GroupPlan, StaticPlan, plan_cache
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import operator
+from .models import TestCaseModel
+
+GROUP_FILTER = {
+    "type": "and",
+    "data": [
+        {"type": "operator", "data": {"attribute": "group1", "operator": "=", "value": "A"}},
+        {"type": "operator", "data": {"attribute": "integer", "operator": ">", "value": 1}},
+    ],
+}
+
+
+class PlanCacheTests(TestCase):
+    def setUp(self):
+        plan_cache.clear()
+
+    def test_same_filter_hits_cache(self):
+        complex_filter = ComplexFilter(TestCaseModel)
+        first = complex_filter.get_plan(GROUP_FILTER)
+        second = ComplexFilter(TestCaseModel).get_plan(json.loads(json.dumps(GROUP_FILTER)))
+        self.assertIs(first, second)
+        self.assertEqual(plan_cache.stats()["hits"], 1)
+        self.assertEqual(plan_cache.stats()["misses"], 1)
+
+    def test_canonical_key_ignores_formatting(self):
+        complex_filter = ComplexFilter(TestCaseModel)
+        compact = json.dumps(GROUP_FILTER, separators=(",", ":"))
+        pretty = json.dumps(GROUP_FILTER, indent=4, sort_keys=True)
+        complex_filter.generate_query(compact)
+        complex_filter.generate_query(pretty)
+        self.assertEqual(plan_cache.stats()["hits"], 1)
+        self.assertEqual(len(plan_cache), 1)
+
+    def test_key_includes_model(self):
+        ComplexFilter(TestCaseModel).get_plan(operator("id", "=", 1))
+        ComplexFilter(User).get_plan(operator("id", "=", 1))
+        self.assertEqual(plan_cache.stats()["misses"], 2)
+
+    def test_static_filter_is_precompiled(self):
+        plan = ComplexFilter(TestCaseModel).get_plan(GROUP_FILTER)
+        self.assertIsInstance(plan, StaticPlan)
+
+    def test_request_dependent_leaves_are_late_bound(self):
+        plan = ComplexFilter(TestCaseModel).get_plan(
+            {
+                "type": "and",
+                "data": [
+                    operator("group1", "=", "A"),
+                    operator("user", "me"),
+                    operator("datetime", "<", {"func": "now"}),
+                ],
+            }
+        )
+        self.assertIsInstance(plan, GroupPlan)
+        self.assertIsInstance(plan.static, StaticPlan)
+        self.assertEqual(len(plan.children), 2)
+        for child in plan.children:
+            self.assertIsInstance(child, ConditionPlan)
+
+    def test_eviction(self):
+        with override_settings(COMPLEX_FILTER_SETTINGS={"PLAN_CACHE_SIZE": 2}):
+            complex_filter = ComplexFilter(TestCaseModel)
+            for value in range(3):
+                complex_filter.get_plan(operator("integer", "=", value))
+            stats = plan_cache.stats()
+            self.assertEqual(stats["size"], 2)
+            self.assertEqual(stats["evictions"], 1)
+            self.assertEqual(stats["maxsize"], 2)
+
+    def test_cache_disabled(self):
+        with override_settings(COMPLEX_FILTER_SETTINGS={"PLAN_CACHE_SIZE": 0}):
+            complex_filter = ComplexFilter(TestCaseModel)
+            complex_filter.get_plan(GROUP_FILTER)
+            complex_filter.get_plan(GROUP_FILTER)
+            self.assertEqual(len(plan_cache), 0)
+
+    def test_unserializable_value_is_not_cached(self):
+        values = TestCaseModel.objects.values_list("id", flat=True)
+        query, _ = ComplexFilter(TestCaseModel).generate_query(operator("id", "in", values))
+        self.assertIsNotNone(query)
+        self.assertEqual(len(plan_cache), 0)
+
+
+class LateBindingTests(APITestCase):
+    URL = "/test/"
+
+    def setUp(self):
+        plan_cache.clear()
+        self.user1 = mixer.blend(User, username="user1")
+        self.user2 = mixer.blend(User, username="user2")
+        mixer.blend(TestCaseModel, user=self.user1)
+        mixer.blend(TestCaseModel, user=self.user2)
+
+    def test_me_is_bound_per_request(self):
+        query = {"filters": json.dumps(operator("user", "me"))}
+        for user in (self.user1, self.user2):
+            self.client.force_authenticate(user=user)
+            response = self.client.get(self.URL, query, format="json")
+            self.assertEqual(len(response.data), 1)
+            self.assertEqual(response.data[0]["user"], user.id)
+        self.assertEqual(plan_cache.stats()["hits"], 1)
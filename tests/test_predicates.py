@@ -0,0 +1,218 @@
+from django.contrib.auth.models import Group, User
+from django.test import TestCase, override_settings
+from parameterized import parameterized
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from drf_complex_filter.exceptions import PredicateError
+from drf_complex_filter.predicates import PredicateSet, compile_predicate
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import RECORDS, operator
+from .models import LookupFieldTestModel, TestCaseModel
+
+
+def group(operation, *children):
+    return {"type": operation, "data": list(children)}
+
+
+FILTERS = [
+    operator("group1", "=", "GROUP3"),
+    operator("group1", "!=", "GROUP3"),
+    operator("with_empty", "=", ""),
+    operator("with_empty", "!=", ""),
+    operator("with_empty", "*", "fill"),
+    operator("with_empty", "!", "fill"),
+    operator("group1", "*", "group1"),
+    operator("group1", "istartswith", "group"),
+    operator("group1", "endswith", "1"),
+    operator("integer", ">", 2),
+    operator("integer", "<=", "2"),
+    operator("float", ">=", 1.5),
+    operator("date", ">", "2020-10-31"),
+    operator("date", "=", "2020-11-01"),
+    operator("datetime", "<", "2020-11-01T00:00:00"),
+    operator("boolean", "=", False),
+    operator("integer", "in", [1, 3, 5, None]),
+    operator("integer", "not_in", [1, 3]),
+    operator("group2", "search", "group1"),
+    operator("simple_lookup", "*", "apple"),
+    operator("simple_lookup", "=", 1),
+    operator("simple_lookup.lookup_field", "=", "apple"),
+    operator("simple_lookup.lookup_field", "!=", "apple"),
+    operator("user.groups.name", "=", "staff"),
+    operator("user.groups.name", "!=", "staff"),
+    group("or", operator("integer", "<", 1), operator("group2", "=", "GROUP3")),
+    group(
+        "and",
+        operator("group2", "=", "GROUP1"),
+        group("or", operator("integer", "=", 0), operator("with_empty", "=", "")),
+    ),
+    group("and"),
+]
+
+
+class PredicateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        apple = LookupFieldTestModel.objects.create(lookup_field="apple")
+        pineapple = LookupFieldTestModel.objects.create(lookup_field="pineapple")
+        user = User.objects.create(username="user")
+        user.groups.add(Group.objects.create(name="staff"), Group.objects.create(name="admin"))
+        for index, record in enumerate(RECORDS):
+            TestCaseModel.objects.create(
+                **record,
+                simple_lookup=(apple, pineapple, None)[index % 3],
+                user=user if index % 2 else None,
+            )
+
+    def instances(self):
+        return list(
+            TestCaseModel.objects.select_related("simple_lookup", "user")
+            .prefetch_related("user__groups")
+            .order_by("id")
+        )
+
+    def expected(self, filters):
+        queryset = ComplexFilter(TestCaseModel).filter_queryset(
+            TestCaseModel.objects.all(), filters
+        )
+        return sorted(queryset.values_list("id", flat=True).distinct())
+
+    @parameterized.expand([(str(index), filters) for index, filters in enumerate(FILTERS)])
+    def test_matches_the_database(self, name, filters):
+        predicate = compile_predicate(TestCaseModel, filters)
+        matched = [instance.id for instance in self.instances() if predicate(instance)]
+        self.assertEqual(matched, self.expected(filters))
+
+    @parameterized.expand([(str(index), filters) for index, filters in enumerate(FILTERS[:19])])
+    def test_dicts(self, name, filters):
+        predicate = compile_predicate(TestCaseModel, filters)
+        rows = TestCaseModel.objects.order_by("id").values()
+        matched = [row["id"] for row in rows if predicate(row)]
+        self.assertEqual(matched, self.expected(filters))
+
+    def test_json_rows_and_nested_relations(self):
+        row = {
+            "date": "2020-11-01",
+            "simple_lookup": {"id": 3, "lookup_field": "Apple pie"},
+            "user": {"id": 1, "groups": [{"id": 1, "name": "staff"}]},
+        }
+        self.assertTrue(compile_predicate(TestCaseModel, FILTERS[13])(row))
+        self.assertTrue(compile_predicate(TestCaseModel, FILTERS[19])(row))
+        self.assertTrue(compile_predicate(TestCaseModel, operator("simple_lookup", "=", 3))(row))
+        self.assertTrue(compile_predicate(TestCaseModel, FILTERS[23])(row))
+        self.assertFalse(compile_predicate(TestCaseModel, FILTERS[24])(row))
+
+    def test_json_string(self):
+        predicate = compile_predicate(
+            TestCaseModel, '{"type":"operator","data":{"attribute":"integer","operator":">","value":4}}'
+        )
+        self.assertTrue(predicate({"integer": 5}))
+        self.assertFalse(predicate({"integer": 4}))
+
+    def test_me(self):
+        request = Request(APIRequestFactory().get("/"))
+        request.user = User.objects.get()
+        filters = operator("user", "me")
+        predicate = compile_predicate(TestCaseModel, filters, request)
+        matched = [instance.id for instance in self.instances() if predicate(instance)]
+        self.assertEqual(
+            matched,
+            sorted(
+                ComplexFilter(TestCaseModel)
+                .filter_queryset(TestCaseModel.objects.all(), filters, request)
+                .values_list("id", flat=True)
+            ),
+        )
+        self.assertTrue(compile_predicate(TestCaseModel, filters)({"user_id": None}))
+
+    @override_settings(COMPLEX_FILTER_SETTINGS={"WILDCARD_SYNTAX": True})
+    def test_wildcards(self):
+        predicate = compile_predicate(TestCaseModel, operator("group1", "*", "*1"))
+        self.assertTrue(predicate({"group1": "group1"}))
+        self.assertFalse(predicate({"group1": "group1x"}))
+
+    def test_value_functions(self):
+        filters = operator(
+            "date", "=", {"func": "date", "kwargs": {"year": 2020, "month": 11, "day": 1}}
+        )
+        predicate = compile_predicate(TestCaseModel, filters)
+        matched = [instance.id for instance in self.instances() if predicate(instance)]
+        self.assertEqual(matched, self.expected(filters))
+
+    @parameterized.expand([
+        ("subquery", operator("simple_lookup.LookupFieldTestModel___lookup_field", "=", "a")),
+        ("lookup_by_model", operator("multiple_field_lookup", "*", "ada")),
+        ("lookup_in_path", operator("date__year", "=", 2020)),
+        ("unknown_operator", operator("integer", "between", [1, 2])),
+        ("invalid_value", operator("integer", ">", "many")),
+    ])
+    def test_cannot_be_evaluated(self, name, filters):
+        with self.assertRaises(PredicateError):
+            compile_predicate(TestCaseModel, filters)
+
+    @override_settings(COMPLEX_FILTER_SETTINGS={
+        "VALUE_FUNCTIONS": [
+            "drf_complex_filter.functions.DateFunctions",
+            "tests.test_async.AsyncFunctions",
+        ],
+    })
+    def test_async_value_function_cannot_be_evaluated(self):
+        filters = operator("integer", ">=", {"func": "async_limit", "kwargs": {"value": 1}})
+        with self.assertRaisesMessage(PredicateError, "async_limit"):
+            compile_predicate(TestCaseModel, filters)
+
+    def test_relations_must_be_loaded(self):
+        instance = TestCaseModel.objects.filter(simple_lookup__isnull=False).first()
+        with self.assertRaisesMessage(PredicateError, "select_related"):
+            compile_predicate(TestCaseModel, FILTERS[21])(instance)
+        with self.assertRaisesMessage(PredicateError, "prefetch_related"):
+            compile_predicate(TestCaseModel, FILTERS[23])(
+                TestCaseModel.objects.select_related("user").exclude(user=None).first()
+            )
+        # The foreign key column itself is always loaded
+        self.assertIsInstance(compile_predicate(TestCaseModel, FILTERS[20])(instance), bool)
+
+
+class PredicateSetTests(TestCase):
+    def test_matches_every_filter(self):
+        subscriptions = PredicateSet(TestCaseModel)
+        for index, filters in enumerate(FILTERS[:19]):
+            subscriptions.add(index, filters)
+        rows = [{"with_empty": None, **record, "id": index} for index, record in enumerate(RECORDS)]
+        for row in rows:
+            expected = [
+                index for index, filters in enumerate(FILTERS[:19])
+                if compile_predicate(TestCaseModel, filters)(row)
+            ]
+            self.assertEqual(subscriptions.matches(row), expected)
+
+    def test_only_candidates_are_evaluated(self):
+        subscriptions = PredicateSet(TestCaseModel)
+        for index in range(1000):
+            subscriptions.add(index, group(
+                "and", operator("integer", "=", index), operator("group1", "*", "group"),
+            ))
+        subscriptions.add("in", operator("integer", "in", [7, 8]))
+        subscriptions.add("any", operator("group1", "=", "GROUP1"))
+        self.assertEqual(len(subscriptions), 1002)
+        self.assertEqual(
+            subscriptions.matches({"integer": 7, "group1": "GROUP1"}), [7, "in", "any"]
+        )
+        self.assertEqual(subscriptions.matches({"integer": 9, "group1": "other"}), [])
+
+    def test_replace_and_discard(self):
+        subscriptions = PredicateSet(TestCaseModel)
+        subscriptions.add("a", operator("integer", "=", 1))
+        subscriptions.add("a", operator("integer", "=", 2))
+        self.assertEqual(subscriptions.matches({"integer": 1}), [])
+        self.assertEqual(subscriptions.matches({"integer": 2}), ["a"])
+        subscriptions.discard("a")
+        self.assertNotIn("a", subscriptions)
+        self.assertEqual(subscriptions.matches({"integer": 2}), [])
+
+    def test_empty_filter_matches_everything(self):
+        subscriptions = PredicateSet(TestCaseModel)
+        subscriptions.add("all", None)
+        self.assertEqual(subscriptions.matches({"integer": 2}), ["all"])
@@ -0,0 +1,82 @@
+from django.test import TestCase, override_settings
+from parameterized import parameterized
+
+from drf_complex_filter.comparisons import wildcard_comparison
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import operator
+from .models import LookupFieldTestModel, MultipleLookupFieldsTestModel, TestCaseModel
+
+WILDCARDS = {"WILDCARD_SYNTAX": True}
+
+
+def find(filters):
+    queryset = ComplexFilter(TestCaseModel).filter_queryset(TestCaseModel.objects.all(), filters)
+    return sorted(queryset.values_list("integer", flat=True))
+
+
+class PrefixMatchTests(TestCase):
+    def setUp(self):
+        apple = LookupFieldTestModel.objects.create(lookup_field="Apple pie")
+        pineapple = LookupFieldTestModel.objects.create(lookup_field="pineapple")
+        both = MultipleLookupFieldsTestModel.objects.create(
+            lookup_field1="Ada", lookup_field2="Lovelace"
+        )
+        TestCaseModel.objects.create(
+            group1="Apple", group2="x", integer=1, simple_lookup=apple,
+            multiple_field_lookup=both,
+        )
+        TestCaseModel.objects.create(group1="pineapple", group2="x", integer=2, simple_lookup=pineapple)
+        TestCaseModel.objects.create(group1="applesauce", group2="x", integer=3)
+
+    @parameterized.expand([
+        ("startswith", "group1", "pine", [2]),
+        ("istartswith", "group1", "app", [1, 3]),
+        ("endswith", "group1", "sauce", [3]),
+        ("iendswith", "group1", "APPLE", [1, 2]),
+        ("istartswith", "simple_lookup", "apple", [1]),
+        ("iendswith", "simple_lookup", "apple", [2]),
+        ("istartswith", "simple_lookup.lookup_field", "pine", [2]),
+        ("istartswith", "multiple_field_lookup", "ada love", [1]),
+    ])
+    def test_operators(self, name, attribute, value, expected):
+        self.assertEqual(find(operator(attribute, name, value)), expected)
+
+    def test_operator_sql_is_a_prefix_like(self):
+        queryset = ComplexFilter(TestCaseModel).filter_queryset(
+            TestCaseModel.objects.all(), operator("group1", "startswith", "app")
+        )
+        self.assertIn('"group1" LIKE app% ', str(queryset.query))
+
+    @parameterized.expand([
+        ("*", "app*", [1, 3]),
+        ("*", "*apple", [1, 2]),
+        ("*", "*apple*", [1, 2, 3]),
+        ("*", "apple", [1, 2, 3]),
+        ("!", "app*", [2]),
+        ("!", "*apple", [3]),
+        ("*", "apple*", [1, 3]),
+    ])
+    def test_wildcards(self, name, value, expected):
+        with override_settings(COMPLEX_FILTER_SETTINGS=WILDCARDS):
+            self.assertEqual(find(operator("group1", name, value)), expected)
+
+    def test_wildcards_on_related_lookup_field(self):
+        with override_settings(COMPLEX_FILTER_SETTINGS=WILDCARDS):
+            self.assertEqual(find(operator("simple_lookup", "*", "pine*")), [2])
+
+    def test_wildcards_are_off_by_default(self):
+        TestCaseModel.objects.create(group1="app*", group2="x", integer=4)
+        self.assertEqual(find(operator("group1", "*", "app*")), [4])
+
+    @parameterized.expand([
+        ("abc*", ("abc", "istartswith")),
+        ("*abc", ("abc", "iendswith")),
+        ("*abc*", ("abc", "icontains")),
+        ("abc", ("abc", "icontains")),
+        ("*", ("*", "icontains")),
+        (5, (5, "icontains")),
+    ])
+    def test_wildcard_comparison(self, value, expected):
+        with override_settings(COMPLEX_FILTER_SETTINGS=WILDCARDS):
+            self.assertEqual(wildcard_comparison(value), expected)
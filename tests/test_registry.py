@@ -0,0 +1,63 @@
+from django.test import SimpleTestCase, override_settings
+
+from drf_complex_filter.registry import FilterRegistry, get_registry
+from drf_complex_filter.utils import ComplexFilter
+
+from .models import TestCaseModel
+
+
+def custom_comparison(field, operator, value, request=None, model=None):
+    return None
+
+
+class RegistryTests(SimpleTestCase):
+    def test_registry_is_shared(self):
+        first = ComplexFilter(TestCaseModel)
+        second = ComplexFilter(TestCaseModel)
+        self.assertIs(first.comparisons, second.comparisons)
+        self.assertIs(first.functions, second.functions)
+        self.assertIs(get_registry(), get_registry())
+
+    def test_registry_is_immutable(self):
+        registry = get_registry()
+        with self.assertRaises(TypeError):
+            registry.comparisons["new"] = lambda *args: None
+        with self.assertRaises(AttributeError):
+            registry.default_comparison = custom_comparison
+
+    def test_registry_contains_default_operators(self):
+        registry = get_registry()
+        for operator in ("=", "!=", "*", "!", ">", ">=", "<", "<=", "in", "not_in", "search"):
+            self.assertIn(operator, registry.comparisons)
+        self.assertIn("me", registry.comparisons)
+        self.assertIn("now", registry.functions)
+        self.assertIsNone(registry.default_comparison)
+
+    def test_settings_change_rebuilds_registry(self):
+        registry = get_registry()
+        with override_settings(
+            COMPLEX_FILTER_SETTINGS={
+                "COMPARISON_CLASSES": ["drf_complex_filter.comparisons.DynamicComparison"],
+                "DEFAULT_COMPARISON_FUNCTION": "tests.test_registry.custom_comparison",
+            }
+        ):
+            overridden = get_registry()
+            self.assertIsNot(overridden, registry)
+            self.assertNotIn("=", overridden.comparisons)
+            self.assertIs(overridden.default_comparison, custom_comparison)
+
+        restored = get_registry()
+        self.assertIn("=", restored.comparisons)
+        self.assertIsNone(restored.default_comparison)
+
+    def test_other_settings_keep_registry(self):
+        registry = get_registry()
+        with override_settings(USE_TZ=True):
+            self.assertIs(get_registry(), registry)
+
+    def test_from_settings_builds_new_registry(self):
+        from drf_complex_filter.settings import filter_settings
+
+        registry = FilterRegistry.from_settings(filter_settings)
+        self.assertIsNot(registry, get_registry())
+        self.assertEqual(set(registry.comparisons), set(get_registry().comparisons))
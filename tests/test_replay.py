@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from drf_complex_filter.replay import load_captures, replay
+
+from .fixtures import RECORDS, operator
+from .models import TestCaseModel
+
+
+class ReplayTests(TestCase):
+    def setUp(self):
+        for record in RECORDS:
+            TestCaseModel.objects.create(**record)
+
+    def test_replay_model(self):
+        result = replay({"name": "ints", "model": "tests.TestCaseModel",
+                         "filters": operator("integer", ">=", 2)})
+        self.assertEqual(result.error, "")
+        self.assertEqual(result.rows, TestCaseModel.objects.filter(integer__gte=2).count())
+        self.assertEqual(result.nodes, 1)
+        self.assertIn("WHERE", result.sql)
+        self.assertTrue(result.explain)
+
+    def test_replay_viewset_with_string_filters(self):
+        result = replay({
+            "name": "view",
+            "viewset": "tests.views.TestCaseViewSet",
+            "filters": json.dumps(operator("group1", "=", "GROUP1")),
+        })
+        self.assertEqual(result.rows, TestCaseModel.objects.filter(group1="GROUP1").count())
+
+    def test_errors_are_reported(self):
+        self.assertIn("Missing", replay({"name": "x", "model": "tests.Missing"}).error)
+        result = replay({"name": "x", "model": "tests.TestCaseModel",
+                         "filters": operator("Missing___id", "=", 1)})
+        self.assertIn("ComplexFilterError", result.error)
+
+    def test_load_captures(self):
+        captures = list(load_captures(["", "# comment", '{"model": "tests.TestCaseModel"}']))
+        self.assertEqual(captures, [{"model": "tests.TestCaseModel", "name": "line 3"}])
+
+    def test_command(self):
+        captures = [
+            {"name": "all", "model": "tests.TestCaseModel", "filters": operator("integer", ">=", 0)},
+            {"name": "broken", "model": "tests.TestCaseModel", "filters": operator("x", "??", 1)},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            capture_path = os.path.join(directory, "captures.jsonl")
+            json_path = os.path.join(directory, "results.json")
+            with open(capture_path, "w") as capture_file:
+                capture_file.write("\n".join(json.dumps(capture) for capture in captures))
+
+            output = StringIO()
+            call_command(
+                "complex_filter_replay", capture_path, repeat=1, json_output=json_path,
+                subquery_strategy="exists", stdout=output,
+            )
+            with open(json_path) as json_file:
+                results = json.load(json_file)
+
+        report = output.getvalue()
+        self.assertIn("== all (tests.TestCaseModel)", report)
+        self.assertIn(f"{len(RECORDS)} rows", report)
+        self.assertIn("error: ValueError", report)
+        self.assertEqual({result["name"] for result in results}, {"all", "broken"})
@@ -0,0 +1,131 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from drf_complex_filter.caching import result_cache_stats
+from drf_complex_filter.large_lists import InValues
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import RECORDS, operator
+from .models import LookupFieldTestModel, TestCaseModel
+
+RESULT_CACHE = {"RESULT_CACHE_TIMEOUT": 60}
+
+SUBQUERY_FILTER = {
+    "type": "operator",
+    "data": {
+        "attribute": "simple_lookup.LookupFieldTestModel___lookup_field",
+        "operator": "=",
+        "value": "value",
+    },
+}
+
+
+def filter_ids(filters):
+    queryset = ComplexFilter(TestCaseModel).filter_queryset(
+        TestCaseModel.objects.order_by("id"), filters
+    )
+    return list(queryset.values_list("id", flat=True))
+
+
+@override_settings(COMPLEX_FILTER_SETTINGS=RESULT_CACHE)
+class ResultCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        result_cache_stats.clear()
+        self.lookup = LookupFieldTestModel.objects.create(lookup_field="value")
+        for record in RECORDS:
+            TestCaseModel.objects.create(simple_lookup=self.lookup, **record)
+
+    def test_second_request_uses_cached_ids(self):
+        filters = operator("integer", ">=", 2)
+        expected = list(
+            TestCaseModel.objects.filter(integer__gte=2).order_by("id").values_list("id", flat=True)
+        )
+        self.assertEqual(filter_ids(filters), expected)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(filter_ids(filters), expected)
+        self.assertEqual(len(queries), 1)
+        self.assertIn("IN (", queries[0]["sql"])
+        self.assertNotIn("integer", queries[0]["sql"].split("WHERE")[1])
+
+        stats = result_cache_stats.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["stores"]), (1, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+        self.assertGreater(stats["bytes_stored"], 0)
+
+    def test_subquery_model_change_invalidates(self):
+        self.assertEqual(len(filter_ids(SUBQUERY_FILTER)), len(RECORDS))
+        self.lookup.lookup_field = "other"
+        self.lookup.save()
+        self.assertEqual(filter_ids(SUBQUERY_FILTER), [])
+
+    def test_unrelated_model_change_keeps_entry(self):
+        filters = operator("integer", ">=", 2)
+        filter_ids(filters)
+        LookupFieldTestModel.objects.create(lookup_field="unrelated")
+        filter_ids(filters)
+        self.assertEqual(result_cache_stats.stats()["hits"], 1)
+
+    def test_empty_result(self):
+        self.assertEqual(filter_ids(operator("integer", ">", 100)), [])
+        self.assertEqual(filter_ids(operator("integer", ">", 100)), [])
+        self.assertEqual(result_cache_stats.stats()["hits"], 1)
+
+    def test_large_results_are_not_stored(self):
+        with override_settings(
+            COMPLEX_FILTER_SETTINGS={**RESULT_CACHE, "RESULT_CACHE_MAX_IDS": 1}
+        ):
+            filter_ids(operator("integer", ">=", 0))
+            filter_ids(operator("integer", ">=", 0))
+            stats = result_cache_stats.stats()
+        self.assertEqual((stats["hits"], stats["skipped"]), (0, 2))
+
+    def test_large_results_fetch_bounded_ids_and_keep_the_filter(self):
+        filters = operator("integer", ">=", 0)
+        with override_settings(
+            COMPLEX_FILTER_SETTINGS={**RESULT_CACHE, "RESULT_CACHE_MAX_IDS": 2}
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                queryset = ComplexFilter(TestCaseModel).filter_queryset(
+                    TestCaseModel.objects.order_by("id"), filters
+                )
+            self.assertEqual(len(queries), 1)
+            self.assertIn("LIMIT 3", queries[0]["sql"])
+            self.assertIn("integer", str(queryset.query).split("WHERE")[1])
+            self.assertEqual(queryset.count(), len(RECORDS))
+
+    def test_large_id_lists_use_in_values(self):
+        with override_settings(
+            COMPLEX_FILTER_SETTINGS={**RESULT_CACHE, "LARGE_IN_LIST_THRESHOLD": 1}
+        ):
+            queryset = ComplexFilter(TestCaseModel).filter_queryset(
+                TestCaseModel.objects.all(), operator("integer", ">=", 0)
+            )
+            self.assertIsInstance(queryset.query.where.children[0].lhs, InValues)
+            self.assertEqual(queryset.count(), len(RECORDS))
+
+
+@override_settings(COMPLEX_FILTER_SETTINGS=RESULT_CACHE)
+class ResultCacheViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        for record in RECORDS:
+            TestCaseModel.objects.create(**record)
+
+    def test_request_bound_values_get_own_entries(self):
+        filters = json.dumps(operator("user", "me"))
+        owner = User.objects.create(username="owner")
+        other = User.objects.create(username="other")
+        TestCaseModel.objects.filter(integer=0).update(user=owner)
+
+        self.client.force_authenticate(owner)
+        self.assertEqual(len(self.client.get("/test/", data={"filters": filters}).data), 1)
+        self.client.force_authenticate(other)
+        self.assertEqual(len(self.client.get("/test/", data={"filters": filters}).data), 0)
@@ -0,0 +1,162 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from drf_complex_filter import utils
+from drf_complex_filter.exceptions import ComplexFilterError
+from drf_complex_filter.filters import AsyncComplexQueryFilter
+from drf_complex_filter.saved import clear_saved_filters, get_saved_filter, get_saved_filters
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import RECORDS, operator
+from .models import TestCaseModel
+
+
+SAVED_FILTERS = {
+    "group3": {"model": "tests.TestCaseModel", "filters": operator("group1", "=", "GROUP3")},
+    42: {"model": "tests.TestCaseModel", "filters": json.dumps(operator("integer", ">", 2))},
+    "mine": {"model": "tests.TestCaseModel", "filters": operator("user", "me")},
+    "users": {"model": "auth.User", "filters": operator("username", "=", "user")},
+}
+
+LOADED = []
+
+
+def load_saved_filters():
+    LOADED.append(True)
+    return {"large": SAVED_FILTERS[42]}
+
+
+def load_saved_filters_from_db():
+    # e.g. filters stored in a model, one saved filter per group
+    groups = TestCaseModel.objects.order_by("group1").values_list("group1", flat=True)
+    return {
+        group.lower(): {"model": "tests.TestCaseModel", "filters": operator("group1", "=", group)}
+        for group in groups.distinct()
+    }
+
+
+@override_settings(COMPLEX_FILTER_SETTINGS={"SAVED_FILTERS": SAVED_FILTERS})
+class SavedFilterTests(APITestCase):
+    def setUp(self):
+        for record in RECORDS:
+            TestCaseModel.objects.create(**record)
+
+    def get_ids(self, **params):
+        response = self.client.get("/test/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(item["id"] for item in response.json())
+
+    def expected_ids(self, **lookups):
+        return sorted(TestCaseModel.objects.filter(**lookups).values_list("id", flat=True))
+
+    def test_saved_filter(self):
+        self.assertEqual(self.get_ids(saved_filter="group3"), self.expected_ids(group1="GROUP3"))
+        self.assertEqual(self.get_ids(saved_filter=42), self.expected_ids(integer__gt=2))
+
+    def test_client_filter_is_anded(self):
+        filters = json.dumps(operator("group2", "=", "GROUP1"))
+        self.assertEqual(
+            self.get_ids(saved_filter="group3", filters=filters),
+            self.expected_ids(group1="GROUP3", group2="GROUP1"),
+        )
+
+    def test_saved_filter_is_not_parsed_again(self):
+        plan = get_saved_filter("group3").plan
+        with mock.patch.object(utils, "parse_filters", wraps=utils.parse_filters) as parse_filters:
+            self.get_ids(saved_filter="group3")
+            self.get_ids(saved_filter="group3", filters=json.dumps(operator("integer", "=", 1)))
+        self.assertEqual(parse_filters.call_count, 1)
+        self.assertIs(get_saved_filter("group3").plan, plan)
+
+    def test_request_dependent_saved_filter(self):
+        user = User.objects.create(username="user")
+        TestCaseModel.objects.filter(integer__lt=2).update(user=user)
+        self.client.force_authenticate(user)
+        self.assertEqual(self.get_ids(saved_filter="mine"), self.expected_ids(user=user))
+
+    def test_unknown_saved_filter(self):
+        response = self.client.get("/test/", {"saved_filter": "missing"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("saved_filter", response.json())
+
+    def test_saved_filter_of_another_model(self):
+        response = self.client.get("/test/", {"saved_filter": "users"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("auth.User", response.json()["saved_filter"][0])
+
+    def test_api(self):
+        complex_filter = ComplexFilter(TestCaseModel)
+        queryset = complex_filter.filter_queryset(
+            TestCaseModel.objects.all(), None, saved_filter="group3"
+        )
+        self.assertEqual(
+            sorted(queryset.values_list("id", flat=True)), self.expected_ids(group1="GROUP3")
+        )
+        self.assertEqual(complex_filter.models, {TestCaseModel})
+        with self.assertRaises(ComplexFilterError):
+            complex_filter.generate_query(None, saved_filter="missing")
+
+    def test_async_api(self):
+        query, _ = asyncio.run(
+            ComplexFilter(TestCaseModel).agenerate_query(
+                operator("group2", "=", "GROUP1"), saved_filter=get_saved_filter("group3")
+            )
+        )
+        self.assertEqual(
+            sorted(TestCaseModel.objects.filter(query).values_list("id", flat=True)),
+            self.expected_ids(group1="GROUP3", group2="GROUP1"),
+        )
+
+
+class SavedFilterLoadingTests(TestCase):
+    def tearDown(self):
+        clear_saved_filters()
+
+    @override_settings(
+        COMPLEX_FILTER_SETTINGS={"SAVED_FILTERS": "tests.test_saved_filters.load_saved_filters"}
+    )
+    def test_callable_is_loaded_once(self):
+        LOADED.clear()
+        self.assertEqual(list(get_saved_filters()), ["large"])
+        get_saved_filter("large")
+        self.assertEqual(LOADED, [True])
+
+        clear_saved_filters()
+        get_saved_filter("large")
+        self.assertEqual(LOADED, [True, True])
+
+    @override_settings(
+        COMPLEX_FILTER_SETTINGS={
+            "SAVED_FILTERS": "tests.test_saved_filters.load_saved_filters_from_db"
+        }
+    )
+    async def test_callable_using_the_orm_is_loaded_from_the_async_api(self):
+        for record in RECORDS:
+            await TestCaseModel.objects.acreate(**record)
+        request = Request(APIRequestFactory().get("/test/", {"saved_filter": "group3"}))
+        queryset = await AsyncComplexQueryFilter().afilter_queryset(
+            request, TestCaseModel.objects.all(), None
+        )
+        expected = await TestCaseModel.objects.filter(group1="GROUP3").acount()
+        self.assertEqual(await queryset.acount(), expected)
+
+    @override_settings(COMPLEX_FILTER_SETTINGS={"SAVED_FILTERS": {
+        "broken": {"model": "tests.TestCaseModel", "filters": {"type": "operator", "data": {}}},
+    }})
+    def test_invalid_filter(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "broken"):
+            get_saved_filters()
+
+    @override_settings(COMPLEX_FILTER_SETTINGS={"SAVED_FILTERS": {
+        "unknown": {"model": "tests.Missing", "filters": operator("id", "=", 1)},
+    }})
+    def test_unknown_model(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "unknown"):
+            get_saved_filters()
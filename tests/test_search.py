@@ -0,0 +1,149 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase
+from parameterized import parameterized
+
+from drf_complex_filter.search import (
+    FullTextMatch,
+    clear_search_tables,
+    create_search_table,
+    drop_search_table,
+    has_search_table,
+    search_table_sql,
+    search_words,
+)
+from drf_complex_filter.utils import ComplexFilter
+
+from .models import LookupFieldTestModel, MultipleLookupFieldsTestModel, TestCaseModel
+
+
+def search(attribute, value):
+    return {
+        "type": "operator",
+        "data": {"attribute": attribute, "operator": "search", "value": value},
+    }
+
+
+def find(filters):
+    queryset = ComplexFilter(TestCaseModel).filter_queryset(TestCaseModel.objects.all(), filters)
+    return sorted(queryset.values_list("integer", flat=True))
+
+
+# FTS5 tables cannot be created and rolled back inside the test transaction
+class SearchTests(TransactionTestCase):
+    def setUp(self):
+        clear_search_tables()
+        red = LookupFieldTestModel.objects.create(lookup_field="red apple")
+        green = LookupFieldTestModel.objects.create(lookup_field="green pear")
+        TestCaseModel.objects.create(group1="quick brown", group2="fox", integer=1, simple_lookup=red)
+        TestCaseModel.objects.create(group1="lazy dog", group2="brown", integer=2, simple_lookup=green)
+        TestCaseModel.objects.create(group1="brownie", group2="cake", integer=3)
+
+    def tearDown(self):
+        drop_search_table(TestCaseModel)
+        drop_search_table(LookupFieldTestModel)
+
+    def create_tables(self):
+        create_search_table(TestCaseModel)
+        create_search_table(LookupFieldTestModel)
+
+    @parameterized.expand([
+        ("group1", "brown", [1], [1, 3]),
+        ("group1", "BROWN quick", [1], [1]),
+        ("group2", "brown", [2], [2]),
+        ("group1", "dog lazy", [2], [2]),
+        ("group1", "cat", [], []),
+        ("simple_lookup", "apple", [1], [1]),
+        ("simple_lookup", "pear green", [2], [2]),
+        ("simple_lookup__lookup_field", "red", [1], [1]),
+    ])
+    def test_search(self, attribute, value, full_text, fallback):
+        self.assertEqual(find(search(attribute, value)), fallback)
+        self.create_tables()
+        self.assertEqual(find(search(attribute, value)), full_text)
+
+    def test_full_text_uses_fts_table(self):
+        self.create_tables()
+        queryset = ComplexFilter(TestCaseModel).filter_queryset(
+            TestCaseModel.objects.all(), search("group1", "brown")
+        )
+        self.assertIn("MATCH", str(queryset.query))
+
+    def test_triggers_keep_table_in_sync(self):
+        self.create_tables()
+        record = TestCaseModel.objects.create(group1="brown bear", group2="", integer=4)
+        self.assertEqual(find(search("group1", "bear")), [4])
+
+        record.group1 = "polar bear"
+        record.save()
+        self.assertEqual(find(search("group1", "brown")), [1])
+        self.assertEqual(find(search("group1", "polar")), [4])
+
+        record.delete()
+        self.assertEqual(find(search("group1", "bear")), [])
+
+    def test_drop_table_falls_back(self):
+        self.create_tables()
+        drop_search_table(TestCaseModel)
+        self.assertFalse(has_search_table(connection, TestCaseModel))
+        self.assertEqual(find(search("group1", "brown")), [1, 3])
+
+    def test_field_without_search_fields_uses_icontains(self):
+        queryset = ComplexFilter(TestCaseModel).filter_queryset(
+            TestCaseModel.objects.all(), search("with_empty", "brown")
+        )
+        self.assertIn("LIKE", str(queryset.query))
+        self.assertFalse(
+            any(isinstance(child, FullTextMatch) for child in queryset.query.where.children)
+        )
+
+    def test_empty_value_matches_everything(self):
+        self.create_tables()
+        self.assertEqual(find(search("group1", "  ")), [1, 2, 3])
+
+    def test_quotes_are_escaped(self):
+        self.create_tables()
+        self.assertEqual(find(search("group1", 'brown" OR "dog')), [])
+
+    def test_combined_with_other_conditions(self):
+        self.create_tables()
+        filters = {
+            "type": "or",
+            "data": [
+                search("group1", "quick"),
+                {"type": "operator", "data": {"attribute": "integer", "operator": "=", "value": 3}},
+            ],
+        }
+        self.assertEqual(find(filters), [1, 3])
+
+    def test_search_table_needs_search_fields(self):
+        with self.assertRaises(ValueError):
+            search_table_sql(MultipleLookupFieldsTestModel)
+
+    def test_search_words(self):
+        self.assertEqual(search_words(" quick  brown\tfox "), ["quick", "brown", "fox"])
+        self.assertEqual(search_words(None), [])
+        self.assertEqual(search_words(12), ["12"])
+
+
+class SearchTablesCommandTests(TransactionTestCase):
+    def tearDown(self):
+        call_command("complex_filter_search_tables", "--drop", stdout=StringIO())
+
+    def test_creates_tables_of_models_with_search_fields(self):
+        TestCaseModel.objects.create(group1="quick brown", group2="fox", integer=1)
+        out = StringIO()
+        call_command("complex_filter_search_tables", stdout=out)
+        self.assertIn("Created tests.TestCaseModel", out.getvalue())
+        self.assertIn("Created tests.LookupFieldTestModel", out.getvalue())
+        self.assertNotIn("MultipleLookupFieldsTestModel", out.getvalue())
+        self.assertTrue(has_search_table(connection, TestCaseModel))
+        self.assertEqual(find(search("group1", "brown")), [1])
+
+    def test_sql(self):
+        out = StringIO()
+        call_command("complex_filter_search_tables", "tests.TestCaseModel", "--sql", stdout=out)
+        self.assertIn("USING fts5", out.getvalue())
+        self.assertFalse(has_search_table(connection, TestCaseModel))
@@ -0,0 +1,122 @@
+from django.test import TestCase, override_settings
+from parameterized import parameterized
+
+from drf_complex_filter.exceptions import ComplexFilterError
+from drf_complex_filter.metrics import filter_metrics
+from drf_complex_filter.plan import ConditionPlan
+from drf_complex_filter.utils import ComplexFilter
+
+from .fixtures import operator
+from .models import LookupFieldTestModel, TestCaseModel
+
+STRATEGIES = [("in",), ("exists",), ("join",), ("adaptive",)]
+
+CONDITIONS = [
+    ("simple_lookup.LookupFieldTestModel___lookup_field", "=", "value1", [0]),
+    ("simple_lookup.LookupFieldTestModel___lookup_field", "!=", "value1", [1]),
+    ("simple_lookup.LookupFieldTestModel___lookup_field", "in", ["value1", "value2"], [0, 1]),
+    ("simple_lookup.LookupFieldTestModel___lookup_field", "*", "VALUE", [0, 1]),
+    ("TestCaseModel___group1", "=", "g2", [1, 2]),
+]
+
+
+class SubqueryStrategyTests(TestCase):
+    def setUp(self):
+        first = LookupFieldTestModel.objects.create(lookup_field="value1")
+        second = LookupFieldTestModel.objects.create(lookup_field="value2")
+        self.records = [
+            TestCaseModel.objects.create(group1="g1", group2="g", simple_lookup=first),
+            TestCaseModel.objects.create(group1="g2", group2="g", simple_lookup=second),
+            TestCaseModel.objects.create(group1="g2", group2="g"),
+        ]
+
+    def filter(self, filters):
+        return ComplexFilter(TestCaseModel).filter_queryset(
+            TestCaseModel.objects.all(), filters
+        )
+
+    @parameterized.expand(
+        [strategy + condition for strategy in STRATEGIES for condition in CONDITIONS]
+    )
+    def test_strategies_match_same_rows(self, strategy, attribute, op, value, expected):
+        queryset = self.filter(operator(attribute, op, value, strategy))
+        self.assertEqual(
+            sorted(record.id for record in queryset),
+            [self.records[index].id for index in expected],
+        )
+
+    def test_in_strategy_sql(self):
+        queryset = self.filter(
+            operator("simple_lookup.LookupFieldTestModel___lookup_field", "=", "value1")
+        )
+        self.assertIn(" IN (SELECT", str(queryset.query))
+
+    def test_exists_strategy_sql(self):
+        queryset = self.filter(
+            operator("simple_lookup.LookupFieldTestModel___lookup_field", "=", "value1", "exists")
+        )
+        self.assertIn("EXISTS(SELECT", str(queryset.query).replace("EXISTS (", "EXISTS("))
+
+    def test_join_strategy_sql(self):
+        queryset = self.filter(
+            operator("simple_lookup.LookupFieldTestModel___lookup_field", "=", "value1", "join")
+        )
+        sql = str(queryset.query)
+        self.assertNotIn("(SELECT", sql)
+        self.assertIn("JOIN", sql)
+
+    def test_join_falls_back_to_in(self):
+        queryset = self.filter(operator("LookupFieldTestModel___lookup_field", "=", "value1", "join"))
+        self.assertIn(" IN (SELECT", str(queryset.query))
+
+    def test_strategy_setting(self):
+        with override_settings(COMPLEX_FILTER_SETTINGS={"SUBQUERY_STRATEGY": "exists"}):
+            queryset = self.filter(
+                operator("simple_lookup.LookupFieldTestModel___lookup_field", "=", "value1")
+            )
+            self.assertIn("EXISTS", str(queryset.query))
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ComplexFilterError):
+            self.filter(operator("TestCaseModel___group1", "=", "g1", "merge"))
+
+    def test_adaptive_inlines_small_results(self):
+        queryset = self.filter(
+            operator("simple_lookup.LookupFieldTestModel___lookup_field", "=", "value1", "adaptive")
+        )
+        sql = str(queryset.query)
+        self.assertNotIn("(SELECT", sql)
+        self.assertIn(f"IN ({self.records[0].simple_lookup_id})", sql)
+
+    def test_adaptive_keeps_large_subquery(self):
+        with override_settings(COMPLEX_FILTER_SETTINGS={"SUBQUERY_INLINE_THRESHOLD": 1}):
+            queryset = self.filter(
+                operator("TestCaseModel___group1", "=", "g2", "adaptive")
+            )
+            self.assertIn(" IN (SELECT", str(queryset.query))
+            self.assertEqual(queryset.count(), 2)
+
+    def test_adaptive_is_evaluated_per_request(self):
+        filters = operator("TestCaseModel___group1", "=", "g1", "adaptive")
+        self.assertIsInstance(ComplexFilter(TestCaseModel).get_plan(filters), ConditionPlan)
+        self.assertEqual(self.filter(filters).count(), 1)
+        TestCaseModel.objects.create(group1="g1", group2="g")
+        self.assertEqual(self.filter(filters).count(), 2)
+
+    def test_adaptive_metrics(self):
+        reported = []
+
+        def receiver(sender, metrics, **kwargs):
+            reported.append(metrics)
+
+        filter_metrics.connect(receiver)
+        try:
+            with override_settings(COMPLEX_FILTER_SETTINGS={"SUBQUERY_INLINE_THRESHOLD": 1}):
+                self.filter(operator("TestCaseModel___group1", "=", "g1", "adaptive"))
+                self.filter(operator("TestCaseModel___group1", "=", "g2", "adaptive"))
+        finally:
+            filter_metrics.disconnect(receiver)
+
+        self.assertEqual(reported[0].counters, {"subquery_inlined": 1})
+        self.assertEqual(reported[1].counters, {"subquery_nested": 1})
+        self.assertIn("execute", reported[0].timings)
@@ -0,0 +1,204 @@
+import asyncio
+from datetime import datetime, timezone
+
+from django.test import TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from drf_complex_filter.evaluation import TimeBucketCache, floor_to_bucket, time_bucket_cache
+from drf_complex_filter.functions import FunctionPolicy, value_function
+from drf_complex_filter.plan import StaticPlan, plan_cache
+from drf_complex_filter.registry import get_registry
+from drf_complex_filter.utils import ComplexFilter
+
+from .models import TestCaseModel
+
+CALLS = []
+
+
+def record(name, value):
+    CALLS.append(name)
+    return value
+
+
+class CountingFunctions:
+    def get_functions(self):
+        return {
+            "limit": lambda value=0, **kwargs: record("limit", value),
+            "shared_limit": value_function(uses_model=False)(
+                lambda value=0, **kwargs: record("shared_limit", value)
+            ),
+            "pure_limit": value_function(pure=True)(
+                lambda value=0, **kwargs: record("pure_limit", value)
+            ),
+            "bucketed_now": value_function(time_bucket=60)(
+                lambda **kwargs: record("bucketed_now", datetime.now(timezone.utc))
+            ),
+            "async_limit": self.async_limit,
+        }
+
+    @staticmethod
+    async def async_limit(value=0, **kwargs):
+        await asyncio.sleep(0)
+        return record("async_limit", value)
+
+
+SETTINGS = {
+    "VALUE_FUNCTIONS": [
+        "drf_complex_filter.functions.DateFunctions",
+        "tests.test_value_functions.CountingFunctions",
+    ],
+}
+
+
+def leaf(attribute, func, **kwargs):
+    return {
+        "type": "operator",
+        "data": {
+            "attribute": attribute,
+            "operator": ">=",
+            "value": {"func": func, "kwargs": kwargs},
+        },
+    }
+
+
+def group(*children):
+    return {"type": "and", "data": list(children)}
+
+
+def subquery_leaf(func, **kwargs):
+    return leaf("simple_lookup.LookupFieldTestModel___id", func, **kwargs)
+
+
+def make_request():
+    return Request(APIRequestFactory().get("/"))
+
+
+@override_settings(COMPLEX_FILTER_SETTINGS=SETTINGS)
+class MemoizationTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+        plan_cache.clear()
+        time_bucket_cache.clear()
+        # A fixed clock, so the bucket cannot change during a test
+        clock, time_bucket_cache.clock = time_bucket_cache.clock, lambda: 0.0
+        self.addCleanup(setattr, time_bucket_cache, "clock", clock)
+
+    def generate(self, filters, request=None):
+        return ComplexFilter(TestCaseModel).generate_query(filters, request)
+
+    def test_leaves_share_one_call(self):
+        self.generate(group(*(leaf("integer", "limit", value=1) for _ in range(10))))
+        self.assertEqual(CALLS, ["limit"])
+
+    def test_kwargs_are_part_of_the_key(self):
+        self.generate(group(leaf("integer", "limit", value=1), leaf("float", "limit", value=2)))
+        self.assertEqual(CALLS, ["limit", "limit"])
+
+    def test_request_scope(self):
+        request = make_request()
+        self.generate(leaf("integer", "limit", value=1), request)
+        self.generate(leaf("float", "limit", value=1), request)
+        self.assertEqual(CALLS, ["limit"])
+
+        self.generate(leaf("integer", "limit", value=1), make_request())
+        self.assertEqual(CALLS, ["limit", "limit"])
+
+    def test_calls_without_request_are_not_shared(self):
+        complex_filter = ComplexFilter(TestCaseModel)
+        complex_filter.generate_query(leaf("integer", "limit", value=1))
+        complex_filter.generate_query(leaf("integer", "limit", value=1))
+        self.assertEqual(CALLS, ["limit", "limit"])
+
+    def test_subqueries_share_model_independent_values(self):
+        self.generate(
+            group(leaf("id", "shared_limit", value=1), subquery_leaf("shared_limit", value=1))
+        )
+        self.assertEqual(CALLS, ["shared_limit"])
+
+    def test_model_dependent_values_are_computed_per_model(self):
+        self.generate(group(leaf("id", "limit", value=1), subquery_leaf("limit", value=1)))
+        self.assertEqual(CALLS, ["limit", "limit"])
+
+    def test_now_is_shared_across_subqueries(self):
+        self.assertFalse(get_registry().function_policies["now"].uses_model)
+
+    def test_pure_function_is_compiled_into_the_plan(self):
+        filters = leaf("integer", "pure_limit", value=1)
+        plan = ComplexFilter(TestCaseModel).get_plan(filters)
+        self.assertIsInstance(plan, StaticPlan)
+
+        for _ in range(3):
+            self.generate(filters, make_request())
+        self.assertEqual(CALLS, ["pure_limit"])
+
+    def test_builtin_date_is_pure(self):
+        self.assertTrue(get_registry().function_policies["date"].pure)
+
+    def test_time_bucket(self):
+        for _ in range(3):
+            self.generate(leaf("datetime", "bucketed_now"), make_request())
+        self.assertEqual(CALLS, ["bucketed_now"])
+
+    def test_time_bucket_setting(self):
+        settings = {**SETTINGS, "VALUE_FUNCTION_TIME_BUCKETS": {"limit": 30}}
+        with self.settings(COMPLEX_FILTER_SETTINGS=settings):
+            self.assertEqual(
+                get_registry().function_policies["limit"],
+                FunctionPolicy(time_bucket=30),
+            )
+            self.generate(leaf("integer", "limit", value=1), make_request())
+            self.generate(leaf("integer", "limit", value=1), make_request())
+        self.assertEqual(CALLS, ["limit"])
+
+    def test_functions_assigned_on_the_instance(self):
+        complex_filter = ComplexFilter(TestCaseModel)
+        complex_filter.functions = {
+            **complex_filter.functions,
+            "custom_limit": lambda value=0, **kwargs: record("custom_limit", value),
+            "pure_custom_limit": value_function(pure=True)(
+                lambda value=0, **kwargs: record("pure_custom_limit", value)
+            ),
+        }
+        query, _ = complex_filter.generate_query(
+            group(
+                leaf("integer", "custom_limit", value=1),
+                leaf("integer", "custom_limit", value=1),
+                leaf("integer", "pure_custom_limit", value=1),
+            ),
+            make_request(),
+        )
+        self.assertIsNotNone(query)
+        self.assertEqual(CALLS, ["pure_custom_limit", "custom_limit"])
+
+    def test_async_leaves_share_one_call(self):
+        filters = group(*(leaf("integer", "async_limit", value=1) for _ in range(5)))
+        asyncio.run(ComplexFilter(TestCaseModel).agenerate_query(filters))
+        self.assertEqual(CALLS, ["async_limit"])
+
+
+class TimeBucketCacheTests(TestCase):
+    def test_values_change_with_the_bucket(self):
+        clock = [120.0]
+        bucket_cache = TimeBucketCache(clock=lambda: clock[0])
+        values = iter(range(10))
+
+        def compute():
+            return next(values)
+
+        self.assertEqual(bucket_cache.get("key", 60, compute), 0)
+        clock[0] = 179.0
+        self.assertEqual(bucket_cache.get("key", 60, compute), 0)
+        clock[0] = 180.0
+        self.assertEqual(bucket_cache.get("key", 60, compute), 1)
+        self.assertEqual(bucket_cache.get("other", 60, compute), 2)
+
+    def test_datetimes_are_truncated(self):
+        value = datetime(2024, 5, 1, 12, 34, 56, 789, tzinfo=timezone.utc)
+        self.assertEqual(
+            floor_to_bucket(value, 60), datetime(2024, 5, 1, 12, 34, tzinfo=timezone.utc)
+        )
+        self.assertEqual(
+            floor_to_bucket(value, 3600), datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+        )
+        self.assertEqual(floor_to_bucket(5, 60), 5)
@@ -1,7 +1,15 @@
 from rest_framework import routers
 
-from .views import TestCaseViewSet
+from .views import (
+    CountTestCaseViewSet,
+    DebugTestCaseViewSet,
+    PaginatedTestCaseViewSet,
+    TestCaseViewSet,
+)
 
 router = routers.SimpleRouter()
 router.register(r"test", TestCaseViewSet)
+router.register(r"paginated", PaginatedTestCaseViewSet, basename="paginated")
+router.register(r"debug", DebugTestCaseViewSet, basename="debug")
+router.register(r"counts", CountTestCaseViewSet, basename="counts")
 urlpatterns = router.urls
@@ -1,6 +1,11 @@
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
-from drf_complex_filter.filters import ComplexQueryFilter
+from drf_complex_filter.filters import (
+    ComplexFilterCountMixin,
+    ComplexFilterDebugMixin,
+    ComplexQueryFilter,
+)
 
 from .models import TestCaseModel
 from .serializer import TestCaseModelSerializer
@@ -10,3 +15,19 @@ class TestCaseViewSet(ReadOnlyModelViewSet):
     queryset = TestCaseModel.objects.all()
     serializer_class = TestCaseModelSerializer
     filter_backends = [ComplexQueryFilter]
+
+
+class SmallPagePagination(PageNumberPagination):
+    page_size = 2
+
+
+class PaginatedTestCaseViewSet(TestCaseViewSet):
+    pagination_class = SmallPagePagination
+
+
+class DebugTestCaseViewSet(ComplexFilterDebugMixin, TestCaseViewSet):
+    pass
+
+
+class CountTestCaseViewSet(ComplexFilterCountMixin, TestCaseViewSet):
+    pass